@@ -24,6 +24,18 @@ class Settings(BaseSettings):
     algorithm: str = "HS256"
     access_token_expire_minutes: int = 30
     refresh_token_expire_days: int = 7
+    # /auth/refresh emite tambien un nuevo refresh token
+    refresh_token_rotacion: bool = False
+    # Cada cuantos segundos se recarga el filtro de tokens revocados (y se
+    # purgan los expirados); acota la demora en ver logouts de otras instancias
+    revocacion_recarga_segundos: int = 60
+    # Cada cuantos segundos se escriben en lote los last_login pendientes
+    last_login_intervalo_segundos: int = 10
+    # Segundos que se reutiliza el usuario autenticado sin leerlo de la DB
+    usuario_cache_ttl: int = 60
+    # Threads dedicados a bcrypt y operaciones pendientes antes de responder 429
+    hash_workers: int = 2
+    hash_cola_max: int = 32
 
     # CORS
     cors_origins: str = "http://localhost:5173,http://localhost:3000"
@@ -31,6 +43,11 @@ class Settings(BaseSettings):
     # API
     api_v1_prefix: str = "/api/v1"
 
+    # Instrumentacion SQL por request (header Server-Timing y aviso de N+1)
+    sql_instrumentacion: bool = True
+    # Aviso cuando un mismo statement normalizado se repite mas veces
+    sql_repeticiones_max: int = 10
+
     class Config:
         env_file = ".env"
         case_sensitive = False
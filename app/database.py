@@ -1,18 +1,28 @@
 """
 Configuracion de conexion a PostgreSQL
 Soporta conexion local y Cloud SQL via Unix socket
+Los endpoints usan el driver asincrono asyncpg (AsyncEngine + AsyncSession)
 """
 
+import logging
 import os
-
-from sqlalchemy import create_engine
+import re
+import time
+from collections import Counter
+from contextvars import ContextVar
+from functools import lru_cache
+from typing import Optional
+
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
 
 from app.config import get_settings
 
 settings = get_settings()
 
+logger = logging.getLogger(__name__)
+
 
 def get_database_url() -> str:
     """
@@ -50,31 +60,96 @@ def get_database_url() -> str:
     return settings.database_url
 
 
+def get_async_database_url(url: str) -> str:
+    """
+    Adapta la URL de conexion al driver asyncpg.
+
+    postgresql://... y postgresql+psycopg2://... -> postgresql+asyncpg://...
+    El parametro ?host=/cloudsql/... se mantiene: asyncpg lo usa como
+    directorio del Unix socket.
+    """
+    for prefix in ("postgresql+psycopg2://", "postgresql://", "postgres://"):
+        if url.startswith(prefix):
+            return "postgresql+asyncpg://" + url.removeprefix(prefix)
+    return url
+
+
 # Obtener URL de base de datos
 database_url = get_database_url()
 
-# Engine de SQLAlchemy
-engine = create_engine(
-    database_url,
+# Engine asincrono de SQLAlchemy (asyncpg)
+engine = create_async_engine(
+    get_async_database_url(database_url),
     pool_pre_ping=True,
     pool_size=5,
     max_overflow=10,
 )
 
-# Sesion de base de datos
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+# Sesion de base de datos.
+# expire_on_commit=False: los objetos siguen siendo legibles despues del
+# commit sin disparar una recarga implicita (no permitida en AsyncSession).
+SessionLocal = async_sessionmaker(bind=engine, autoflush=False, expire_on_commit=False)
 
 # Base para modelos
 Base = declarative_base()
 
 
-def get_db():
+async def get_db():
     """
-    Dependency para obtener sesion de base de datos.
+    Dependency para obtener sesion asincrona de base de datos.
     Se usa en los endpoints con Depends(get_db).
     """
-    db = SessionLocal()
-    try:
+    async with SessionLocal() as db:
         yield db
-    finally:
-        db.close()
+
+
+# ============================================================
+# INSTRUMENTACION SQL POR REQUEST
+# ============================================================
+
+
+class MedicionSQL:
+    """Statements y tiempo de base de datos acumulados en una request"""
+
+    def __init__(self):
+        self.queries = 0
+        self.duracion_ms = 0.0
+        self.por_statement: Counter[str] = Counter()
+
+    def repetidos(self, umbral: int) -> list[tuple[str, int]]:
+        """Statements normalizados ejecutados mas de `umbral` veces"""
+        return [(sql, n) for sql, n in self.por_statement.most_common() if n > umbral]
+
+
+# La middleware crea una MedicionSQL por request; fuera de una request
+# (scripts, benchmarks) queda en None y los hooks no hacen nada.
+medicion_sql: ContextVar[Optional[MedicionSQL]] = ContextVar(
+    "medicion_sql", default=None
+)
+
+_LITERALES = re.compile(r"\$\d+|'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b")
+_LISTAS = re.compile(r"\(\?(?:\s*,\s*\?)+\)")
+
+
+@lru_cache(maxsize=1024)
+def normalizar_sql(statement: str) -> str:
+    """Reemplaza parametros y literales por ? y colapsa listas IN (...)"""
+    sql = _LITERALES.sub("?", " ".join(statement.split()))
+    return _LISTAS.sub("(?...)", sql)
+
+
+@event.listens_for(engine.sync_engine, "before_cursor_execute")
+def _inicio_statement(conn, cursor, statement, parameters, context, executemany):
+    medicion = medicion_sql.get()
+    if medicion is not None:
+        medicion.queries += 1
+        medicion.por_statement[normalizar_sql(statement)] += 1
+        context._inicio_sql = time.perf_counter()
+
+
+@event.listens_for(engine.sync_engine, "after_cursor_execute")
+def _fin_statement(conn, cursor, statement, parameters, context, executemany):
+    medicion = medicion_sql.get()
+    inicio = getattr(context, "_inicio_sql", None)
+    if medicion is not None and inicio is not None:
+        medicion.duracion_ms += (time.perf_counter() - inicio) * 1000
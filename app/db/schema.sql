@@ -5,6 +5,7 @@
 -- ============================================================
 
 -- Eliminar tablas existentes (en orden inverso por dependencias)
+DROP TABLE IF EXISTS tokens_revocados CASCADE;
 DROP TABLE IF EXISTS asignaciones CASCADE;
 DROP TABLE IF EXISTS requerimientos CASCADE;
 DROP TABLE IF EXISTS ciclos CASCADE;
@@ -20,6 +21,9 @@ DROP TYPE IF EXISTS rol_usuario CASCADE;
 DROP TYPE IF EXISTS estado_ciclo CASCADE;
 DROP TYPE IF EXISTS tipo_turnos CASCADE;
 
+-- Igualdad de enteros en indices GiST (constraint de asignaciones solapadas)
+CREATE EXTENSION IF NOT EXISTS btree_gist;
+
 -- ============================================================
 -- TIPOS ENUM
 -- ============================================================
@@ -71,6 +75,7 @@ CREATE TABLE usuarios (
     empresa_id INTEGER REFERENCES empresas(id) ON DELETE SET NULL,
     cargo VARCHAR(100),
     is_active BOOLEAN DEFAULT TRUE,
+    token_version INTEGER NOT NULL DEFAULT 0,
     last_login TIMESTAMP WITH TIME ZONE,
     created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
     updated_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
@@ -159,9 +164,13 @@ CREATE TABLE ciclos (
     fecha_fin DATE NOT NULL,
     estado estado_ciclo DEFAULT 'NO_DEFINIDO',
     horario VARCHAR(10) DEFAULT 'DIA',
+    -- Cobertura, mantenida por triggers de requerimientos y asignaciones
+    requeridos INTEGER NOT NULL DEFAULT 0,
+    asignados INTEGER NOT NULL DEFAULT 0,
     created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
     updated_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
-    CONSTRAINT check_fechas CHECK (fecha_fin >= fecha_inicio)
+    CONSTRAINT check_fechas CHECK (fecha_fin >= fecha_inicio),
+    CONSTRAINT unique_ciclo UNIQUE (contrato_id, letra, fecha_inicio, fecha_fin)
 );
 
 -- Requerimientos
@@ -182,7 +191,17 @@ CREATE TABLE asignaciones (
     trabajador_id INTEGER NOT NULL REFERENCES trabajadores(id) ON DELETE CASCADE,
     fecha_asignacion TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
     created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
-    CONSTRAINT unique_asignacion UNIQUE (ciclo_id, trabajador_id)
+    -- Fechas del ciclo (inclusive), mantenidas por triggers
+    periodo DATERANGE NOT NULL,
+    CONSTRAINT unique_asignacion UNIQUE (ciclo_id, trabajador_id),
+    -- Un trabajador no puede estar en dos ciclos que se cruzan
+    CONSTRAINT asignaciones_sin_solapamiento EXCLUDE USING gist (trabajador_id WITH =, periodo WITH &&)
+);
+
+-- Tokens JWT revocados (logout) hasta su expiracion
+CREATE TABLE tokens_revocados (
+    jti VARCHAR(32) PRIMARY KEY,
+    expira TIMESTAMP WITH TIME ZONE NOT NULL
 );
 
 -- ============================================================
@@ -194,10 +213,12 @@ CREATE INDEX idx_usuarios_email ON usuarios(email);
 CREATE INDEX idx_usuarios_empresa ON usuarios(empresa_id);
 CREATE INDEX idx_usuarios_rol ON usuarios(rol);
 CREATE INDEX idx_usuarios_activo ON usuarios(is_active);
+CREATE INDEX idx_usuarios_orden ON usuarios((nombre_completo IS NULL), COALESCE(nombre_completo, ''), id);
 
 -- Proyectos
 CREATE INDEX idx_proyectos_activo ON proyectos(activo);
 CREATE INDEX idx_proyectos_fechas ON proyectos(fecha_inicio, fecha_fin);
+CREATE INDEX idx_proyectos_orden ON proyectos(nombre, id);
 
 -- Contratos
 CREATE INDEX idx_contratos_proyecto ON contratos(proyecto_id);
@@ -209,6 +230,7 @@ CREATE INDEX idx_trabajadores_rut ON trabajadores(rut);
 CREATE INDEX idx_trabajadores_empresa ON trabajadores(empresa_id);
 CREATE INDEX idx_trabajadores_proyecto ON trabajadores(proyecto_id);
 CREATE INDEX idx_trabajadores_activo ON trabajadores(activo);
+CREATE INDEX idx_trabajadores_orden ON trabajadores(proyecto_id, apellidos, nombres, id);
 
 -- Ciclos
 CREATE INDEX idx_ciclos_contrato ON ciclos(contrato_id);
@@ -216,9 +238,12 @@ CREATE INDEX idx_ciclos_fechas ON ciclos(fecha_inicio, fecha_fin);
 CREATE INDEX idx_ciclos_estado ON ciclos(estado);
 
 -- Asignaciones
-CREATE INDEX idx_asignaciones_ciclo ON asignaciones(ciclo_id);
+CREATE INDEX idx_asignaciones_ciclo ON asignaciones(ciclo_id, id);
 CREATE INDEX idx_asignaciones_trabajador ON asignaciones(trabajador_id);
 
+-- Tokens revocados: purga de los expirados
+CREATE INDEX idx_tokens_revocados_expira ON tokens_revocados(expira);
+
 -- ============================================================
 -- FUNCIONES Y TRIGGERS
 -- ============================================================
@@ -251,12 +276,215 @@ CREATE TRIGGER update_cargos_updated_at BEFORE UPDATE ON cargos
 CREATE TRIGGER update_trabajadores_updated_at BEFORE UPDATE ON trabajadores
     FOR EACH ROW EXECUTE FUNCTION update_updated_at_column();
 
-CREATE TRIGGER update_ciclos_updated_at BEFORE UPDATE ON ciclos
+-- Sin requeridos/asignados: los contadores de cobertura no cambian updated_at
+CREATE TRIGGER update_ciclos_updated_at BEFORE UPDATE OF
+    contrato_id, letra, fecha_inicio, fecha_fin, estado, horario
+    ON ciclos
     FOR EACH ROW EXECUTE FUNCTION update_updated_at_column();
 
 CREATE TRIGGER update_requerimientos_updated_at BEFORE UPDATE ON requerimientos
     FOR EACH ROW EXECUTE FUNCTION update_updated_at_column();
 
+-- Periodo de cada asignacion: copia de las fechas de su ciclo para que el
+-- constraint asignaciones_sin_solapamiento pueda compararlas
+CREATE OR REPLACE FUNCTION asignar_periodo_asignacion()
+RETURNS TRIGGER AS $$
+BEGIN
+    SELECT daterange(fecha_inicio, fecha_fin, '[]') INTO NEW.periodo FROM ciclos WHERE id = NEW.ciclo_id;
+    RETURN NEW;
+END;
+$$ language 'plpgsql';
+
+CREATE OR REPLACE FUNCTION actualizar_periodo_asignaciones()
+RETURNS TRIGGER AS $$
+BEGIN
+    UPDATE asignaciones SET periodo = daterange(NEW.fecha_inicio, NEW.fecha_fin, '[]')
+    WHERE ciclo_id = NEW.id;
+    RETURN NULL;
+END;
+$$ language 'plpgsql';
+
+-- Estado de un ciclo segun su cobertura por cargo: NO_DEFINIDO sin
+-- requerimientos, COMPLETO si cada requerimiento tiene al menos
+-- cantidad_necesaria trabajadores asignados de ese cargo, INCOMPLETO si no.
+-- Usa los contadores de cobertura para resolver sin queries los casos
+-- sin requerimientos o con menos asignados que requeridos en total.
+CREATE OR REPLACE FUNCTION recalcular_estado_ciclo(p_ciclo_id INTEGER)
+RETURNS VOID AS $$
+BEGIN
+    UPDATE ciclos c SET estado = e.estado
+    FROM (
+        SELECT id, CASE
+            WHEN requeridos = 0 THEN 'NO_DEFINIDO'
+            WHEN asignados < requeridos THEN 'INCOMPLETO'
+            WHEN EXISTS (
+                SELECT 1 FROM requerimientos r
+                WHERE r.ciclo_id = ciclos.id
+                  AND r.cantidad_necesaria > (
+                      SELECT COUNT(*) FROM asignaciones a
+                      JOIN trabajadores t ON t.id = a.trabajador_id
+                      WHERE a.ciclo_id = r.ciclo_id AND t.cargo_id = r.cargo_id
+                  )
+            ) THEN 'INCOMPLETO'
+            ELSE 'COMPLETO'
+        END::estado_ciclo AS estado
+        FROM ciclos
+        WHERE id = p_ciclo_id
+    ) e
+    WHERE c.id = e.id AND c.estado IS DISTINCT FROM e.estado;
+END;
+$$ language 'plpgsql';
+
+-- Cobertura denormalizada en ciclos: requeridos es la suma de
+-- requerimientos.cantidad_necesaria y asignados la cantidad de asignaciones.
+-- Se ajustan por diferencia en la misma transaccion del cambio, y luego se
+-- recalcula el estado del ciclo; el UPDATE bloquea la fila del ciclo, por
+-- lo que cambios concurrentes no se pisan. TRUNCATE no dispara estos
+-- triggers.
+CREATE OR REPLACE FUNCTION actualizar_requeridos_ciclo()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_OP <> 'INSERT' THEN
+        UPDATE ciclos SET requeridos = requeridos - OLD.cantidad_necesaria WHERE id = OLD.ciclo_id;
+        PERFORM recalcular_estado_ciclo(OLD.ciclo_id);
+    END IF;
+    IF TG_OP <> 'DELETE' THEN
+        UPDATE ciclos SET requeridos = requeridos + NEW.cantidad_necesaria WHERE id = NEW.ciclo_id;
+        PERFORM recalcular_estado_ciclo(NEW.ciclo_id);
+    END IF;
+    RETURN NULL;
+END;
+$$ language 'plpgsql';
+
+CREATE OR REPLACE FUNCTION actualizar_asignados_ciclo()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_OP <> 'INSERT' THEN
+        UPDATE ciclos SET asignados = asignados - 1 WHERE id = OLD.ciclo_id;
+        PERFORM recalcular_estado_ciclo(OLD.ciclo_id);
+    END IF;
+    IF TG_OP <> 'DELETE' THEN
+        UPDATE ciclos SET asignados = asignados + 1 WHERE id = NEW.ciclo_id;
+        PERFORM recalcular_estado_ciclo(NEW.ciclo_id);
+    END IF;
+    RETURN NULL;
+END;
+$$ language 'plpgsql';
+
+-- Un cambio de cargo del trabajador mueve su asignacion a otro requerimiento
+CREATE OR REPLACE FUNCTION actualizar_estado_ciclos_trabajador()
+RETURNS TRIGGER AS $$
+BEGIN
+    PERFORM recalcular_estado_ciclo(a.ciclo_id)
+    FROM asignaciones a
+    WHERE a.trabajador_id = NEW.id;
+    RETURN NULL;
+END;
+$$ language 'plpgsql';
+
+-- Triggers de cobertura y estado de ciclos
+CREATE TRIGGER cobertura_requerimientos AFTER INSERT OR DELETE OR UPDATE OF
+    ciclo_id, cargo_id, cantidad_necesaria
+    ON requerimientos
+    FOR EACH ROW EXECUTE FUNCTION actualizar_requeridos_ciclo();
+
+CREATE TRIGGER cobertura_asignaciones AFTER INSERT OR DELETE OR UPDATE OF
+    ciclo_id, trabajador_id
+    ON asignaciones
+    FOR EACH ROW EXECUTE FUNCTION actualizar_asignados_ciclo();
+
+-- Triggers del periodo de asignaciones
+CREATE TRIGGER periodo_asignaciones BEFORE INSERT OR UPDATE OF ciclo_id ON asignaciones
+    FOR EACH ROW EXECUTE FUNCTION asignar_periodo_asignacion();
+
+CREATE TRIGGER periodo_ciclos AFTER UPDATE OF fecha_inicio, fecha_fin ON ciclos
+    FOR EACH ROW
+    WHEN (OLD.fecha_inicio IS DISTINCT FROM NEW.fecha_inicio OR OLD.fecha_fin IS DISTINCT FROM NEW.fecha_fin)
+    EXECUTE FUNCTION actualizar_periodo_asignaciones();
+
+CREATE TRIGGER estado_ciclos_trabajador AFTER UPDATE OF cargo_id ON trabajadores
+    FOR EACH ROW WHEN (OLD.cargo_id IS DISTINCT FROM NEW.cargo_id)
+    EXECUTE FUNCTION actualizar_estado_ciclos_trabajador();
+
+-- Los proyectos asignados van en el access token (claim proy): al cambiar
+-- se incrementa token_version para que los tokens emitidos antes dejen de
+-- aceptarse (notificar_usuarios avisa a las demas instancias)
+CREATE OR REPLACE FUNCTION revocar_tokens_usuario_proyectos()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_OP <> 'DELETE' THEN
+        UPDATE usuarios SET token_version = token_version + 1 WHERE id = NEW.usuario_id;
+    END IF;
+    IF TG_OP = 'DELETE' OR (TG_OP = 'UPDATE' AND OLD.usuario_id <> NEW.usuario_id) THEN
+        UPDATE usuarios SET token_version = token_version + 1 WHERE id = OLD.usuario_id;
+    END IF;
+    RETURN NULL;
+END;
+$$ language 'plpgsql';
+
+CREATE TRIGGER tokens_usuarios_proyectos AFTER INSERT OR DELETE OR UPDATE OF
+    usuario_id, proyecto_id
+    ON usuarios_proyectos
+    FOR EACH ROW EXECUTE FUNCTION revocar_tokens_usuario_proyectos();
+
+-- Aviso de cambios por NOTIFY (canal cache_invalidacion) para que cada
+-- instancia invalide sus caches en memoria. Los argumentos del trigger son
+-- las columnas que identifican lo cambiado; se envian las de la fila nueva
+-- y, si difieren, tambien las de la anterior.
+CREATE OR REPLACE FUNCTION notificar_cambio()
+RETURNS TRIGGER AS $$
+DECLARE
+    anterior JSONB;
+    nueva JSONB;
+BEGIN
+    IF TG_OP <> 'INSERT' THEN
+        SELECT jsonb_object_agg(k, to_jsonb(OLD) -> k) INTO anterior FROM unnest(TG_ARGV) AS k;
+    END IF;
+    IF TG_OP <> 'DELETE' THEN
+        SELECT jsonb_object_agg(k, to_jsonb(NEW) -> k) INTO nueva FROM unnest(TG_ARGV) AS k;
+    END IF;
+
+    IF nueva IS NOT NULL THEN
+        PERFORM pg_notify('cache_invalidacion', jsonb_build_object('tabla', TG_TABLE_NAME, 'claves', nueva)::TEXT);
+    END IF;
+    IF anterior IS NOT NULL AND anterior IS DISTINCT FROM nueva THEN
+        PERFORM pg_notify('cache_invalidacion', jsonb_build_object('tabla', TG_TABLE_NAME, 'claves', anterior)::TEXT);
+    END IF;
+    RETURN NULL;
+END;
+$$ language 'plpgsql';
+
+-- Triggers de aviso de cambios
+CREATE TRIGGER notificar_empresas AFTER INSERT OR UPDATE OR DELETE ON empresas
+    FOR EACH ROW EXECUTE FUNCTION notificar_cambio('id');
+
+CREATE TRIGGER notificar_servicios AFTER INSERT OR UPDATE OR DELETE ON servicios
+    FOR EACH ROW EXECUTE FUNCTION notificar_cambio('id');
+
+-- Sin last_login: su escritura en lote no invalida el cache de usuarios
+CREATE TRIGGER notificar_usuarios AFTER INSERT OR DELETE OR UPDATE OF
+    username, email, password_hash, nombre_completo, rol, empresa_id, cargo, is_active, token_version
+    ON usuarios
+    FOR EACH ROW EXECUTE FUNCTION notificar_cambio('id', 'token_version');
+
+CREATE TRIGGER notificar_proyectos AFTER INSERT OR UPDATE OR DELETE ON proyectos
+    FOR EACH ROW EXECUTE FUNCTION notificar_cambio('id');
+
+CREATE TRIGGER notificar_cargos AFTER INSERT OR UPDATE OR DELETE ON cargos
+    FOR EACH ROW EXECUTE FUNCTION notificar_cambio('proyecto_id');
+
+CREATE TRIGGER notificar_ciclos AFTER INSERT OR UPDATE OR DELETE ON ciclos
+    FOR EACH ROW EXECUTE FUNCTION notificar_cambio('id', 'contrato_id');
+
+CREATE TRIGGER notificar_asignaciones AFTER INSERT OR UPDATE OR DELETE ON asignaciones
+    FOR EACH ROW EXECUTE FUNCTION notificar_cambio('ciclo_id', 'trabajador_id');
+
+CREATE TRIGGER notificar_requerimientos AFTER INSERT OR UPDATE OR DELETE ON requerimientos
+    FOR EACH ROW EXECUTE FUNCTION notificar_cambio('ciclo_id');
+
+CREATE TRIGGER notificar_tokens_revocados AFTER INSERT ON tokens_revocados
+    FOR EACH ROW EXECUTE FUNCTION notificar_cambio('jti');
+
 -- ============================================================
 -- VISTAS
 -- ============================================================
@@ -270,16 +498,13 @@ SELECT
     c.fecha_inicio,
     c.fecha_fin,
     c.estado,
-    COALESCE(SUM(r.cantidad_necesaria), 0) AS requeridos,
-    COUNT(DISTINCT a.trabajador_id) AS asignados,
+    c.requeridos,
+    c.asignados,
     CASE
-        WHEN COALESCE(SUM(r.cantidad_necesaria), 0) = 0 THEN 0
-        ELSE ROUND((COUNT(DISTINCT a.trabajador_id)::DECIMAL / SUM(r.cantidad_necesaria)) * 100, 2)
+        WHEN c.requeridos = 0 THEN 0
+        ELSE ROUND((c.asignados::DECIMAL / c.requeridos) * 100, 2)
     END AS porcentaje_cobertura
-FROM ciclos c
-LEFT JOIN requerimientos r ON c.id = r.ciclo_id
-LEFT JOIN asignaciones a ON c.id = a.ciclo_id
-GROUP BY c.id, c.contrato_id, c.letra, c.fecha_inicio, c.fecha_fin, c.estado;
+FROM ciclos c;
 
 -- Vista de dotacion por proyecto
 CREATE OR REPLACE VIEW v_dotacion_proyecto AS
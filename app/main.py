@@ -3,15 +3,47 @@ EMSA Gestion de Turnos - API Backend
 Entry point de la aplicacion FastAPI
 """
 
-from fastapi import FastAPI
+import asyncio
+import logging
+import time
+from contextlib import asynccontextmanager
+
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
 
 from app.config import get_settings
-from app.routers import (auth, ciclos, empresas, proyectos, servicios,
-                         trabajadores, usuarios)
+from app.database import MedicionSQL, medicion_sql
+from app.routers import (auth, ciclos, contratos, empresas, proyectos,
+                         servicios, trabajadores, usuarios)
+from app.utils.invalidacion import escuchar
+from app.utils.revocacion import revocaciones
+from app.utils.ultimo_login import ultimos_login
 
 settings = get_settings()
 
+logger = logging.getLogger(__name__)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Tareas de fondo mientras la aplicacion esta activa"""
+    # Filtro de tokens revocados: carga inicial y recarga periodica
+    recarga_revocaciones = asyncio.create_task(
+        revocaciones.mantener(settings.revocacion_recarga_segundos)
+    )
+    # last_login acumulados por /auth/login
+    escritura_logins = asyncio.create_task(
+        ultimos_login.mantener(settings.last_login_intervalo_segundos)
+    )
+    # Avisos de cambios hechos por otras instancias (LISTEN/NOTIFY)
+    invalidacion_caches = asyncio.create_task(escuchar())
+    yield
+    invalidacion_caches.cancel()
+    recarga_revocaciones.cancel()
+    escritura_logins.cancel()
+    await ultimos_login.vaciar()
+
+
 # Crear aplicacion FastAPI
 app = FastAPI(
     title=settings.app_name,
@@ -19,6 +51,7 @@ app = FastAPI(
     description="API REST para gestion de turnos y dotacion de operaciones mineras",
     docs_url="/docs",
     redoc_url="/redoc",
+    lifespan=lifespan,
 )
 
 # Configurar CORS
@@ -31,6 +64,44 @@ app.add_middleware(
 )
 
 
+if settings.sql_instrumentacion:
+
+    @app.middleware("http")
+    async def instrumentar_sql(request: Request, call_next):
+        """
+        Mide las queries de cada request: las expone en el header
+        Server-Timing y avisa si un statement se repite (posible N+1).
+        """
+        medicion = MedicionSQL()
+        token = medicion_sql.set(medicion)
+        inicio = time.perf_counter()
+        try:
+            response = await call_next(request)
+        finally:
+            medicion_sql.reset(token)
+        total_ms = (time.perf_counter() - inicio) * 1000
+
+        response.headers["Server-Timing"] = (
+            f'db;dur={medicion.duracion_ms:.1f};desc="{medicion.queries} queries", '
+            f"total;dur={total_ms:.1f}"
+        )
+
+        repetidos = medicion.repetidos(settings.sql_repeticiones_max)
+        if repetidos:
+            route = request.scope.get("route")
+            ruta = route.path if route else request.url.path
+            for sql, veces in repetidos:
+                logger.warning(
+                    "Posible N+1 en %s %s: statement ejecutado %d veces: %s",
+                    request.method,
+                    ruta,
+                    veces,
+                    sql[:300],
+                )
+
+        return response
+
+
 @app.get("/")
 async def root():
     """Endpoint raiz"""
@@ -58,6 +129,9 @@ app.include_router(
 app.include_router(
     proyectos.router, prefix=f"{settings.api_v1_prefix}/proyectos", tags=["proyectos"]
 )
+app.include_router(
+    contratos.router, prefix=f"{settings.api_v1_prefix}/contratos", tags=["contratos"]
+)
 app.include_router(
     ciclos.router, prefix=f"{settings.api_v1_prefix}/ciclos", tags=["ciclos"]
 )
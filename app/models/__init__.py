@@ -9,6 +9,7 @@ from app.models.contrato import Contrato
 from app.models.empresa import Empresa
 from app.models.proyecto import Proyecto
 from app.models.servicio import Servicio
+from app.models.token_revocado import TokenRevocado
 from app.models.trabajador import Trabajador
 from app.models.usuario import Usuario
 
@@ -23,4 +24,5 @@ __all__ = [
     "Ciclo",
     "Asignacion",
     "Requerimiento",
+    "TokenRevocado",
 ]
@@ -3,7 +3,9 @@ Modelos Asignacion y Requerimiento
 """
 
 from sqlalchemy import Column, DateTime, ForeignKey, Integer, UniqueConstraint
+from sqlalchemy.dialects.postgresql import DATERANGE
 from sqlalchemy.orm import relationship
+from sqlalchemy.schema import FetchedValue
 from sqlalchemy.sql import func
 
 from app.database import Base
@@ -43,6 +45,9 @@ class Asignacion(Base):
     )
     fecha_asignacion = Column(DateTime(timezone=True), server_default=func.now())
     created_at = Column(DateTime(timezone=True), server_default=func.now())
+    # Fechas del ciclo (inclusive): las copia un trigger al insertar y se usan
+    # en el constraint asignaciones_sin_solapamiento y su indice GiST
+    periodo = Column(DATERANGE, server_default=FetchedValue())
 
     # Constraint unico
     __table_args__ = (
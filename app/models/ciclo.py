@@ -5,7 +5,7 @@ Modelo Ciclo
 import enum
 
 from sqlalchemy import (Column, Date, DateTime, Enum, ForeignKey, Integer,
-                        String)
+                        String, UniqueConstraint)
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 
@@ -30,11 +30,28 @@ class Ciclo(Base):
     letra = Column(String(1), nullable=False)  # A, B, C, D
     fecha_inicio = Column(Date, nullable=False)
     fecha_fin = Column(Date, nullable=False)
-    estado = Column(Enum(EstadoCiclo), default=EstadoCiclo.NO_DEFINIDO, index=True)
+    # Lo recalculan triggers de la DB al cambiar requerimientos, asignaciones
+    # o el cargo de un trabajador asignado (recalcular_estado_ciclo)
+    estado = Column(
+        Enum(EstadoCiclo, name="estado_ciclo"),
+        default=EstadoCiclo.NO_DEFINIDO,
+        index=True,
+    )
     horario = Column(String(10), default="DIA")  # DIA o NOCHE
+    # Cobertura: suma de cantidad_necesaria de sus requerimientos y cantidad
+    # de asignaciones. Las mantienen triggers de la DB (sql/001_schema.sql).
+    requeridos = Column(Integer, nullable=False, server_default="0")
+    asignados = Column(Integer, nullable=False, server_default="0")
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
 
+    # Constraint unico (generacion de ciclos con ON CONFLICT DO NOTHING)
+    __table_args__ = (
+        UniqueConstraint(
+            "contrato_id", "letra", "fecha_inicio", "fecha_fin", name="unique_ciclo"
+        ),
+    )
+
     # Relaciones
     contrato = relationship("Contrato", back_populates="ciclos")
     asignaciones = relationship("Asignacion", back_populates="ciclo")
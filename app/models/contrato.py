@@ -28,7 +28,11 @@ class Contrato(Base):
     proyecto_id = Column(Integer, ForeignKey("proyectos.id"), nullable=False)
     servicio_id = Column(Integer, ForeignKey("servicios.id"), nullable=False)
     empresa_id = Column(Integer, ForeignKey("empresas.id"), nullable=False)
-    tipo_turnos = Column(Enum(TipoTurnos), nullable=False, default=TipoTurnos.ABCD)
+    tipo_turnos = Column(
+        Enum(TipoTurnos, name="tipo_turnos"),
+        nullable=False,
+        default=TipoTurnos.ABCD,
+    )
     patron = Column(String(10), nullable=False, default="7x7")
     activo = Column(Boolean, default=True, index=True)
     fecha_inicio = Column(Date)
@@ -0,0 +1,19 @@
+"""
+Modelo TokenRevocado
+"""
+
+from sqlalchemy import Column, DateTime, String
+
+from app.database import Base
+
+
+class TokenRevocado(Base):
+    """
+    jti de tokens JWT, o sid de sesiones, invalidados antes de su
+    expiracion (logout)
+    """
+
+    __tablename__ = "tokens_revocados"
+
+    jti = Column(String(32), primary_key=True)
+    expira = Column(DateTime(timezone=True), nullable=False, index=True)
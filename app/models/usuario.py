@@ -41,10 +41,17 @@ class Usuario(Base):
     email = Column(String(200), unique=True, nullable=False, index=True)
     password_hash = Column(String(255), nullable=False)
     nombre_completo = Column(String(200))
-    rol = Column(Enum(RolUsuario), nullable=False, default=RolUsuario.CONTRATISTA)
+    rol = Column(
+        Enum(RolUsuario, name="rol_usuario"),
+        nullable=False,
+        default=RolUsuario.CONTRATISTA,
+    )
     empresa_id = Column(Integer, ForeignKey("empresas.id"))
     cargo = Column(String(100))
     is_active = Column(Boolean, default=True)
+    # Se incrementa al cambiar rol, empresa o estado: invalida los access
+    # tokens emitidos antes (sus claims quedaron obsoletos)
+    token_version = Column(Integer, nullable=False, default=0, server_default="0")
     last_login = Column(DateTime(timezone=True))
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
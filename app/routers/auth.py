@@ -2,51 +2,136 @@
 Router de autenticacion
 """
 
+import time
+import uuid
 from datetime import datetime
-from typing import Annotated
+from typing import Annotated, Callable, Optional
 
 from fastapi import APIRouter, Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
-from sqlalchemy.orm import Session
+from pydantic import ValidationError
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import joinedload
 
+from app.config import get_settings
 from app.database import get_db
-from app.models import Usuario
-from app.schemas.auth import LoginRequest, Token, UserResponse
+from app.models import Empresa, Usuario
+from app.models.usuario import RolUsuario, usuarios_proyectos
+from app.schemas.auth import (LoginRequest, RefreshRequest, Token,
+                              UserResponse, UsuarioToken)
+from app.utils.cache import TTLCache, invalidar_al_confirmar
+from app.utils.invalidacion import invalidar_al_notificar
+from app.utils.permissions import ROLE_MASKS, Permission, permission_mask
+from app.utils.revocacion import revocaciones
 from app.utils.security import (create_access_token, create_refresh_token,
-                                decode_token, verify_password)
+                                decode_token, verify_password_async)
+from app.utils.ultimo_login import ultimos_login
+
+settings = get_settings()
 
 router = APIRouter()
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="api/v1/auth/login")
 
+# Usuario autenticado (con su empresa) por id, desacoplado de la sesion.
+# Se invalida al confirmar cambios del usuario (update_usuario,
+# delete_usuario) o de cualquier empresa, y por los avisos de cambios de
+# otras instancias; el TTL cubre avisos perdidos.
+usuarios_cache = TTLCache(maxsize=1024, ttl=settings.usuario_cache_ttl)
 
-async def get_current_user(
-    token: Annotated[str, Depends(oauth2_scheme)], db: Session = Depends(get_db)
-) -> Usuario:
-    """Obtiene el usuario actual desde el token JWT"""
-    credentials_exception = HTTPException(
+invalidar_al_confirmar(Usuario, usuarios_cache, lambda u: [u.id])
+invalidar_al_confirmar(Empresa, usuarios_cache, lambda e: None)
+invalidar_al_notificar("usuarios", usuarios_cache, lambda u: [u["id"]])
+invalidar_al_notificar("empresas", usuarios_cache, lambda e: None)
+
+TOKEN_OBSOLETO = "Sesión desactualizada, inicie sesión nuevamente"
+
+
+def _credenciales_invalidas(detail: str = "Credenciales inválidas") -> HTTPException:
+    return HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
-        detail="Credenciales inválidas",
+        detail=detail,
         headers={"WWW-Authenticate": "Bearer"},
     )
 
+
+def _leer_token(token: str, refresh: bool = False) -> tuple[int, dict]:
+    """Decodifica un access (o refresh) token y retorna (user_id, payload)"""
     payload = decode_token(token)
-    if payload is None:
-        raise credentials_exception
+    # Un refresh token no sirve como access token y viceversa
+    if payload is None or (payload.get("type") == "refresh") != refresh:
+        raise _credenciales_invalidas()
 
     user_id_str = payload.get("sub")
     if user_id_str is None:
-        raise credentials_exception
+        raise _credenciales_invalidas()
 
     # Convertir sub de string a int para la query
     try:
         user_id = int(user_id_str)
     except (ValueError, TypeError):
-        raise credentials_exception
+        raise _credenciales_invalidas()
+
+    return user_id, payload
+
 
-    user = db.query(Usuario).filter(Usuario.id == user_id).first()
+async def claims_acceso(db: AsyncSession, user: Usuario) -> dict:
+    """
+    Claims del access token: identidad, rol, empresa y proyectos asignados.
+
+    Si cambia alguno de estos datos hay que incrementar token_version para
+    que los tokens ya emitidos dejen de aceptarse (update_usuario lo hace
+    para rol, empresa y activo; el trigger tokens_usuarios_proyectos para
+    los proyectos asignados).
+    """
+    proyecto_ids = await db.scalars(
+        select(usuarios_proyectos.c.proyecto_id)
+        .where(usuarios_proyectos.c.usuario_id == user.id)
+        .order_by(usuarios_proyectos.c.proyecto_id)
+    )
+    return {
+        "sub": str(user.id),
+        "email": user.email,
+        "rol": user.rol.value,
+        "emp": user.empresa_id,
+        "proy": list(proyecto_ids),
+        "ver": user.token_version,
+    }
+
+
+async def _verificar_no_revocado(db: AsyncSession, payload: dict) -> None:
+    """401 si el token o su sesion fueron revocados (logout)"""
+    # Los tokens emitidos antes de agregar jti (o sid) no se pueden revocar
+    for clave in (payload.get("jti"), payload.get("sid")):
+        if clave is not None and await revocaciones.esta_revocado(db, clave):
+            raise _credenciales_invalidas("Sesión cerrada")
+
+
+async def _usuario_activo(
+    db: AsyncSession, user_id: int, fresco: bool = False
+) -> Usuario:
+    """
+    Usuario (con su empresa) desde usuarios_cache o la DB; 401 si no esta
+    activo. Con fresco=True siempre se lee de la DB (y se renueva el cache).
+    """
+    user = None if fresco else usuarios_cache.get(user_id)
     if user is None:
-        raise credentials_exception
+        # La empresa se carga en la misma query (no hay lazy load en AsyncSession)
+        user = await db.scalar(
+            select(Usuario)
+            .options(joinedload(Usuario.empresa))
+            .where(Usuario.id == user_id)
+        )
+        if user is None:
+            raise _credenciales_invalidas()
+
+        # Fuera de la sesion: el objeto se comparte entre requests y no debe
+        # ser el mismo que retorne un db.get() de esta request
+        if user.empresa is not None:
+            db.expunge(user.empresa)
+        db.expunge(user)
+        usuarios_cache.set(user_id, user)
 
     if not user.is_active:
         raise HTTPException(
@@ -56,19 +141,155 @@ async def get_current_user(
     return user
 
 
+async def get_current_user(
+    token: Annotated[str, Depends(oauth2_scheme)], db: AsyncSession = Depends(get_db)
+) -> Usuario:
+    """Obtiene el usuario actual desde el token JWT"""
+    user_id, payload = _leer_token(token)
+    await _verificar_no_revocado(db, payload)
+    user = await _usuario_activo(db, user_id)
+
+    if payload.get("ver", 0) < user.token_version:
+        raise _credenciales_invalidas(TOKEN_OBSOLETO)
+
+    return user
+
+
+async def _usuario_token(
+    db: AsyncSession, token: str, fresco: bool = False
+) -> UsuarioToken:
+    """Usuario de los claims del token, verificado contra token_version"""
+    user_id, payload = _leer_token(token)
+    await _verificar_no_revocado(db, payload)
+
+    # Tokens emitidos antes de incluir los claims
+    if "rol" not in payload:
+        raise _credenciales_invalidas(TOKEN_OBSOLETO)
+
+    try:
+        usuario = UsuarioToken(
+            id=user_id,
+            rol=payload["rol"],
+            empresa_id=payload.get("emp"),
+            proyecto_ids=payload.get("proy") or [],
+            version=payload.get("ver", 0),
+        )
+    except ValidationError:
+        raise _credenciales_invalidas()
+
+    user = await _usuario_activo(db, user_id, fresco)
+    if usuario.version < user.token_version:
+        raise _credenciales_invalidas(TOKEN_OBSOLETO)
+    # Leido de la DB, rol y empresa deben coincidir aunque token_version no
+    # se haya incrementado (p.ej. un cambio hecho directamente en la DB)
+    if fresco and (usuario.rol, usuario.empresa_id) != (user.rol, user.empresa_id):
+        raise _credenciales_invalidas(TOKEN_OBSOLETO)
+
+    return usuario
+
+
+async def get_usuario_token(
+    token: Annotated[str, Depends(oauth2_scheme)], db: AsyncSession = Depends(get_db)
+) -> UsuarioToken:
+    """
+    Obtiene el usuario actual desde los claims del token.
+
+    Para endpoints que solo necesitan autenticar o autorizar por rol,
+    empresa o proyectos asignados. La version del token se compara con
+    usuarios.token_version del usuario (usuarios_cache o, si no esta, la
+    DB), por lo que un token anterior a un cambio de rol, empresa,
+    proyectos o a una desactivacion se rechaza tambien en instancias que
+    partieron despues del cambio. La verificacion de revocacion solo
+    consulta la DB ante un acierto del filtro de Bloom.
+    """
+    return await _usuario_token(db, token)
+
+
+async def get_usuario_verificado(
+    token: Annotated[str, Depends(oauth2_scheme)], db: AsyncSession = Depends(get_db)
+) -> UsuarioToken:
+    """
+    Como get_usuario_token, pero el usuario siempre se lee de la DB (una
+    query por primary key): activo, token_version, rol y empresa vigentes
+    aunque el cache de esta instancia este desactualizado. Para endpoints
+    que modifican datos (ver requires).
+    """
+    return await _usuario_token(db, token, fresco=True)
+
+
+def requires(*permissions: Permission) -> Callable:
+    """
+    Dependency que exige todos los permisos dados.
+
+    La mascara se calcula una vez al declarar el endpoint; por request se
+    compara con la del rol del usuario, leido de la DB (ver
+    get_usuario_verificado). Retorna el usuario del token.
+
+    Uso:
+        current_user: Annotated[
+            UsuarioToken, Depends(requires(Permission.ASIGNACIONES_GESTIONAR))
+        ]
+
+    Raises:
+        HTTPException: 403 si el rol no tiene alguno de los permisos
+    """
+    required = permission_mask(permissions)
+    detail = "No tiene permiso para realizar esta accion: " + ", ".join(
+        p.value for p in permissions
+    )
+
+    async def verificar_permisos(
+        current_user: Annotated[UsuarioToken, Depends(get_usuario_verificado)]
+    ) -> UsuarioToken:
+        if (ROLE_MASKS.get(current_user.rol, 0) & required) != required:
+            raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail=detail)
+        return current_user
+
+    return verificar_permisos
+
+
+def requires_rol(*roles: RolUsuario) -> Callable:
+    """
+    Dependency que exige uno de los roles dados, para endpoints reservados
+    a roles y no a un permiso (p.ej. solo ADMIN). El rol se verifica
+    contra la DB (ver get_usuario_verificado). Retorna el usuario del token.
+
+    Uso:
+        current_user: Annotated[
+            UsuarioToken, Depends(requires_rol(RolUsuario.ADMIN))
+        ]
+
+    Raises:
+        HTTPException: 403 si el usuario no tiene ninguno de los roles
+    """
+    permitidos = frozenset(roles)
+    detail = "Se requiere uno de los roles: " + ", ".join(r.value for r in roles)
+
+    async def verificar_rol(
+        current_user: Annotated[UsuarioToken, Depends(get_usuario_verificado)]
+    ) -> UsuarioToken:
+        if current_user.rol not in permitidos:
+            raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail=detail)
+        return current_user
+
+    return verificar_rol
+
+
 @router.post("/login", response_model=Token)
 async def login(
     form_data: Annotated[OAuth2PasswordRequestForm, Depends()],
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
 ):
     """
     Login con email y password.
     Retorna access_token y refresh_token.
     """
     # Buscar usuario por email (username del form es el email)
-    user = db.query(Usuario).filter(Usuario.email == form_data.username).first()
+    user = await db.scalar(select(Usuario).where(Usuario.email == form_data.username))
 
-    if not user or not verify_password(form_data.password, user.password_hash):
+    if not user or not await verify_password_async(
+        form_data.password, user.password_hash
+    ):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Email o contraseña incorrectos",
@@ -80,13 +301,47 @@ async def login(
             status_code=status.HTTP_401_UNAUTHORIZED, detail="Usuario inactivo"
         )
 
-    # Actualizar last_login
-    user.last_login = datetime.utcnow()
-    db.commit()
+    # last_login se escribe en lote fuera de la request (ver ultimos_login)
+    ultimos_login.registrar(user.id, datetime.utcnow())
 
-    # Crear tokens (sub debe ser string según estándar JWT)
-    access_token = create_access_token(data={"sub": str(user.id), "email": user.email})
-    refresh_token = create_refresh_token(data={"sub": str(user.id)})
+    # Crear tokens (sub debe ser string según estándar JWT). Los tokens de
+    # esta sesion (incluidos los que emita /refresh) comparten sid, que es
+    # lo que revoca el logout
+    sesion = {"sub": str(user.id), "sid": uuid.uuid4().hex}
+    access_token = create_access_token(data=await claims_acceso(db, user) | sesion)
+    refresh_token = create_refresh_token(data=sesion)
+
+    return Token(
+        access_token=access_token, refresh_token=refresh_token, token_type="bearer"
+    )
+
+
+@router.post("/refresh", response_model=Token)
+async def refresh(data: RefreshRequest, db: AsyncSession = Depends(get_db)):
+    """
+    Emite un nuevo access token a partir de un refresh token, sin password.
+
+    Los claims se toman del usuario actual, por lo que tambien sirve para
+    obtener un token vigente despues de un cambio de rol o empresa. Con
+    refresh_token_rotacion se emite ademas un nuevo refresh token. Los
+    tokens emitidos mantienen el sid de la sesion.
+    """
+    user_id, payload = _leer_token(data.refresh_token, refresh=True)
+    # Sin sid el logout no podria revocarlo si el cliente no lo envia
+    if "sid" not in payload:
+        raise _credenciales_invalidas(TOKEN_OBSOLETO)
+    await _verificar_no_revocado(db, payload)
+    user = await _usuario_activo(db, user_id)
+
+    sesion = {"sub": str(user.id), "sid": payload["sid"]}
+    access_token = create_access_token(data=await claims_acceso(db, user) | sesion)
+    if settings.refresh_token_rotacion:
+        refresh_token = create_refresh_token(data=sesion)
+        # El refresh token usado queda invalidado
+        if "jti" in payload:
+            await revocaciones.revocar(db, payload["jti"], payload["exp"])
+    else:
+        refresh_token = data.refresh_token
 
     return Token(
         access_token=access_token, refresh_token=refresh_token, token_type="bearer"
@@ -112,9 +367,36 @@ async def get_me(current_user: Annotated[Usuario, Depends(get_current_user)]):
 
 
 @router.post("/logout")
-async def logout(current_user: Annotated[Usuario, Depends(get_current_user)]):
+async def logout(
+    token: Annotated[str, Depends(oauth2_scheme)],
+    current_user: Annotated[UsuarioToken, Depends(get_usuario_token)],
+    data: Optional[RefreshRequest] = None,
+    db: AsyncSession = Depends(get_db),
+):
     """
     Logout del usuario.
-    En una implementacion real, aqui se invalidaria el token.
+    Revoca la sesion (sid): el access token y todos los refresh tokens
+    emitidos desde el login, aunque no se envie el refresh token. Para
+    tokens sin sid revoca el access token y, si se envia, el refresh token.
     """
+    _, payload = _leer_token(token)
+    tokens = [payload]
+    if data is not None:
+        _, payload_refresh = _leer_token(data.refresh_token, refresh=True)
+        if payload_refresh.get("sub") != str(current_user.id):
+            raise _credenciales_invalidas()
+        tokens.append(payload_refresh)
+
+    # La sesion se revoca hasta que expire el ultimo refresh token que pudo
+    # emitir (con rotacion, /refresh emite uno nuevo en cada uso)
+    fin_sesion = time.time() + settings.refresh_token_expire_days * 86400
+    revocar = {}
+    for payload in tokens:
+        if "sid" in payload:
+            revocar[payload["sid"]] = fin_sesion
+        elif "jti" in payload:
+            revocar[payload["jti"]] = payload["exp"]
+    for clave, exp in revocar.items():
+        await revocaciones.revocar(db, clave, exp)
+
     return {"message": "Sesión cerrada exitosamente"}
@@ -5,15 +5,22 @@ Router de ciclos
 from typing import Annotated
 
 from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy import func
-from sqlalchemy.orm import Session
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import joinedload
 
 from app.database import get_db
-from app.models import Asignacion, Ciclo, Requerimiento, Usuario
-from app.routers.auth import get_current_user
+from app.models import Asignacion, Ciclo, Requerimiento, Trabajador
+from app.routers.auth import get_usuario_token, requires
 from app.schemas.asignacion import (AsignacionListResponse, AsignacionResponse,
+                                    ConflictoListResponse,
                                     RequerimientoListResponse,
-                                    RequerimientoResponse)
+                                    RequerimientoResponse,
+                                    ValidarAsignacionesRequest)
+from app.schemas.auth import UsuarioToken
+from app.utils.pagination import Paginacion, paginar
+from app.utils.permissions import Permission
+from app.utils.solapamientos import describir, validar_asignaciones
 
 router = APIRouter()
 
@@ -21,13 +28,13 @@ router = APIRouter()
 @router.get("/{ciclo_id}")
 async def get_ciclo(
     ciclo_id: int,
-    current_user: Annotated[Usuario, Depends(get_current_user)],
-    db: Session = Depends(get_db),
+    current_user: Annotated[UsuarioToken, Depends(get_usuario_token)],
+    db: AsyncSession = Depends(get_db),
 ):
     """
     Obtiene un ciclo por ID.
     """
-    ciclo = db.query(Ciclo).filter(Ciclo.id == ciclo_id).first()
+    ciclo = await db.get(Ciclo, ciclo_id)
 
     if not ciclo:
         raise HTTPException(
@@ -42,40 +49,52 @@ async def get_ciclo(
         "fecha_fin": ciclo.fecha_fin.isoformat(),
         "estado": ciclo.estado.value if ciclo.estado else "NO_DEFINIDO",
         "horario": ciclo.horario,
+        "requeridos": ciclo.requeridos,
+        "asignados": ciclo.asignados,
     }
 
 
 @router.get("/{ciclo_id}/requerimientos", response_model=RequerimientoListResponse)
 async def get_ciclo_requerimientos(
     ciclo_id: int,
-    current_user: Annotated[Usuario, Depends(get_current_user)],
-    db: Session = Depends(get_db),
+    current_user: Annotated[UsuarioToken, Depends(get_usuario_token)],
+    db: AsyncSession = Depends(get_db),
 ):
     """
     Lista los requerimientos de un ciclo.
     """
-    ciclo = db.query(Ciclo).filter(Ciclo.id == ciclo_id).first()
+    ciclo = await db.get(Ciclo, ciclo_id)
     if not ciclo:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail="Ciclo no encontrado"
         )
 
     requerimientos = (
-        db.query(Requerimiento).filter(Requerimiento.ciclo_id == ciclo_id).all()
-    )
+        await db.scalars(
+            select(Requerimiento)
+            .options(joinedload(Requerimiento.cargo))
+            .where(Requerimiento.ciclo_id == ciclo_id)
+        )
+    ).all()
+
+    # Asignados por cargo en una query agrupada; ciclo.asignados (mantenido
+    # por triggers) evita la query si el ciclo no tiene asignaciones
+    asignados_por_cargo = {}
+    if requerimientos and ciclo.asignados > 0:
+        asignados_por_cargo = dict(
+            (
+                await db.execute(
+                    select(Trabajador.cargo_id, func.count(Asignacion.id))
+                    .join(Asignacion.trabajador)
+                    .where(Asignacion.ciclo_id == ciclo_id)
+                    .group_by(Trabajador.cargo_id)
+                )
+            ).all()
+        )
 
     result = []
     for r in requerimientos:
-        # Contar asignados para este cargo en este ciclo
-        cantidad_asignada = (
-            db.query(func.count(Asignacion.id))
-            .join(Asignacion.trabajador)
-            .filter(
-                Asignacion.ciclo_id == ciclo_id,
-                Asignacion.trabajador.has(cargo_id=r.cargo_id),
-            )
-            .scalar()
-        )
+        cantidad_asignada = asignados_por_cargo.get(r.cargo_id, 0)
 
         result.append(
             RequerimientoResponse(
@@ -97,19 +116,27 @@ async def get_ciclo_requerimientos(
 @router.get("/{ciclo_id}/asignaciones", response_model=AsignacionListResponse)
 async def get_ciclo_asignaciones(
     ciclo_id: int,
-    current_user: Annotated[Usuario, Depends(get_current_user)],
-    db: Session = Depends(get_db),
+    current_user: Annotated[UsuarioToken, Depends(get_usuario_token)],
+    paginacion: Annotated[Paginacion, Depends()],
+    db: AsyncSession = Depends(get_db),
 ):
     """
-    Lista las asignaciones de un ciclo.
+    Lista las asignaciones de un ciclo. Paginado por cursor.
     """
-    ciclo = db.query(Ciclo).filter(Ciclo.id == ciclo_id).first()
+    ciclo = await db.get(Ciclo, ciclo_id)
     if not ciclo:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail="Ciclo no encontrado"
         )
 
-    asignaciones = db.query(Asignacion).filter(Asignacion.ciclo_id == ciclo_id).all()
+    asignaciones, next_cursor = await paginar(
+        db,
+        select(Asignacion)
+        .options(joinedload(Asignacion.trabajador).joinedload(Trabajador.cargo))
+        .where(Asignacion.ciclo_id == ciclo_id),
+        (Asignacion.id,),
+        paginacion,
+    )
 
     result = []
     for a in asignaciones:
@@ -133,4 +160,31 @@ async def get_ciclo_asignaciones(
             )
         )
 
-    return AsignacionListResponse(data=result)
+    return AsignacionListResponse(data=result, next_cursor=next_cursor)
+
+
+@router.post("/{ciclo_id}/asignaciones/validar", response_model=ConflictoListResponse)
+async def validar_asignaciones_ciclo(
+    ciclo_id: int,
+    candidatos: ValidarAsignacionesRequest,
+    current_user: Annotated[
+        UsuarioToken,
+        Depends(requires(Permission.ASIGNACIONES_GESTIONAR)),
+    ],
+    db: AsyncSession = Depends(get_db),
+):
+    """
+    Verifica si asignar los trabajadores al ciclo los dejaria en dos ciclos
+    que se cruzan. No modifica datos; una lista vacia indica que se pueden
+    asignar. Requiere el permiso ASIGNACIONES_GESTIONAR.
+    """
+    ciclo = await db.get(Ciclo, ciclo_id)
+    if not ciclo:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail="Ciclo no encontrado"
+        )
+
+    solapamientos = await validar_asignaciones(
+        db, [(t, ciclo_id) for t in dict.fromkeys(candidatos.trabajador_ids)]
+    )
+    return ConflictoListResponse(data=await describir(db, solapamientos))
@@ -0,0 +1,70 @@
+"""
+Router de contratos
+"""
+
+from typing import Annotated
+
+from fastapi import APIRouter, Depends, HTTPException, status
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.database import get_db
+from app.models import Contrato
+from app.routers.auth import requires
+from app.schemas.auth import UsuarioToken
+from app.schemas.ciclo import GenerarCiclosRequest, GenerarCiclosResponse
+from app.utils.permissions import Permission, require_proyecto
+from app.utils.rotacion import generar_ciclos
+
+router = APIRouter()
+
+# Rango maximo de una generacion de ciclos (dos anios)
+MAX_DIAS_GENERACION = 731
+
+
+@router.post(
+    "/{contrato_id}/ciclos/generar",
+    response_model=GenerarCiclosResponse,
+    status_code=status.HTTP_201_CREATED,
+)
+async def generar_ciclos_contrato(
+    contrato_id: int,
+    rango: GenerarCiclosRequest,
+    current_user: Annotated[
+        UsuarioToken,
+        Depends(requires(Permission.CICLOS_CREAR)),
+    ],
+    db: AsyncSession = Depends(get_db),
+):
+    """
+    Genera los ciclos del contrato entre desde y hasta segun su patron
+    (p.ej. 7x7) y tipo de turnos (AB o ABCD), con letra y horario DIA/NOCHE.
+    Los ciclos que ya existen se omiten, por lo que se puede repetir. La
+    rotacion se ancla en la fecha de inicio del contrato (400 si no tiene).
+    Requiere el permiso CICLOS_CREAR y acceso al proyecto del contrato.
+    """
+    if rango.hasta < rango.desde:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="La fecha hasta debe ser posterior a desde",
+        )
+    if (rango.hasta - rango.desde).days > MAX_DIAS_GENERACION:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"El rango no puede superar {MAX_DIAS_GENERACION} dias",
+        )
+
+    contrato = await db.get(Contrato, contrato_id)
+    if not contrato:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail="Contrato no encontrado"
+        )
+    require_proyecto(current_user, contrato.proyecto_id)
+
+    try:
+        creados, omitidos = await generar_ciclos(db, contrato, rango.desde, rango.hasta)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    await db.commit()
+
+    # Los ciclos vienen completos del RETURNING (estado incluido)
+    return GenerarCiclosResponse(data=creados, omitidos=omitidos)
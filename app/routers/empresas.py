@@ -5,43 +5,48 @@ Router de empresas
 from typing import Annotated
 
 from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.database import get_db
-from app.models import Empresa, Usuario
+from app.models import Empresa
 from app.models.usuario import RolUsuario
-from app.routers.auth import get_current_user
+from app.routers.auth import get_usuario_token, requires_rol
+from app.schemas.auth import UsuarioToken
 from app.schemas.empresa import (EmpresaCreate, EmpresaListResponse,
                                  EmpresaResponse, EmpresaUpdate)
+from app.utils.pagination import Paginacion, paginar
+from app.utils.referencias import referencias
 
 router = APIRouter()
 
 
-def require_admin(current_user: Usuario) -> None:
-    """Verifica que el usuario sea ADMIN"""
-    if current_user.rol != RolUsuario.ADMIN:
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="Se requieren permisos de administrador",
-        )
-
-
 @router.get("", response_model=EmpresaListResponse)
 async def get_empresas(
-    current_user: Annotated[Usuario, Depends(get_current_user)],
-    db: Session = Depends(get_db),
+    current_user: Annotated[UsuarioToken, Depends(get_usuario_token)],
+    paginacion: Annotated[Paginacion, Depends()],
+    db: AsyncSession = Depends(get_db),
     activo: bool = None,
 ):
     """
     Lista todas las empresas.
-    Opcionalmente filtrar por estado activo.
+    Opcionalmente filtrar por estado activo. Paginado por cursor.
+    Se sirve desde el JSON ya serializado del cache de referencias.
     """
-    query = db.query(Empresa)
+    refs = await referencias.obtener(db)
+    pagina = refs.empresas.pagina(paginacion, activo)
+    if pagina is not None:
+        return pagina
+
+    # Cursor de una fila que ya no esta en el cache: paginar con la DB
+    query = select(Empresa)
 
     if activo is not None:
-        query = query.filter(Empresa.activo == activo)
+        query = query.where(Empresa.activo == activo)
 
-    empresas = query.order_by(Empresa.nombre).all()
+    empresas, next_cursor = await paginar(
+        db, query, (Empresa.nombre, Empresa.id), paginacion
+    )
 
     return EmpresaListResponse(
         data=[
@@ -55,20 +60,21 @@ async def get_empresas(
                 updated_at=e.updated_at,
             )
             for e in empresas
-        ]
+        ],
+        next_cursor=next_cursor,
     )
 
 
 @router.get("/{empresa_id}", response_model=EmpresaResponse)
 async def get_empresa(
     empresa_id: int,
-    current_user: Annotated[Usuario, Depends(get_current_user)],
-    db: Session = Depends(get_db),
+    current_user: Annotated[UsuarioToken, Depends(get_usuario_token)],
+    db: AsyncSession = Depends(get_db),
 ):
     """
     Obtiene una empresa por ID.
     """
-    empresa = db.query(Empresa).filter(Empresa.id == empresa_id).first()
+    empresa = await db.get(Empresa, empresa_id)
 
     if not empresa:
         raise HTTPException(
@@ -89,17 +95,18 @@ async def get_empresa(
 @router.post("", response_model=EmpresaResponse, status_code=status.HTTP_201_CREATED)
 async def create_empresa(
     empresa_data: EmpresaCreate,
-    current_user: Annotated[Usuario, Depends(get_current_user)],
-    db: Session = Depends(get_db),
+    current_user: Annotated[
+        UsuarioToken,
+        Depends(requires_rol(RolUsuario.ADMIN)),
+    ],
+    db: AsyncSession = Depends(get_db),
 ):
     """
     Crea una nueva empresa.
     Solo usuarios ADMIN pueden crear empresas.
     """
-    require_admin(current_user)
-
     # Verificar que el RUT no exista
-    if db.query(Empresa).filter(Empresa.rut == empresa_data.rut).first():
+    if await db.scalar(select(Empresa).where(Empresa.rut == empresa_data.rut)):
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Ya existe una empresa con este RUT",
@@ -114,8 +121,9 @@ async def create_empresa(
     )
 
     db.add(nueva_empresa)
-    db.commit()
-    db.refresh(nueva_empresa)
+    await db.commit()
+    referencias.invalidar()
+    await db.refresh(nueva_empresa)
 
     return EmpresaResponse(
         id=nueva_empresa.id,
@@ -132,16 +140,17 @@ async def create_empresa(
 async def update_empresa(
     empresa_id: int,
     empresa_data: EmpresaUpdate,
-    current_user: Annotated[Usuario, Depends(get_current_user)],
-    db: Session = Depends(get_db),
+    current_user: Annotated[
+        UsuarioToken,
+        Depends(requires_rol(RolUsuario.ADMIN)),
+    ],
+    db: AsyncSession = Depends(get_db),
 ):
     """
     Actualiza una empresa existente.
     Solo usuarios ADMIN pueden actualizar empresas.
     """
-    require_admin(current_user)
-
-    empresa = db.query(Empresa).filter(Empresa.id == empresa_id).first()
+    empresa = await db.get(Empresa, empresa_id)
 
     if not empresa:
         raise HTTPException(
@@ -150,7 +159,7 @@ async def update_empresa(
 
     # Verificar unicidad de RUT si se está actualizando
     if empresa_data.rut and empresa_data.rut != empresa.rut:
-        if db.query(Empresa).filter(Empresa.rut == empresa_data.rut).first():
+        if await db.scalar(select(Empresa).where(Empresa.rut == empresa_data.rut)):
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail="Ya existe una empresa con este RUT",
@@ -166,8 +175,9 @@ async def update_empresa(
     if empresa_data.activo is not None:
         empresa.activo = empresa_data.activo
 
-    db.commit()
-    db.refresh(empresa)
+    await db.commit()
+    referencias.invalidar()
+    await db.refresh(empresa)
 
     return EmpresaResponse(
         id=empresa.id,
@@ -183,16 +193,17 @@ async def update_empresa(
 @router.delete("/{empresa_id}", status_code=status.HTTP_204_NO_CONTENT)
 async def delete_empresa(
     empresa_id: int,
-    current_user: Annotated[Usuario, Depends(get_current_user)],
-    db: Session = Depends(get_db),
+    current_user: Annotated[
+        UsuarioToken,
+        Depends(requires_rol(RolUsuario.ADMIN)),
+    ],
+    db: AsyncSession = Depends(get_db),
 ):
     """
     Elimina una empresa (soft delete).
     Solo usuarios ADMIN pueden eliminar empresas.
     """
-    require_admin(current_user)
-
-    empresa = db.query(Empresa).filter(Empresa.id == empresa_id).first()
+    empresa = await db.get(Empresa, empresa_id)
 
     if not empresa:
         raise HTTPException(
@@ -201,6 +212,7 @@ async def delete_empresa(
 
     # Soft delete
     empresa.activo = False
-    db.commit()
+    await db.commit()
+    referencias.invalidar()
 
     return None
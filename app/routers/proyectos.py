@@ -2,28 +2,52 @@
 Router de proyectos
 """
 
-from datetime import date
+from calendar import monthrange
+from collections import defaultdict
+from datetime import date, timedelta
 from typing import Annotated
 
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy import func
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, Query, Response, status
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from sqlalchemy import exists, func, inspect, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import aliased, joinedload
 
 from app.database import get_db
-from app.models import (Asignacion, Cargo, Ciclo, Contrato, Proyecto,
-                        Requerimiento, Trabajador, Usuario)
+from app.models import (Asignacion, Cargo, Ciclo, Contrato, Empresa, Proyecto,
+                        Trabajador)
+from app.models.ciclo import EstadoCiclo
 from app.models.usuario import RolUsuario
-from app.routers.auth import get_current_user
+from app.routers.auth import get_usuario_token, requires, requires_rol
+from app.schemas.asignacion import (AplicarDotacionRequest,
+                                    AplicarDotacionResponse,
+                                    AsignacionPropuesta, ConflictoListResponse,
+                                    DotacionRequest, PropuestaDotacionResponse,
+                                    RequerimientoFaltante)
+from app.schemas.auth import UsuarioToken
 from app.schemas.cargo import CargoListResponse, CargoResponse, CargoTreeNode
 from app.schemas.ciclo import (CicloCalendarioEvento, CicloCalendarioResponse,
                                CicloListResponse, CicloResponse,
                                CoberturaResponse)
-from app.schemas.contrato import ContratoListResponse, ContratoResponse
+from app.schemas.contrato import (ContratoListResponse, ContratoResponse,
+                                  RotacionContratoResponse,
+                                  RotacionMesResponse)
 from app.schemas.proyecto import (AlertaResponse, ContratoResumenResponse,
                                   PanelMandanteResponse, ProyectoListResponse,
                                   ProyectoResponse, StatsResponse)
 from app.schemas.trabajador import (TrabajadorCreate, TrabajadorListResponse,
                                     TrabajadorResponse)
+from app.utils.cache import TTLCache, invalidar_al_confirmar
+from app.utils.dotacion import aplicar_dotacion, proponer_dotacion
+from app.utils.invalidacion import invalidar_al_notificar
+from app.utils.pagination import Paginacion, paginar
+from app.utils.permissions import Permission, require_proyecto
+from app.utils.referencias import referencias
+from app.utils.rotacion import Rotacion
+from app.utils.solapamientos import (Periodo, barrido, describir,
+                                     validar_asignaciones)
 
 router = APIRouter()
 
@@ -35,38 +59,85 @@ TURNO_COLORS = {
     "D": "#f13a5c",  # Rojo
 }
 
+# Organigrama serializado por proyecto_id. Los cambios de otras instancias
+# llegan por los avisos de invalidacion; el TTL cubre avisos perdidos.
+arbol_cargos_cache = TTLCache(maxsize=256, ttl=300)
+
+
+def proyectos_del_cargo(cargo: Cargo) -> set[int]:
+    """Proyecto actual del cargo y el anterior si se movio de proyecto"""
+    historial = inspect(cargo).attrs.proyecto_id.history
+    return {cargo.proyecto_id, *historial.deleted} - {None}
+
+
+invalidar_al_confirmar(Cargo, arbol_cargos_cache, proyectos_del_cargo)
+invalidar_al_confirmar(Proyecto, arbol_cargos_cache, lambda p: [p.id])
+# El arbol incluye nombres de empresa: un cambio afecta a todos los proyectos
+invalidar_al_confirmar(Empresa, arbol_cargos_cache, lambda e: None)
+invalidar_al_notificar("cargos", arbol_cargos_cache, lambda c: [c["proyecto_id"]])
+invalidar_al_notificar("proyectos", arbol_cargos_cache, lambda p: [p["id"]])
+invalidar_al_notificar("empresas", arbol_cargos_cache, lambda e: None)
+
+
+def select_proyectos_con_conteos():
+    """
+    SELECT de proyectos con contratos_count y trabajadores_count.
+
+    Los conteos vienen de subconsultas agrupadas unidas con LEFT JOIN,
+    asi la lista completa se resuelve en un solo statement.
+    """
+    contratos_sq = (
+        select(
+            Contrato.proyecto_id,
+            func.count(Contrato.id).label("contratos_count"),
+        )
+        .group_by(Contrato.proyecto_id)
+        .subquery()
+    )
+
+    trabajadores_sq = (
+        select(
+            Trabajador.proyecto_id,
+            func.count(Trabajador.id).label("trabajadores_count"),
+        )
+        .where(Trabajador.activo == True)
+        .group_by(Trabajador.proyecto_id)
+        .subquery()
+    )
+
+    return (
+        select(
+            Proyecto,
+            func.coalesce(contratos_sq.c.contratos_count, 0),
+            func.coalesce(trabajadores_sq.c.trabajadores_count, 0),
+        )
+        .outerjoin(contratos_sq, contratos_sq.c.proyecto_id == Proyecto.id)
+        .outerjoin(trabajadores_sq, trabajadores_sq.c.proyecto_id == Proyecto.id)
+    )
+
 
 @router.get("", response_model=ProyectoListResponse)
 async def get_proyectos(
-    current_user: Annotated[Usuario, Depends(get_current_user)],
-    db: Session = Depends(get_db),
+    current_user: Annotated[UsuarioToken, Depends(get_usuario_token)],
+    paginacion: Annotated[Paginacion, Depends()],
+    db: AsyncSession = Depends(get_db),
     activo: bool = None,
 ):
     """
     Lista todos los proyectos.
-    Opcionalmente filtrar por estado activo.
+    Opcionalmente filtrar por estado activo. Paginado por cursor.
     """
-    query = db.query(Proyecto)
+    query = select_proyectos_con_conteos()
 
     if activo is not None:
-        query = query.filter(Proyecto.activo == activo)
+        query = query.where(Proyecto.activo == activo)
 
-    proyectos = query.order_by(Proyecto.nombre).all()
+    rows, next_cursor = await paginar(
+        db, query, (Proyecto.nombre, Proyecto.id), paginacion
+    )
 
     result = []
-    for p in proyectos:
-        contratos_count = (
-            db.query(func.count(Contrato.id))
-            .filter(Contrato.proyecto_id == p.id)
-            .scalar()
-        )
-
-        trabajadores_count = (
-            db.query(func.count(Trabajador.id))
-            .filter(Trabajador.proyecto_id == p.id, Trabajador.activo == True)
-            .scalar()
-        )
-
+    for p, contratos_count, trabajadores_count in rows:
         result.append(
             ProyectoResponse(
                 id=p.id,
@@ -82,36 +153,30 @@ async def get_proyectos(
             )
         )
 
-    return ProyectoListResponse(data=result)
+    return ProyectoListResponse(data=result, next_cursor=next_cursor)
 
 
 @router.get("/{proyecto_id}", response_model=ProyectoResponse)
 async def get_proyecto(
     proyecto_id: int,
-    current_user: Annotated[Usuario, Depends(get_current_user)],
-    db: Session = Depends(get_db),
+    current_user: Annotated[UsuarioToken, Depends(get_usuario_token)],
+    db: AsyncSession = Depends(get_db),
 ):
     """
     Obtiene un proyecto por ID.
     """
-    proyecto = db.query(Proyecto).filter(Proyecto.id == proyecto_id).first()
+    row = (
+        await db.execute(
+            select_proyectos_con_conteos().where(Proyecto.id == proyecto_id)
+        )
+    ).first()
 
-    if not proyecto:
+    if not row:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail="Proyecto no encontrado"
         )
 
-    contratos_count = (
-        db.query(func.count(Contrato.id))
-        .filter(Contrato.proyecto_id == proyecto.id)
-        .scalar()
-    )
-
-    trabajadores_count = (
-        db.query(func.count(Trabajador.id))
-        .filter(Trabajador.proyecto_id == proyecto.id, Trabajador.activo == True)
-        .scalar()
-    )
+    proyecto, contratos_count, trabajadores_count = row
 
     return ProyectoResponse(
         id=proyecto.id,
@@ -130,19 +195,22 @@ async def get_proyecto(
 @router.get("/{proyecto_id}/contratos", response_model=ContratoListResponse)
 async def get_proyecto_contratos(
     proyecto_id: int,
-    current_user: Annotated[Usuario, Depends(get_current_user)],
-    db: Session = Depends(get_db),
+    current_user: Annotated[UsuarioToken, Depends(get_usuario_token)],
+    db: AsyncSession = Depends(get_db),
 ):
     """
     Lista los contratos de un proyecto.
     """
-    proyecto = db.query(Proyecto).filter(Proyecto.id == proyecto_id).first()
+    proyecto = await db.get(Proyecto, proyecto_id)
     if not proyecto:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail="Proyecto no encontrado"
         )
 
-    contratos = db.query(Contrato).filter(Contrato.proyecto_id == proyecto_id).all()
+    contratos = (
+        await db.scalars(select(Contrato).where(Contrato.proyecto_id == proyecto_id))
+    ).all()
+    refs = await referencias.obtener(db)
 
     result = []
     for c in contratos:
@@ -157,8 +225,8 @@ async def get_proyecto_contratos(
                 activo=c.activo,
                 fecha_inicio=c.fecha_inicio,
                 fecha_fin=c.fecha_fin,
-                empresa_nombre=c.empresa.nombre if c.empresa else None,
-                servicio_nombre=c.servicio.nombre if c.servicio else None,
+                empresa_nombre=refs.empresa_nombre(c.empresa_id),
+                servicio_nombre=refs.servicio_nombre(c.servicio_id),
                 created_at=c.created_at,
                 updated_at=c.updated_at,
             )
@@ -170,48 +238,56 @@ async def get_proyecto_contratos(
 @router.get("/{proyecto_id}/cargos", response_model=CargoListResponse)
 async def get_proyecto_cargos(
     proyecto_id: int,
-    current_user: Annotated[Usuario, Depends(get_current_user)],
-    db: Session = Depends(get_db),
+    current_user: Annotated[UsuarioToken, Depends(get_usuario_token)],
+    db: AsyncSession = Depends(get_db),
 ):
     """
     Lista los cargos de un proyecto.
     """
-    proyecto = db.query(Proyecto).filter(Proyecto.id == proyecto_id).first()
+    proyecto = await db.get(Proyecto, proyecto_id)
     if not proyecto:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail="Proyecto no encontrado"
         )
 
-    cargos = (
-        db.query(Cargo)
-        .filter(Cargo.proyecto_id == proyecto_id)
-        .order_by(Cargo.nivel, Cargo.nombre)
-        .all()
+    # Jefe directo por self-join y subordinados por subconsulta agrupada
+    jefe = aliased(Cargo)
+    subordinados_sq = (
+        select(
+            Cargo.jefe_directo_id,
+            func.count(Cargo.id).label("subordinados_count"),
+        )
+        .where(
+            Cargo.jefe_directo_id.in_(
+                select(Cargo.id).where(Cargo.proyecto_id == proyecto_id)
+            )
+        )
+        .group_by(Cargo.jefe_directo_id)
+        .subquery()
     )
 
-    result = []
-    for c in cargos:
-        # Contar subordinados
-        subordinados_count = (
-            db.query(func.count(Cargo.id))
-            .filter(Cargo.jefe_directo_id == c.id)
-            .scalar()
+    rows = await db.execute(
+        select(
+            Cargo,
+            jefe.nombre,
+            func.coalesce(subordinados_sq.c.subordinados_count, 0),
         )
+        .outerjoin(jefe, jefe.id == Cargo.jefe_directo_id)
+        .outerjoin(subordinados_sq, subordinados_sq.c.jefe_directo_id == Cargo.id)
+        .where(Cargo.proyecto_id == proyecto_id)
+        .order_by(Cargo.nivel, Cargo.nombre)
+    )
+    refs = await referencias.obtener(db)
 
-        # Nombre del jefe directo
-        jefe_nombre = None
-        if c.jefe_directo_id:
-            jefe = db.query(Cargo).filter(Cargo.id == c.jefe_directo_id).first()
-            if jefe:
-                jefe_nombre = jefe.nombre
-
+    result = []
+    for c, jefe_nombre, subordinados_count in rows:
         result.append(
             CargoResponse(
                 id=c.id,
                 nombre=c.nombre,
                 proyecto_id=c.proyecto_id,
                 empresa_id=c.empresa_id,
-                empresa_nombre=c.empresa.nombre if c.empresa else None,
+                empresa_nombre=refs.empresa_nombre(c.empresa_id),
                 jefe_directo_id=c.jefe_directo_id,
                 jefe_directo_nombre=jefe_nombre,
                 nivel=c.nivel,
@@ -227,97 +303,121 @@ async def get_proyecto_cargos(
 @router.get("/{proyecto_id}/cargos/tree")
 async def get_proyecto_cargos_tree(
     proyecto_id: int,
-    current_user: Annotated[Usuario, Depends(get_current_user)],
-    db: Session = Depends(get_db),
+    current_user: Annotated[UsuarioToken, Depends(get_usuario_token)],
+    db: AsyncSession = Depends(get_db),
 ):
     """
     Obtiene el organigrama en estructura de arbol.
+
+    El JSON ya serializado se guarda por proyecto y se invalida al
+    confirmar cambios en sus cargos (ver arbol_cargos_cache).
     """
-    proyecto = db.query(Proyecto).filter(Proyecto.id == proyecto_id).first()
+    body = arbol_cargos_cache.get(proyecto_id)
+    if body is not None:
+        return Response(content=body, media_type="application/json")
+
+    proyecto = await db.get(Proyecto, proyecto_id)
     if not proyecto:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail="Proyecto no encontrado"
         )
 
-    cargos = db.query(Cargo).filter(Cargo.proyecto_id == proyecto_id).all()
-
-    # Crear diccionario de cargos
-    cargo_dict = {c.id: c for c in cargos}
-
-    def build_tree(cargo_id: int) -> CargoTreeNode:
-        cargo = cargo_dict.get(cargo_id)
-        if not cargo:
-            return None
+    cargos = (
+        await db.scalars(select(Cargo).where(Cargo.proyecto_id == proyecto_id))
+    ).all()
+    refs = await referencias.obtener(db)
 
-        children = [build_tree(c.id) for c in cargos if c.jefe_directo_id == cargo_id]
+    # Indice jefe -> subordinados, en el orden en que llegan los cargos
+    subordinados: dict[int | None, list[Cargo]] = defaultdict(list)
+    for c in cargos:
+        subordinados[c.jefe_directo_id].append(c)
 
+    def build_tree(cargo: Cargo) -> CargoTreeNode:
         return CargoTreeNode(
             id=cargo.id,
             nombre=cargo.nombre,
             nivel=cargo.nivel,
-            empresa_nombre=cargo.empresa.nombre if cargo.empresa else None,
-            children=[c for c in children if c is not None],
+            empresa_nombre=refs.empresa_nombre(cargo.empresa_id),
+            children=[build_tree(c) for c in subordinados[cargo.id]],
         )
 
-    # Encontrar nodos raiz (sin jefe directo)
-    roots = [c for c in cargos if c.jefe_directo_id is None]
+    # Nodos raiz (sin jefe directo)
+    roots = subordinados[None]
 
     if not roots:
-        return {"data": None}
-
+        tree = None
     # Si hay multiples raices, crear nodo virtual
-    if len(roots) == 1:
-        tree = build_tree(roots[0].id)
+    elif len(roots) == 1:
+        tree = build_tree(roots[0])
     else:
         tree = CargoTreeNode(
             id=0,
             nombre=proyecto.nombre,
             nivel="PROYECTO",
             empresa_nombre=None,
-            children=[build_tree(r.id) for r in roots if build_tree(r.id)],
+            children=[build_tree(r) for r in roots],
         )
 
-    return {"data": tree}
+    body = JSONResponse({"data": jsonable_encoder(tree)}).body
+    arbol_cargos_cache.set(proyecto_id, body)
+    return Response(content=body, media_type="application/json")
 
 
 @router.get("/{proyecto_id}/trabajadores", response_model=TrabajadorListResponse)
 async def get_proyecto_trabajadores(
     proyecto_id: int,
-    current_user: Annotated[Usuario, Depends(get_current_user)],
-    db: Session = Depends(get_db),
+    current_user: Annotated[UsuarioToken, Depends(get_usuario_token)],
+    paginacion: Annotated[Paginacion, Depends()],
+    db: AsyncSession = Depends(get_db),
     activo: bool = None,
 ):
     """
-    Lista los trabajadores de un proyecto.
+    Lista los trabajadores de un proyecto. Paginado por cursor.
     """
-    proyecto = db.query(Proyecto).filter(Proyecto.id == proyecto_id).first()
+    proyecto = await db.get(Proyecto, proyecto_id)
     if not proyecto:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail="Proyecto no encontrado"
         )
 
-    query = db.query(Trabajador).filter(Trabajador.proyecto_id == proyecto_id)
+    # Asignaciones en ciclos que cubren hoy, contadas por trabajador
+    hoy = date.today()
+    activas_sq = (
+        select(
+            Asignacion.trabajador_id,
+            func.count(Asignacion.id).label("asignaciones_activas"),
+        )
+        .join(Ciclo, Asignacion.ciclo_id == Ciclo.id)
+        .join(Trabajador, Asignacion.trabajador_id == Trabajador.id)
+        .where(
+            Trabajador.proyecto_id == proyecto_id,
+            Ciclo.fecha_inicio <= hoy,
+            Ciclo.fecha_fin >= hoy,
+        )
+        .group_by(Asignacion.trabajador_id)
+        .subquery()
+    )
+
+    query = (
+        select(Trabajador, func.coalesce(activas_sq.c.asignaciones_activas, 0))
+        .options(joinedload(Trabajador.cargo))
+        .outerjoin(activas_sq, activas_sq.c.trabajador_id == Trabajador.id)
+        .where(Trabajador.proyecto_id == proyecto_id)
+    )
 
     if activo is not None:
-        query = query.filter(Trabajador.activo == activo)
+        query = query.where(Trabajador.activo == activo)
 
-    trabajadores = query.order_by(Trabajador.apellidos, Trabajador.nombres).all()
+    rows, next_cursor = await paginar(
+        db,
+        query,
+        (Trabajador.apellidos, Trabajador.nombres, Trabajador.id),
+        paginacion,
+    )
+    refs = await referencias.obtener(db)
 
     result = []
-    for t in trabajadores:
-        # Contar asignaciones activas
-        hoy = date.today()
-        asignaciones_activas = (
-            db.query(func.count(Asignacion.id))
-            .join(Ciclo, Asignacion.ciclo_id == Ciclo.id)
-            .filter(
-                Asignacion.trabajador_id == t.id,
-                Ciclo.fecha_inicio <= hoy,
-                Ciclo.fecha_fin >= hoy,
-            )
-            .scalar()
-        )
-
+    for t, asignaciones_activas in rows:
         result.append(
             TrabajadorResponse(
                 id=t.id,
@@ -329,7 +429,7 @@ async def get_proyecto_trabajadores(
                 telefono=t.telefono,
                 proyecto_id=t.proyecto_id,
                 empresa_id=t.empresa_id,
-                empresa_nombre=t.empresa.nombre if t.empresa else None,
+                empresa_nombre=refs.empresa_nombre(t.empresa_id),
                 cargo_id=t.cargo_id,
                 cargo_nombre=t.cargo.nombre if t.cargo else None,
                 activo=t.activo,
@@ -340,16 +440,7 @@ async def get_proyecto_trabajadores(
             )
         )
 
-    return TrabajadorListResponse(data=result)
-
-
-def require_admin_or_gestor(current_user: Usuario) -> None:
-    """Verifica que el usuario sea ADMIN o GESTOR_PROYECTOS"""
-    if current_user.rol not in [RolUsuario.ADMIN, RolUsuario.GESTOR_PROYECTOS]:
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="Se requieren permisos de administrador o gestor de proyectos",
-        )
+    return TrabajadorListResponse(data=result, next_cursor=next_cursor)
 
 
 @router.post(
@@ -360,33 +451,32 @@ def require_admin_or_gestor(current_user: Usuario) -> None:
 async def create_trabajador(
     proyecto_id: int,
     trabajador_data: TrabajadorCreate,
-    current_user: Annotated[Usuario, Depends(get_current_user)],
-    db: Session = Depends(get_db),
+    current_user: Annotated[
+        UsuarioToken,
+        Depends(requires_rol(RolUsuario.ADMIN, RolUsuario.GESTOR_PROYECTOS)),
+    ],
+    db: AsyncSession = Depends(get_db),
 ):
     """
     Crea un nuevo trabajador en un proyecto.
     Solo usuarios ADMIN o GESTOR_PROYECTOS pueden crear trabajadores.
     """
-    require_admin_or_gestor(current_user)
-
     # Verificar que el proyecto exista
-    proyecto = db.query(Proyecto).filter(Proyecto.id == proyecto_id).first()
+    proyecto = await db.get(Proyecto, proyecto_id)
     if not proyecto:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail="Proyecto no encontrado"
         )
 
     # Verificar que el RUT no exista
-    if db.query(Trabajador).filter(Trabajador.rut == trabajador_data.rut).first():
+    if await db.scalar(select(Trabajador).where(Trabajador.rut == trabajador_data.rut)):
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Ya existe un trabajador con este RUT",
         )
 
     # Verificar que la empresa exista
-    from app.models import Empresa
-
-    empresa = db.query(Empresa).filter(Empresa.id == trabajador_data.empresa_id).first()
+    empresa = await db.get(Empresa, trabajador_data.empresa_id)
     if not empresa:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -395,7 +485,7 @@ async def create_trabajador(
 
     # Verificar que el cargo exista si se proporciona
     if trabajador_data.cargo_id:
-        cargo = db.query(Cargo).filter(Cargo.id == trabajador_data.cargo_id).first()
+        cargo = await db.get(Cargo, trabajador_data.cargo_id)
         if not cargo:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
@@ -417,8 +507,10 @@ async def create_trabajador(
     )
 
     db.add(nuevo_trabajador)
-    db.commit()
-    db.refresh(nuevo_trabajador)
+    await db.commit()
+    await db.refresh(nuevo_trabajador)
+    await db.refresh(nuevo_trabajador, ["cargo"])
+    refs = await referencias.obtener(db)
 
     return TrabajadorResponse(
         id=nuevo_trabajador.id,
@@ -430,9 +522,7 @@ async def create_trabajador(
         telefono=nuevo_trabajador.telefono,
         proyecto_id=nuevo_trabajador.proyecto_id,
         empresa_id=nuevo_trabajador.empresa_id,
-        empresa_nombre=(
-            nuevo_trabajador.empresa.nombre if nuevo_trabajador.empresa else None
-        ),
+        empresa_nombre=refs.empresa_nombre(nuevo_trabajador.empresa_id),
         cargo_id=nuevo_trabajador.cargo_id,
         cargo_nombre=nuevo_trabajador.cargo.nombre if nuevo_trabajador.cargo else None,
         activo=nuevo_trabajador.activo,
@@ -445,47 +535,49 @@ async def create_trabajador(
 @router.get("/{proyecto_id}/ciclos", response_model=CicloListResponse)
 async def get_proyecto_ciclos(
     proyecto_id: int,
-    current_user: Annotated[Usuario, Depends(get_current_user)],
-    db: Session = Depends(get_db),
+    current_user: Annotated[UsuarioToken, Depends(get_usuario_token)],
+    db: AsyncSession = Depends(get_db),
+    desde: date = None,
+    hasta: date = None,
+    estado: EstadoCiclo = None,
 ):
     """
     Lista los ciclos de todos los contratos del proyecto.
+    Opcionalmente filtrar por rango de fechas: desde/hasta retornan los
+    ciclos que se cruzan con el rango. Con estado (p.ej. INCOMPLETO) solo
+    los ciclos en ese estado, que la DB recalcula al cambiar sus
+    requerimientos o asignaciones.
     """
-    proyecto = db.query(Proyecto).filter(Proyecto.id == proyecto_id).first()
+    proyecto = await db.get(Proyecto, proyecto_id)
     if not proyecto:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail="Proyecto no encontrado"
         )
 
-    ciclos = (
-        db.query(Ciclo)
+    query = (
+        select(Ciclo)
         .join(Contrato, Ciclo.contrato_id == Contrato.id)
-        .filter(Contrato.proyecto_id == proyecto_id)
-        .order_by(Ciclo.fecha_inicio)
-        .all()
+        .where(Contrato.proyecto_id == proyecto_id)
     )
 
-    result = []
-    for c in ciclos:
-        # Calcular cobertura
-        total_requerido = (
-            db.query(func.coalesce(func.sum(Requerimiento.cantidad_necesaria), 0))
-            .filter(Requerimiento.ciclo_id == c.id)
-            .scalar()
-        )
+    if desde is not None:
+        query = query.where(Ciclo.fecha_fin >= desde)
+    if hasta is not None:
+        query = query.where(Ciclo.fecha_inicio <= hasta)
+    if estado is not None:
+        query = query.where(Ciclo.estado == estado)
 
-        total_asignado = (
-            db.query(func.count(Asignacion.id))
-            .filter(Asignacion.ciclo_id == c.id)
-            .scalar()
-        )
+    ciclos = (await db.scalars(query.order_by(Ciclo.fecha_inicio))).all()
 
+    result = []
+    for c in ciclos:
+        # Cobertura desde las columnas mantenidas por triggers
         cobertura = None
-        if total_requerido > 0:
+        if c.requeridos > 0:
             cobertura = CoberturaResponse(
-                requeridos=total_requerido,
-                asignados=total_asignado,
-                porcentaje=round((total_asignado / total_requerido) * 100, 1),
+                requeridos=c.requeridos,
+                asignados=c.asignados,
+                porcentaje=round((c.asignados / c.requeridos) * 100, 1),
             )
 
         result.append(
@@ -509,25 +601,26 @@ async def get_proyecto_ciclos(
 @router.get("/{proyecto_id}/ciclos/calendario", response_model=CicloCalendarioResponse)
 async def get_proyecto_ciclos_calendario(
     proyecto_id: int,
-    current_user: Annotated[Usuario, Depends(get_current_user)],
-    db: Session = Depends(get_db),
+    current_user: Annotated[UsuarioToken, Depends(get_usuario_token)],
+    db: AsyncSession = Depends(get_db),
 ):
     """
     Obtiene los ciclos en formato de eventos para FullCalendar.
     """
-    proyecto = db.query(Proyecto).filter(Proyecto.id == proyecto_id).first()
+    proyecto = await db.get(Proyecto, proyecto_id)
     if not proyecto:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail="Proyecto no encontrado"
         )
 
     ciclos = (
-        db.query(Ciclo)
-        .join(Contrato, Ciclo.contrato_id == Contrato.id)
-        .filter(Contrato.proyecto_id == proyecto_id)
-        .order_by(Ciclo.fecha_inicio)
-        .all()
-    )
+        await db.scalars(
+            select(Ciclo)
+            .join(Contrato, Ciclo.contrato_id == Contrato.id)
+            .where(Contrato.proyecto_id == proyecto_id)
+            .order_by(Ciclo.fecha_inicio)
+        )
+    ).all()
 
     eventos = []
     for c in ciclos:
@@ -550,59 +643,376 @@ async def get_proyecto_ciclos_calendario(
     return CicloCalendarioResponse(data=eventos)
 
 
+@router.get("/{proyecto_id}/rotacion", response_model=RotacionMesResponse)
+async def get_proyecto_rotacion(
+    proyecto_id: int,
+    current_user: Annotated[UsuarioToken, Depends(get_usuario_token)],
+    anio: int = Query(ge=2000, le=2100),
+    mes: int = Query(ge=1, le=12),
+    db: AsyncSession = Depends(get_db),
+):
+    """
+    Letras en turno cada dia del mes para los contratos activos del
+    proyecto, calculadas desde el patron y la fecha de inicio de cada
+    contrato (sin leer ciclos).
+    """
+    proyecto = await db.get(Proyecto, proyecto_id)
+    if not proyecto:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail="Proyecto no encontrado"
+        )
+
+    contratos = (
+        await db.scalars(
+            select(Contrato)
+            .where(Contrato.proyecto_id == proyecto_id, Contrato.activo.is_(True))
+            .order_by(Contrato.id)
+        )
+    ).all()
+    refs = await referencias.obtener(db)
+
+    inicio = date(anio, mes, 1)
+    dias = [inicio + timedelta(days=i) for i in range(monthrange(anio, mes)[1])]
+
+    result = []
+    for contrato in contratos:
+        try:
+            rotacion = Rotacion.de_contrato(contrato)
+            turnos = [[letra for letra, _ in rotacion.en_turno(d)] for d in dias]
+        except ValueError:
+            turnos = None
+
+        result.append(
+            RotacionContratoResponse(
+                contrato_id=contrato.id,
+                empresa_nombre=refs.empresa_nombre(contrato.empresa_id),
+                tipo_turnos=contrato.tipo_turnos.value,
+                patron=contrato.patron,
+                turnos=turnos,
+            )
+        )
+
+    return RotacionMesResponse(dias=dias, data=result)
+
+
+@router.get("/{proyecto_id}/conflictos", response_model=ConflictoListResponse)
+async def get_proyecto_conflictos(
+    proyecto_id: int,
+    current_user: Annotated[UsuarioToken, Depends(get_usuario_token)],
+    db: AsyncSession = Depends(get_db),
+    desde: date = None,
+    hasta: date = None,
+):
+    """
+    Trabajadores con asignaciones en el proyecto que estan en dos ciclos
+    que se cruzan (de este u otro proyecto). Opcionalmente solo ciclos que
+    se cruzan con el rango desde/hasta.
+    """
+    proyecto = await db.get(Proyecto, proyecto_id)
+    if not proyecto:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail="Proyecto no encontrado"
+        )
+
+    trabajadores_proyecto = (
+        select(Asignacion.trabajador_id)
+        .join(Ciclo, Asignacion.ciclo_id == Ciclo.id)
+        .join(Contrato, Ciclo.contrato_id == Contrato.id)
+        .where(Contrato.proyecto_id == proyecto_id)
+    )
+    query = (
+        select(Asignacion.trabajador_id, Ciclo.fecha_inicio, Ciclo.fecha_fin, Ciclo.id)
+        .join(Ciclo, Asignacion.ciclo_id == Ciclo.id)
+        .where(Asignacion.trabajador_id.in_(trabajadores_proyecto))
+    )
+    if desde is not None:
+        query = query.where(Ciclo.fecha_fin >= desde)
+    if hasta is not None:
+        query = query.where(Ciclo.fecha_inicio <= hasta)
+
+    # Una pasada de barrido sobre las asignaciones ordenadas
+    filas = await db.execute(
+        query.order_by(Asignacion.trabajador_id, Ciclo.fecha_inicio, Ciclo.id)
+    )
+    solapamientos = barrido(
+        (trabajador_id, Periodo(inicio, fin, ciclo_id))
+        for trabajador_id, inicio, fin, ciclo_id in filas
+    )
+
+    return ConflictoListResponse(data=await describir(db, solapamientos))
+
+
+@router.get("/{proyecto_id}/disponibles", response_model=TrabajadorListResponse)
+async def get_proyecto_disponibles(
+    proyecto_id: int,
+    desde: date,
+    hasta: date,
+    current_user: Annotated[UsuarioToken, Depends(get_usuario_token)],
+    paginacion: Annotated[Paginacion, Depends()],
+    db: AsyncSession = Depends(get_db),
+    cargo_id: int = None,
+):
+    """
+    Trabajadores activos del proyecto (opcionalmente de un cargo) sin
+    asignaciones en ciclos que se crucen con desde/hasta (inclusive).
+    Paginado por cursor.
+    """
+    if hasta < desde:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="La fecha hasta debe ser posterior a desde",
+        )
+
+    proyecto = await db.get(Proyecto, proyecto_id)
+    if not proyecto:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail="Proyecto no encontrado"
+        )
+
+    # Anti-join sobre asignaciones.periodo: lo resuelve el indice GiST
+    # (trabajador_id, periodo) del constraint asignaciones_sin_solapamiento
+    ocupado = exists().where(
+        Asignacion.trabajador_id == Trabajador.id,
+        Asignacion.periodo.overlaps(func.daterange(desde, hasta, "[]")),
+    )
+    query = (
+        select(Trabajador)
+        .options(joinedload(Trabajador.cargo))
+        .where(
+            Trabajador.proyecto_id == proyecto_id,
+            Trabajador.activo.is_(True),
+            ~ocupado,
+        )
+    )
+    if cargo_id is not None:
+        query = query.where(Trabajador.cargo_id == cargo_id)
+
+    trabajadores, next_cursor = await paginar(
+        db,
+        query,
+        (Trabajador.apellidos, Trabajador.nombres, Trabajador.id),
+        paginacion,
+    )
+    refs = await referencias.obtener(db)
+
+    result = []
+    for t in trabajadores:
+        result.append(
+            TrabajadorResponse(
+                id=t.id,
+                rut=t.rut,
+                nombres=t.nombres,
+                apellidos=t.apellidos,
+                nombre_completo=f"{t.nombres} {t.apellidos}",
+                email=t.email,
+                telefono=t.telefono,
+                proyecto_id=t.proyecto_id,
+                empresa_id=t.empresa_id,
+                empresa_nombre=refs.empresa_nombre(t.empresa_id),
+                cargo_id=t.cargo_id,
+                cargo_nombre=t.cargo.nombre if t.cargo else None,
+                activo=t.activo,
+                fecha_ingreso=t.fecha_ingreso,
+                created_at=t.created_at,
+                updated_at=t.updated_at,
+            )
+        )
+
+    return TrabajadorListResponse(data=result, next_cursor=next_cursor)
+
+
+@router.post(
+    "/{proyecto_id}/dotacion/propuesta", response_model=PropuestaDotacionResponse
+)
+async def proponer_dotacion_proyecto(
+    proyecto_id: int,
+    rango: DotacionRequest,
+    current_user: Annotated[
+        UsuarioToken,
+        Depends(requires(Permission.ASIGNACIONES_GESTIONAR)),
+    ],
+    db: AsyncSession = Depends(get_db),
+):
+    """
+    Propone asignaciones para cubrir los requerimientos abiertos de los
+    ciclos del proyecto que se cruzan con desde/hasta: trabajadores activos
+    de la empresa del contrato y del cargo requerido, sin ciclos que se
+    crucen y repartiendo los dias entre los de menor carga. No modifica
+    datos; la propuesta se acepta con POST /dotacion/aplicar.
+    La cobertura es de mejor esfuerzo: faltantes puede incluir cupos que
+    otra combinacion de trabajadores alcanzaria a cubrir.
+    Requiere el permiso ASIGNACIONES_GESTIONAR y acceso al proyecto.
+    """
+    if rango.hasta < rango.desde:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="La fecha hasta debe ser posterior a desde",
+        )
+
+    proyecto = await db.get(Proyecto, proyecto_id)
+    if not proyecto:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail="Proyecto no encontrado"
+        )
+    require_proyecto(current_user, proyecto_id)
+
+    propuesta, nombres = await proponer_dotacion(
+        db, proyecto_id, rango.desde, rango.hasta
+    )
+
+    return PropuestaDotacionResponse(
+        agregar=[
+            AsignacionPropuesta(
+                ciclo_id=ciclo_id,
+                trabajador_id=trabajador_id,
+                trabajador_nombre=nombres.get(trabajador_id),
+                cargo_id=cargo_id,
+            )
+            for ciclo_id, trabajador_id, cargo_id in propuesta.asignaciones
+        ],
+        faltantes=[
+            RequerimientoFaltante(ciclo_id=ciclo_id, cargo_id=cargo_id, cantidad=n)
+            for ciclo_id, cargo_id, n in propuesta.faltantes
+        ],
+    )
+
+
+@router.post(
+    "/{proyecto_id}/dotacion/aplicar",
+    response_model=AplicarDotacionResponse,
+    status_code=status.HTTP_201_CREATED,
+)
+async def aplicar_dotacion_proyecto(
+    proyecto_id: int,
+    aceptada: AplicarDotacionRequest,
+    current_user: Annotated[
+        UsuarioToken,
+        Depends(requires(Permission.ASIGNACIONES_GESTIONAR)),
+    ],
+    db: AsyncSession = Depends(get_db),
+):
+    """
+    Crea las asignaciones de una propuesta aceptada en una sola transaccion.
+    Las que ya existen se omiten. Si alguna dejaria a un trabajador en dos
+    ciclos que se cruzan (p.ej. por cambios desde la propuesta) no se crea
+    ninguna y se responde 409 con los conflictos.
+    Requiere el permiso ASIGNACIONES_GESTIONAR y acceso al proyecto.
+    """
+    proyecto = await db.get(Proyecto, proyecto_id)
+    if not proyecto:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail="Proyecto no encontrado"
+        )
+    require_proyecto(current_user, proyecto_id)
+
+    pares = list(
+        dict.fromkeys((a.ciclo_id, a.trabajador_id) for a in aceptada.asignaciones)
+    )
+    if not pares:
+        return AplicarDotacionResponse(creadas=0, omitidas=0)
+
+    # Ciclos y trabajadores deben ser del proyecto
+    ciclo_ids = list({ciclo_id for ciclo_id, _ in pares})
+    trabajador_ids = list({trabajador_id for _, trabajador_id in pares})
+    ciclos_proyecto = await db.scalar(
+        select(func.count(Ciclo.id))
+        .join(Contrato, Ciclo.contrato_id == Contrato.id)
+        .where(Ciclo.id.in_(ciclo_ids), Contrato.proyecto_id == proyecto_id)
+    )
+    trabajadores_proyecto = await db.scalar(
+        select(func.count(Trabajador.id)).where(
+            Trabajador.id.in_(trabajador_ids),
+            Trabajador.proyecto_id == proyecto_id,
+            Trabajador.activo.is_(True),
+        )
+    )
+    ciclos_ajenos = ciclos_proyecto != len(ciclo_ids)
+    trabajadores_ajenos = trabajadores_proyecto != len(trabajador_ids)
+    if ciclos_ajenos or trabajadores_ajenos:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Hay ciclos o trabajadores que no pertenecen al proyecto",
+        )
+
+    solapamientos = await validar_asignaciones(
+        db, [(trabajador_id, ciclo_id) for ciclo_id, trabajador_id in pares]
+    )
+    if solapamientos:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=jsonable_encoder(await describir(db, solapamientos)),
+        )
+
+    try:
+        creadas = await aplicar_dotacion(db, pares)
+        await db.commit()
+    except IntegrityError:
+        # Otra transaccion asigno a alguno de ellos en un ciclo que se cruza
+        await db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Las asignaciones cambiaron; genere una nueva propuesta",
+        )
+
+    return AplicarDotacionResponse(creadas=creadas, omitidas=len(pares) - creadas)
+
+
 @router.get("/{proyecto_id}/panel-mandante", response_model=PanelMandanteResponse)
 async def get_panel_mandante(
     proyecto_id: int,
-    current_user: Annotated[Usuario, Depends(get_current_user)],
-    db: Session = Depends(get_db),
+    current_user: Annotated[UsuarioToken, Depends(get_usuario_token)],
+    db: AsyncSession = Depends(get_db),
 ):
     """
     Obtiene el panel resumen para el mandante.
     """
-    proyecto = db.query(Proyecto).filter(Proyecto.id == proyecto_id).first()
+    proyecto = await db.get(Proyecto, proyecto_id)
     if not proyecto:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail="Proyecto no encontrado"
         )
 
     contratos = (
-        db.query(Contrato)
-        .filter(Contrato.proyecto_id == proyecto_id, Contrato.activo == True)
-        .all()
-    )
+        await db.scalars(
+            select(Contrato).where(
+                Contrato.proyecto_id == proyecto_id, Contrato.activo == True
+            )
+        )
+    ).all()
+    refs = await referencias.obtener(db)
 
     resumen_contratos = []
     alertas = []
     hoy = date.today()
 
-    for contrato in contratos:
-        # Buscar ciclo actual
-        ciclo_actual = (
-            db.query(Ciclo)
-            .filter(
-                Ciclo.contrato_id == contrato.id,
+    # Ciclo actual de cada contrato activo (uno por contrato)
+    ciclos_actuales = {
+        c.contrato_id: c
+        for c in await db.scalars(
+            select(Ciclo)
+            .join(Contrato, Ciclo.contrato_id == Contrato.id)
+            .where(
+                Contrato.proyecto_id == proyecto_id,
+                Contrato.activo == True,
                 Ciclo.fecha_inicio <= hoy,
                 Ciclo.fecha_fin >= hoy,
             )
-            .first()
+            .distinct(Ciclo.contrato_id)
+            .order_by(Ciclo.contrato_id, Ciclo.id)
         )
+    }
+
+    for contrato in contratos:
+        ciclo_actual = ciclos_actuales.get(contrato.id)
+        empresa = refs.empresa_nombre(contrato.empresa_id) or "Sin empresa"
 
         # Calcular dotacion
         dotacion_requerida = 0
         dotacion_asignada = 0
 
         if ciclo_actual:
-            dotacion_requerida = (
-                db.query(func.coalesce(func.sum(Requerimiento.cantidad_necesaria), 0))
-                .filter(Requerimiento.ciclo_id == ciclo_actual.id)
-                .scalar()
-            )
-
-            dotacion_asignada = (
-                db.query(func.count(Asignacion.id))
-                .filter(Asignacion.ciclo_id == ciclo_actual.id)
-                .scalar()
-            )
+            dotacion_requerida = ciclo_actual.requeridos
+            dotacion_asignada = ciclo_actual.asignados
 
             # Generar alertas
             if dotacion_requerida > 0:
@@ -611,7 +1021,7 @@ async def get_panel_mandante(
                     alertas.append(
                         AlertaResponse(
                             tipo="danger",
-                            mensaje=f"Cobertura crítica ({porcentaje:.0f}%) en {contrato.empresa.nombre}",
+                            mensaje=f"Cobertura crítica ({porcentaje:.0f}%) en {empresa}",
                             contrato_id=contrato.id,
                         )
                     )
@@ -619,7 +1029,7 @@ async def get_panel_mandante(
                     alertas.append(
                         AlertaResponse(
                             tipo="warning",
-                            mensaje=f"Cobertura incompleta ({porcentaje:.0f}%) en {contrato.empresa.nombre}",
+                            mensaje=f"Cobertura incompleta ({porcentaje:.0f}%) en {empresa}",
                             contrato_id=contrato.id,
                         )
                     )
@@ -627,10 +1037,8 @@ async def get_panel_mandante(
         resumen_contratos.append(
             ContratoResumenResponse(
                 contrato_id=contrato.id,
-                empresa=contrato.empresa.nombre if contrato.empresa else "Sin empresa",
-                servicio=(
-                    contrato.servicio.nombre if contrato.servicio else "Sin servicio"
-                ),
+                empresa=empresa,
+                servicio=refs.servicio_nombre(contrato.servicio_id) or "Sin servicio",
                 patron=contrato.patron,
                 tipo_turnos=(
                     contrato.tipo_turnos.value if contrato.tipo_turnos else "ABCD"
@@ -652,23 +1060,22 @@ async def get_panel_mandante(
         )
 
     # Estadisticas generales
-    total_trabajadores = (
-        db.query(func.count(Trabajador.id))
-        .filter(Trabajador.proyecto_id == proyecto_id, Trabajador.activo == True)
-        .scalar()
+    total_trabajadores = await db.scalar(
+        select(func.count(Trabajador.id)).where(
+            Trabajador.proyecto_id == proyecto_id, Trabajador.activo == True
+        )
     )
 
     # Trabajadores asignados a algun ciclo activo
-    trabajadores_asignados = (
-        db.query(func.count(func.distinct(Asignacion.trabajador_id)))
+    trabajadores_asignados = await db.scalar(
+        select(func.count(func.distinct(Asignacion.trabajador_id)))
         .join(Ciclo, Asignacion.ciclo_id == Ciclo.id)
         .join(Contrato, Ciclo.contrato_id == Contrato.id)
-        .filter(
+        .where(
             Contrato.proyecto_id == proyecto_id,
             Ciclo.fecha_inicio <= hoy,
             Ciclo.fecha_fin >= hoy,
         )
-        .scalar()
     )
 
     return PanelMandanteResponse(
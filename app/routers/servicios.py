@@ -5,43 +5,48 @@ Router de servicios
 from typing import Annotated
 
 from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.database import get_db
-from app.models import Servicio, Usuario
+from app.models import Servicio
 from app.models.usuario import RolUsuario
-from app.routers.auth import get_current_user
+from app.routers.auth import get_usuario_token, requires_rol
+from app.schemas.auth import UsuarioToken
 from app.schemas.servicio import (ServicioCreate, ServicioListResponse,
                                   ServicioResponse, ServicioUpdate)
+from app.utils.pagination import Paginacion, paginar
+from app.utils.referencias import referencias
 
 router = APIRouter()
 
 
-def require_admin(current_user: Usuario) -> None:
-    """Verifica que el usuario sea ADMIN"""
-    if current_user.rol != RolUsuario.ADMIN:
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="Se requieren permisos de administrador",
-        )
-
-
 @router.get("", response_model=ServicioListResponse)
 async def get_servicios(
-    current_user: Annotated[Usuario, Depends(get_current_user)],
-    db: Session = Depends(get_db),
+    current_user: Annotated[UsuarioToken, Depends(get_usuario_token)],
+    paginacion: Annotated[Paginacion, Depends()],
+    db: AsyncSession = Depends(get_db),
     activo: bool = None,
 ):
     """
     Lista todos los servicios.
-    Opcionalmente filtrar por estado activo.
+    Opcionalmente filtrar por estado activo. Paginado por cursor.
+    Se sirve desde el JSON ya serializado del cache de referencias.
     """
-    query = db.query(Servicio)
+    refs = await referencias.obtener(db)
+    pagina = refs.servicios.pagina(paginacion, activo)
+    if pagina is not None:
+        return pagina
+
+    # Cursor de una fila que ya no esta en el cache: paginar con la DB
+    query = select(Servicio)
 
     if activo is not None:
-        query = query.filter(Servicio.activo == activo)
+        query = query.where(Servicio.activo == activo)
 
-    servicios = query.order_by(Servicio.nombre).all()
+    servicios, next_cursor = await paginar(
+        db, query, (Servicio.nombre, Servicio.id), paginacion
+    )
 
     return ServicioListResponse(
         data=[
@@ -53,20 +58,21 @@ async def get_servicios(
                 created_at=s.created_at,
             )
             for s in servicios
-        ]
+        ],
+        next_cursor=next_cursor,
     )
 
 
 @router.get("/{servicio_id}", response_model=ServicioResponse)
 async def get_servicio(
     servicio_id: int,
-    current_user: Annotated[Usuario, Depends(get_current_user)],
-    db: Session = Depends(get_db),
+    current_user: Annotated[UsuarioToken, Depends(get_usuario_token)],
+    db: AsyncSession = Depends(get_db),
 ):
     """
     Obtiene un servicio por ID.
     """
-    servicio = db.query(Servicio).filter(Servicio.id == servicio_id).first()
+    servicio = await db.get(Servicio, servicio_id)
 
     if not servicio:
         raise HTTPException(
@@ -85,17 +91,18 @@ async def get_servicio(
 @router.post("", response_model=ServicioResponse, status_code=status.HTTP_201_CREATED)
 async def create_servicio(
     servicio_data: ServicioCreate,
-    current_user: Annotated[Usuario, Depends(get_current_user)],
-    db: Session = Depends(get_db),
+    current_user: Annotated[
+        UsuarioToken,
+        Depends(requires_rol(RolUsuario.ADMIN)),
+    ],
+    db: AsyncSession = Depends(get_db),
 ):
     """
     Crea un nuevo servicio.
     Solo usuarios ADMIN pueden crear servicios.
     """
-    require_admin(current_user)
-
     # Verificar que el nombre no exista
-    if db.query(Servicio).filter(Servicio.nombre == servicio_data.nombre).first():
+    if await db.scalar(select(Servicio).where(Servicio.nombre == servicio_data.nombre)):
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Ya existe un servicio con este nombre",
@@ -109,8 +116,9 @@ async def create_servicio(
     )
 
     db.add(nuevo_servicio)
-    db.commit()
-    db.refresh(nuevo_servicio)
+    await db.commit()
+    referencias.invalidar()
+    await db.refresh(nuevo_servicio)
 
     return ServicioResponse(
         id=nuevo_servicio.id,
@@ -125,16 +133,17 @@ async def create_servicio(
 async def update_servicio(
     servicio_id: int,
     servicio_data: ServicioUpdate,
-    current_user: Annotated[Usuario, Depends(get_current_user)],
-    db: Session = Depends(get_db),
+    current_user: Annotated[
+        UsuarioToken,
+        Depends(requires_rol(RolUsuario.ADMIN)),
+    ],
+    db: AsyncSession = Depends(get_db),
 ):
     """
     Actualiza un servicio existente.
     Solo usuarios ADMIN pueden actualizar servicios.
     """
-    require_admin(current_user)
-
-    servicio = db.query(Servicio).filter(Servicio.id == servicio_id).first()
+    servicio = await db.get(Servicio, servicio_id)
 
     if not servicio:
         raise HTTPException(
@@ -143,7 +152,9 @@ async def update_servicio(
 
     # Verificar unicidad de nombre si se está actualizando
     if servicio_data.nombre and servicio_data.nombre != servicio.nombre:
-        if db.query(Servicio).filter(Servicio.nombre == servicio_data.nombre).first():
+        if await db.scalar(
+            select(Servicio).where(Servicio.nombre == servicio_data.nombre)
+        ):
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail="Ya existe un servicio con este nombre",
@@ -157,8 +168,9 @@ async def update_servicio(
     if servicio_data.activo is not None:
         servicio.activo = servicio_data.activo
 
-    db.commit()
-    db.refresh(servicio)
+    await db.commit()
+    referencias.invalidar()
+    await db.refresh(servicio)
 
     return ServicioResponse(
         id=servicio.id,
@@ -172,16 +184,17 @@ async def update_servicio(
 @router.delete("/{servicio_id}", status_code=status.HTTP_204_NO_CONTENT)
 async def delete_servicio(
     servicio_id: int,
-    current_user: Annotated[Usuario, Depends(get_current_user)],
-    db: Session = Depends(get_db),
+    current_user: Annotated[
+        UsuarioToken,
+        Depends(requires_rol(RolUsuario.ADMIN)),
+    ],
+    db: AsyncSession = Depends(get_db),
 ):
     """
     Elimina un servicio (soft delete).
     Solo usuarios ADMIN pueden eliminar servicios.
     """
-    require_admin(current_user)
-
-    servicio = db.query(Servicio).filter(Servicio.id == servicio_id).first()
+    servicio = await db.get(Servicio, servicio_id)
 
     if not servicio:
         raise HTTPException(
@@ -190,6 +203,7 @@ async def delete_servicio(
 
     # Soft delete
     servicio.activo = False
-    db.commit()
+    await db.commit()
+    referencias.invalidar()
 
     return None
@@ -5,42 +5,41 @@ Router de trabajadores
 from typing import Annotated
 
 from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import joinedload
 
 from app.database import get_db
-from app.models import Cargo, Empresa, Trabajador, Usuario
+from app.models import Cargo, Empresa, Trabajador
 from app.models.usuario import RolUsuario
-from app.routers.auth import get_current_user
+from app.routers.auth import get_usuario_token, requires_rol
+from app.schemas.auth import UsuarioToken
 from app.schemas.trabajador import TrabajadorResponse, TrabajadorUpdate
+from app.utils.referencias import referencias
 
 router = APIRouter()
 
 
-def require_admin_or_gestor(current_user: Usuario) -> None:
-    """Verifica que el usuario sea ADMIN o GESTOR_PROYECTOS"""
-    if current_user.rol not in [RolUsuario.ADMIN, RolUsuario.GESTOR_PROYECTOS]:
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="Se requieren permisos de administrador o gestor de proyectos",
-        )
-
-
 @router.get("/{trabajador_id}", response_model=TrabajadorResponse)
 async def get_trabajador(
     trabajador_id: int,
-    current_user: Annotated[Usuario, Depends(get_current_user)],
-    db: Session = Depends(get_db),
+    current_user: Annotated[UsuarioToken, Depends(get_usuario_token)],
+    db: AsyncSession = Depends(get_db),
 ):
     """
     Obtiene un trabajador por ID.
     """
-    trabajador = db.query(Trabajador).filter(Trabajador.id == trabajador_id).first()
+    trabajador = await db.get(
+        Trabajador, trabajador_id, options=[joinedload(Trabajador.cargo)]
+    )
 
     if not trabajador:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail="Trabajador no encontrado"
         )
 
+    refs = await referencias.obtener(db)
+
     return TrabajadorResponse(
         id=trabajador.id,
         rut=trabajador.rut,
@@ -51,7 +50,7 @@ async def get_trabajador(
         telefono=trabajador.telefono,
         proyecto_id=trabajador.proyecto_id,
         empresa_id=trabajador.empresa_id,
-        empresa_nombre=trabajador.empresa.nombre if trabajador.empresa else None,
+        empresa_nombre=refs.empresa_nombre(trabajador.empresa_id),
         cargo_id=trabajador.cargo_id,
         cargo_nombre=trabajador.cargo.nombre if trabajador.cargo else None,
         activo=trabajador.activo,
@@ -65,16 +64,17 @@ async def get_trabajador(
 async def update_trabajador(
     trabajador_id: int,
     trabajador_data: TrabajadorUpdate,
-    current_user: Annotated[Usuario, Depends(get_current_user)],
-    db: Session = Depends(get_db),
+    current_user: Annotated[
+        UsuarioToken,
+        Depends(requires_rol(RolUsuario.ADMIN, RolUsuario.GESTOR_PROYECTOS)),
+    ],
+    db: AsyncSession = Depends(get_db),
 ):
     """
     Actualiza un trabajador existente.
     Solo usuarios ADMIN o GESTOR_PROYECTOS pueden actualizar trabajadores.
     """
-    require_admin_or_gestor(current_user)
-
-    trabajador = db.query(Trabajador).filter(Trabajador.id == trabajador_id).first()
+    trabajador = await db.get(Trabajador, trabajador_id)
 
     if not trabajador:
         raise HTTPException(
@@ -83,7 +83,9 @@ async def update_trabajador(
 
     # Verificar unicidad de RUT si se está actualizando
     if trabajador_data.rut and trabajador_data.rut != trabajador.rut:
-        if db.query(Trabajador).filter(Trabajador.rut == trabajador_data.rut).first():
+        if await db.scalar(
+            select(Trabajador).where(Trabajador.rut == trabajador_data.rut)
+        ):
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail="Ya existe un trabajador con este RUT",
@@ -91,9 +93,7 @@ async def update_trabajador(
 
     # Verificar que la empresa exista si se proporciona
     if trabajador_data.empresa_id:
-        empresa = (
-            db.query(Empresa).filter(Empresa.id == trabajador_data.empresa_id).first()
-        )
+        empresa = await db.get(Empresa, trabajador_data.empresa_id)
         if not empresa:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
@@ -102,7 +102,7 @@ async def update_trabajador(
 
     # Verificar que el cargo exista si se proporciona
     if trabajador_data.cargo_id:
-        cargo = db.query(Cargo).filter(Cargo.id == trabajador_data.cargo_id).first()
+        cargo = await db.get(Cargo, trabajador_data.cargo_id)
         if not cargo:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
@@ -129,8 +129,10 @@ async def update_trabajador(
     if trabajador_data.fecha_ingreso is not None:
         trabajador.fecha_ingreso = trabajador_data.fecha_ingreso
 
-    db.commit()
-    db.refresh(trabajador)
+    await db.commit()
+    await db.refresh(trabajador)
+    await db.refresh(trabajador, ["cargo"])
+    refs = await referencias.obtener(db)
 
     return TrabajadorResponse(
         id=trabajador.id,
@@ -142,7 +144,7 @@ async def update_trabajador(
         telefono=trabajador.telefono,
         proyecto_id=trabajador.proyecto_id,
         empresa_id=trabajador.empresa_id,
-        empresa_nombre=trabajador.empresa.nombre if trabajador.empresa else None,
+        empresa_nombre=refs.empresa_nombre(trabajador.empresa_id),
         cargo_id=trabajador.cargo_id,
         cargo_nombre=trabajador.cargo.nombre if trabajador.cargo else None,
         activo=trabajador.activo,
@@ -155,16 +157,17 @@ async def update_trabajador(
 @router.delete("/{trabajador_id}", status_code=status.HTTP_204_NO_CONTENT)
 async def delete_trabajador(
     trabajador_id: int,
-    current_user: Annotated[Usuario, Depends(get_current_user)],
-    db: Session = Depends(get_db),
+    current_user: Annotated[
+        UsuarioToken,
+        Depends(requires_rol(RolUsuario.ADMIN, RolUsuario.GESTOR_PROYECTOS)),
+    ],
+    db: AsyncSession = Depends(get_db),
 ):
     """
     Elimina un trabajador (soft delete).
     Solo usuarios ADMIN o GESTOR_PROYECTOS pueden eliminar trabajadores.
     """
-    require_admin_or_gestor(current_user)
-
-    trabajador = db.query(Trabajador).filter(Trabajador.id == trabajador_id).first()
+    trabajador = await db.get(Trabajador, trabajador_id)
 
     if not trabajador:
         raise HTTPException(
@@ -173,6 +176,6 @@ async def delete_trabajador(
 
     # Soft delete
     trabajador.activo = False
-    db.commit()
+    await db.commit()
 
     return None
@@ -5,44 +5,48 @@ Router de usuarios
 from typing import Annotated
 
 from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.database import get_db
 from app.models import Empresa, Usuario
-from app.models.usuario import RolUsuario
-from app.routers.auth import get_current_user
+from app.routers.auth import get_usuario_token, requires
+from app.schemas.auth import UsuarioToken
 from app.schemas.usuario import (UsuarioCreate, UsuarioListResponse,
                                  UsuarioResponse, UsuarioUpdate)
-from app.utils.security import get_password_hash
+from app.utils.pagination import Paginacion, paginar
+from app.utils.permissions import Permission
+from app.utils.referencias import referencias
+from app.utils.security import get_password_hash_async
 
 router = APIRouter()
 
 
-def require_admin(current_user: Usuario) -> None:
-    """Verifica que el usuario sea ADMIN"""
-    if current_user.rol != RolUsuario.ADMIN:
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="Se requieren permisos de administrador",
-        )
-
-
 @router.get("", response_model=UsuarioListResponse)
 async def get_usuarios(
-    current_user: Annotated[Usuario, Depends(get_current_user)],
-    db: Session = Depends(get_db),
+    current_user: Annotated[UsuarioToken, Depends(get_usuario_token)],
+    paginacion: Annotated[Paginacion, Depends()],
+    db: AsyncSession = Depends(get_db),
     activo: bool = None,
 ):
     """
     Lista todos los usuarios.
-    Opcionalmente filtrar por estado activo.
+    Opcionalmente filtrar por estado activo. Paginado por cursor.
     """
-    query = db.query(Usuario)
+    query = select(Usuario)
 
     if activo is not None:
-        query = query.filter(Usuario.is_active == activo)
-
-    usuarios = query.order_by(Usuario.nombre_completo).all()
+        query = query.where(Usuario.is_active == activo)
+
+    # nombre_completo es nullable: se pagina con los NULL al final, como
+    # en el ORDER BY original
+    claves = (
+        Usuario.nombre_completo.is_(None),
+        func.coalesce(Usuario.nombre_completo, ""),
+        Usuario.id,
+    )
+    usuarios, next_cursor = await paginar(db, query, claves, paginacion)
+    refs = await referencias.obtener(db)
 
     return UsuarioListResponse(
         data=[
@@ -53,7 +57,7 @@ async def get_usuarios(
                 nombre_completo=u.nombre_completo,
                 rol=u.rol.value,
                 empresa_id=u.empresa_id,
-                empresa_nombre=u.empresa.nombre if u.empresa else None,
+                empresa_nombre=refs.empresa_nombre(u.empresa_id),
                 cargo=u.cargo,
                 is_active=u.is_active,
                 last_login=u.last_login,
@@ -61,26 +65,29 @@ async def get_usuarios(
                 updated_at=u.updated_at,
             )
             for u in usuarios
-        ]
+        ],
+        next_cursor=next_cursor,
     )
 
 
 @router.get("/{usuario_id}", response_model=UsuarioResponse)
 async def get_usuario(
     usuario_id: int,
-    current_user: Annotated[Usuario, Depends(get_current_user)],
-    db: Session = Depends(get_db),
+    current_user: Annotated[UsuarioToken, Depends(get_usuario_token)],
+    db: AsyncSession = Depends(get_db),
 ):
     """
     Obtiene un usuario por ID.
     """
-    usuario = db.query(Usuario).filter(Usuario.id == usuario_id).first()
+    usuario = await db.get(Usuario, usuario_id)
 
     if not usuario:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail="Usuario no encontrado"
         )
 
+    refs = await referencias.obtener(db)
+
     return UsuarioResponse(
         id=usuario.id,
         username=usuario.username,
@@ -88,7 +95,7 @@ async def get_usuario(
         nombre_completo=usuario.nombre_completo,
         rol=usuario.rol.value,
         empresa_id=usuario.empresa_id,
-        empresa_nombre=usuario.empresa.nombre if usuario.empresa else None,
+        empresa_nombre=refs.empresa_nombre(usuario.empresa_id),
         cargo=usuario.cargo,
         is_active=usuario.is_active,
         last_login=usuario.last_login,
@@ -100,24 +107,27 @@ async def get_usuario(
 @router.post("", response_model=UsuarioResponse, status_code=status.HTTP_201_CREATED)
 async def create_usuario(
     usuario_data: UsuarioCreate,
-    current_user: Annotated[Usuario, Depends(get_current_user)],
-    db: Session = Depends(get_db),
+    current_user: Annotated[
+        UsuarioToken,
+        Depends(requires(Permission.USUARIOS_GESTIONAR)),
+    ],
+    db: AsyncSession = Depends(get_db),
 ):
     """
     Crea un nuevo usuario.
     Solo usuarios ADMIN pueden crear usuarios.
     """
-    require_admin(current_user)
-
     # Verificar que el email no exista
-    if db.query(Usuario).filter(Usuario.email == usuario_data.email).first():
+    if await db.scalar(select(Usuario).where(Usuario.email == usuario_data.email)):
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Ya existe un usuario con este email",
         )
 
     # Verificar que el username no exista
-    if db.query(Usuario).filter(Usuario.username == usuario_data.username).first():
+    if await db.scalar(
+        select(Usuario).where(Usuario.username == usuario_data.username)
+    ):
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Ya existe un usuario con este nombre de usuario",
@@ -125,9 +135,7 @@ async def create_usuario(
 
     # Verificar que la empresa exista si se proporciona
     if usuario_data.empresa_id:
-        empresa = (
-            db.query(Empresa).filter(Empresa.id == usuario_data.empresa_id).first()
-        )
+        empresa = await db.get(Empresa, usuario_data.empresa_id)
         if not empresa:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
@@ -138,7 +146,7 @@ async def create_usuario(
     nuevo_usuario = Usuario(
         username=usuario_data.username,
         email=usuario_data.email,
-        password_hash=get_password_hash(usuario_data.password),
+        password_hash=await get_password_hash_async(usuario_data.password),
         nombre_completo=usuario_data.nombre_completo,
         rol=usuario_data.rol,
         empresa_id=usuario_data.empresa_id,
@@ -147,8 +155,9 @@ async def create_usuario(
     )
 
     db.add(nuevo_usuario)
-    db.commit()
-    db.refresh(nuevo_usuario)
+    await db.commit()
+    await db.refresh(nuevo_usuario)
+    refs = await referencias.obtener(db)
 
     return UsuarioResponse(
         id=nuevo_usuario.id,
@@ -157,7 +166,7 @@ async def create_usuario(
         nombre_completo=nuevo_usuario.nombre_completo,
         rol=nuevo_usuario.rol.value,
         empresa_id=nuevo_usuario.empresa_id,
-        empresa_nombre=nuevo_usuario.empresa.nombre if nuevo_usuario.empresa else None,
+        empresa_nombre=refs.empresa_nombre(nuevo_usuario.empresa_id),
         cargo=nuevo_usuario.cargo,
         is_active=nuevo_usuario.is_active,
         last_login=nuevo_usuario.last_login,
@@ -170,16 +179,17 @@ async def create_usuario(
 async def update_usuario(
     usuario_id: int,
     usuario_data: UsuarioUpdate,
-    current_user: Annotated[Usuario, Depends(get_current_user)],
-    db: Session = Depends(get_db),
+    current_user: Annotated[
+        UsuarioToken,
+        Depends(requires(Permission.USUARIOS_GESTIONAR)),
+    ],
+    db: AsyncSession = Depends(get_db),
 ):
     """
     Actualiza un usuario existente.
     Solo usuarios ADMIN pueden actualizar usuarios.
     """
-    require_admin(current_user)
-
-    usuario = db.query(Usuario).filter(Usuario.id == usuario_id).first()
+    usuario = await db.get(Usuario, usuario_id)
 
     if not usuario:
         raise HTTPException(
@@ -188,7 +198,7 @@ async def update_usuario(
 
     # Verificar unicidad de email si se está actualizando
     if usuario_data.email and usuario_data.email != usuario.email:
-        if db.query(Usuario).filter(Usuario.email == usuario_data.email).first():
+        if await db.scalar(select(Usuario).where(Usuario.email == usuario_data.email)):
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail="Ya existe un usuario con este email",
@@ -196,7 +206,9 @@ async def update_usuario(
 
     # Verificar unicidad de username si se está actualizando
     if usuario_data.username and usuario_data.username != usuario.username:
-        if db.query(Usuario).filter(Usuario.username == usuario_data.username).first():
+        if await db.scalar(
+            select(Usuario).where(Usuario.username == usuario_data.username)
+        ):
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail="Ya existe un usuario con este nombre de usuario",
@@ -204,15 +216,16 @@ async def update_usuario(
 
     # Verificar que la empresa exista si se proporciona
     if usuario_data.empresa_id:
-        empresa = (
-            db.query(Empresa).filter(Empresa.id == usuario_data.empresa_id).first()
-        )
+        empresa = await db.get(Empresa, usuario_data.empresa_id)
         if not empresa:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail="La empresa especificada no existe",
             )
 
+    # El access token lleva rol y empresa como claims
+    claims_previos = (usuario.rol, usuario.empresa_id, usuario.is_active)
+
     # Actualizar campos proporcionados
     if usuario_data.username is not None:
         usuario.username = usuario_data.username
@@ -229,10 +242,15 @@ async def update_usuario(
     if usuario_data.is_active is not None:
         usuario.is_active = usuario_data.is_active
     if usuario_data.password:
-        usuario.password_hash = get_password_hash(usuario_data.password)
+        usuario.password_hash = await get_password_hash_async(usuario_data.password)
+
+    # Si cambiaron, los tokens emitidos antes deben dejar de aceptarse
+    if (usuario.rol, usuario.empresa_id, usuario.is_active) != claims_previos:
+        usuario.token_version += 1
 
-    db.commit()
-    db.refresh(usuario)
+    await db.commit()
+    await db.refresh(usuario)
+    refs = await referencias.obtener(db)
 
     return UsuarioResponse(
         id=usuario.id,
@@ -241,7 +259,7 @@ async def update_usuario(
         nombre_completo=usuario.nombre_completo,
         rol=usuario.rol.value,
         empresa_id=usuario.empresa_id,
-        empresa_nombre=usuario.empresa.nombre if usuario.empresa else None,
+        empresa_nombre=refs.empresa_nombre(usuario.empresa_id),
         cargo=usuario.cargo,
         is_active=usuario.is_active,
         last_login=usuario.last_login,
@@ -253,16 +271,17 @@ async def update_usuario(
 @router.delete("/{usuario_id}", status_code=status.HTTP_204_NO_CONTENT)
 async def delete_usuario(
     usuario_id: int,
-    current_user: Annotated[Usuario, Depends(get_current_user)],
-    db: Session = Depends(get_db),
+    current_user: Annotated[
+        UsuarioToken,
+        Depends(requires(Permission.USUARIOS_GESTIONAR)),
+    ],
+    db: AsyncSession = Depends(get_db),
 ):
     """
     Elimina un usuario (soft delete).
     Solo usuarios ADMIN pueden eliminar usuarios.
     """
-    require_admin(current_user)
-
-    usuario = db.query(Usuario).filter(Usuario.id == usuario_id).first()
+    usuario = await db.get(Usuario, usuario_id)
 
     if not usuario:
         raise HTTPException(
@@ -278,6 +297,7 @@ async def delete_usuario(
 
     # Soft delete
     usuario.is_active = False
-    db.commit()
+    usuario.token_version += 1
+    await db.commit()
 
     return None
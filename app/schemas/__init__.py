@@ -5,7 +5,8 @@ Schemas Pydantic para validacion de request/response
 from app.schemas.asignacion import (AsignacionListResponse, AsignacionResponse,
                                     RequerimientoListResponse,
                                     RequerimientoResponse)
-from app.schemas.auth import LoginRequest, Token, TokenData, UserResponse
+from app.schemas.auth import (LoginRequest, RefreshRequest, Token, TokenData,
+                              UserResponse, UsuarioToken)
 from app.schemas.cargo import CargoListResponse, CargoResponse, CargoTreeNode
 from app.schemas.ciclo import (CicloCalendarioEvento, CicloCalendarioResponse,
                                CicloListResponse, CicloResponse,
@@ -22,7 +23,9 @@ __all__ = [
     "Token",
     "TokenData",
     "LoginRequest",
+    "RefreshRequest",
     "UserResponse",
+    "UsuarioToken",
     # Empresa
     "EmpresaResponse",
     "EmpresaListResponse",
@@ -2,7 +2,7 @@
 Schemas para Asignacion y Requerimiento
 """
 
-from datetime import datetime
+from datetime import date, datetime
 from typing import List, Optional
 
 from pydantic import BaseModel
@@ -27,6 +27,7 @@ class AsignacionListResponse(BaseModel):
     """Response con lista de asignaciones"""
 
     data: List[AsignacionResponse]
+    next_cursor: Optional[str] = None
 
 
 class RequerimientoResponse(BaseModel):
@@ -50,3 +51,89 @@ class RequerimientoListResponse(BaseModel):
     """Response con lista de requerimientos"""
 
     data: List[RequerimientoResponse]
+
+
+class PeriodoCiclo(BaseModel):
+    """Ciclo involucrado en un conflicto"""
+
+    ciclo_id: int
+    contrato_id: Optional[int] = None
+    letra: Optional[str] = None
+    fecha_inicio: date
+    fecha_fin: date
+
+
+class ConflictoResponse(BaseModel):
+    """Trabajador asignado a dos ciclos que se cruzan"""
+
+    trabajador_id: int
+    trabajador_nombre: Optional[str] = None
+    ciclo: PeriodoCiclo
+    ciclo_solapado: PeriodoCiclo
+    desde: date  # Primer dia en comun
+    hasta: date  # Ultimo dia en comun
+
+
+class ConflictoListResponse(BaseModel):
+    """Response con lista de conflictos"""
+
+    data: List[ConflictoResponse]
+
+
+class ValidarAsignacionesRequest(BaseModel):
+    """Trabajadores candidatos a asignar a un ciclo"""
+
+    trabajador_ids: List[int]
+
+
+class DotacionRequest(BaseModel):
+    """Rango de fechas (inclusive) a completar"""
+
+    desde: date
+    hasta: date
+
+
+class AsignacionNueva(BaseModel):
+    """Asignacion a crear"""
+
+    ciclo_id: int
+    trabajador_id: int
+
+
+class AsignacionPropuesta(AsignacionNueva):
+    """Asignacion propuesta por el motor de dotacion"""
+
+    trabajador_nombre: Optional[str] = None
+    cargo_id: int
+
+
+class RequerimientoFaltante(BaseModel):
+    """Parte de un requerimiento que la propuesta no alcanza a cubrir"""
+
+    ciclo_id: int
+    cargo_id: int
+    cantidad: int
+
+
+class PropuestaDotacionResponse(BaseModel):
+    """
+    Asignaciones a agregar y requerimientos que quedan sin cubrir. La
+    propuesta es de mejor esfuerzo: un faltante no garantiza que no exista
+    otra combinacion de trabajadores que lo cubra.
+    """
+
+    agregar: List[AsignacionPropuesta]
+    faltantes: List[RequerimientoFaltante]
+
+
+class AplicarDotacionRequest(BaseModel):
+    """Asignaciones de una propuesta aceptada"""
+
+    asignaciones: List[AsignacionNueva]
+
+
+class AplicarDotacionResponse(BaseModel):
+    """Resultado de aplicar una propuesta"""
+
+    creadas: int
+    omitidas: int  # Ya existian
@@ -6,6 +6,8 @@ from typing import Optional
 
 from pydantic import BaseModel, EmailStr
 
+from app.models.usuario import RolUsuario
+
 
 class LoginRequest(BaseModel):
     """Request para login"""
@@ -22,6 +24,12 @@ class Token(BaseModel):
     token_type: str = "bearer"
 
 
+class RefreshRequest(BaseModel):
+    """Request para renovar el access token"""
+
+    refresh_token: str
+
+
 class TokenData(BaseModel):
     """Datos codificados en el token"""
 
@@ -29,6 +37,21 @@ class TokenData(BaseModel):
     email: Optional[str] = None
 
 
+class UsuarioToken(BaseModel):
+    """
+    Identidad y permisos tomados de los claims del access token.
+
+    Permite autorizar sin leer la tabla usuarios; para datos que no van en
+    el token (nombre, email, empresa_nombre) usar get_current_user.
+    """
+
+    id: int
+    rol: RolUsuario
+    empresa_id: Optional[int] = None
+    proyecto_ids: list[int] = []
+    version: int = 0
+
+
 class UserResponse(BaseModel):
     """Response con datos del usuario"""
 
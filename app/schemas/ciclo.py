@@ -55,3 +55,17 @@ class CicloCalendarioResponse(BaseModel):
     """Response con eventos de calendario"""
 
     data: List[CicloCalendarioEvento]
+
+
+class GenerarCiclosRequest(BaseModel):
+    """Rango de fechas para generar ciclos desde el patron del contrato"""
+
+    desde: date
+    hasta: date
+
+
+class GenerarCiclosResponse(BaseModel):
+    """Ciclos creados por la generacion y cantidad de omitidos (ya existian)"""
+
+    data: List[CicloResponse]
+    omitidos: int
@@ -34,3 +34,22 @@ class ContratoListResponse(BaseModel):
     """Response con lista de contratos"""
 
     data: List[ContratoResponse]
+
+
+class RotacionContratoResponse(BaseModel):
+    """Letras en turno por dia de un contrato, calculadas desde su patron"""
+
+    contrato_id: int
+    empresa_nombre: Optional[str] = None
+    tipo_turnos: str
+    patron: str
+    # Alineado con RotacionMesResponse.dias: letras en turno (DIA primero).
+    # None si el contrato no tiene fecha_inicio o su patron es invalido.
+    turnos: Optional[List[List[str]]] = None
+
+
+class RotacionMesResponse(BaseModel):
+    """Grilla mensual de turnos de los contratos de un proyecto"""
+
+    dias: List[date]
+    data: List[RotacionContratoResponse]
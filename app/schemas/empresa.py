@@ -44,3 +44,4 @@ class EmpresaListResponse(BaseModel):
     """Response con lista de empresas"""
 
     data: List[EmpresaResponse]
+    next_cursor: Optional[str] = None
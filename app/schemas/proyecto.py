@@ -30,6 +30,7 @@ class ProyectoListResponse(BaseModel):
     """Response con lista de proyectos"""
 
     data: List[ProyectoResponse]
+    next_cursor: Optional[str] = None
 
 
 class ContratoResumenResponse(BaseModel):
@@ -40,3 +40,4 @@ class ServicioListResponse(BaseModel):
     """Response con lista de servicios"""
 
     data: List[ServicioResponse]
+    next_cursor: Optional[str] = None
@@ -64,3 +64,4 @@ class TrabajadorListResponse(BaseModel):
     """Response con lista de trabajadores"""
 
     data: List[TrabajadorResponse]
+    next_cursor: Optional[str] = None
@@ -59,3 +59,4 @@ class UsuarioListResponse(BaseModel):
     """Response con lista de usuarios"""
 
     data: list[UsuarioResponse]
+    next_cursor: Optional[str] = None
@@ -0,0 +1,105 @@
+"""
+Caches en memoria del proceso e invalidacion ligada a commits del ORM
+"""
+
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Hashable, Iterable, Optional
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+_SIN_VALOR = object()
+
+
+class TTLCache:
+    """
+    Cache LRU con expiracion por tiempo.
+
+    Vive en la memoria de cada instancia: no se comparte entre instancias
+    de Cloud Run, por eso el TTL acota cuanto puede durar un dato obsoleto.
+    """
+
+    def __init__(self, maxsize: int = 128, ttl: Optional[float] = None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: OrderedDict[Hashable, tuple[float, Any]] = OrderedDict()
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """Retorna el valor o default si no existe o expiro"""
+        item = self._data.get(key, _SIN_VALOR)
+        if item is _SIN_VALOR:
+            return default
+
+        expira, value = item
+        if expira and expira < time.monotonic():
+            del self._data[key]
+            return default
+
+        self._data.move_to_end(key)
+        return value
+
+    def set(self, key: Hashable, value: Any) -> None:
+        """Guarda un valor, descartando el menos usado si se excede maxsize"""
+        expira = time.monotonic() + self.ttl if self.ttl else 0
+        self._data[key] = (expira, value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def delete(self, key: Hashable) -> None:
+        """Elimina una clave (no falla si no existe)"""
+        self._data.pop(key, None)
+
+    def clear(self) -> None:
+        """Vacia el cache"""
+        self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+# Registro de invalidaciones: (modelo, cache, funcion que retorna claves)
+_invalidaciones: list[tuple[type, TTLCache, Callable[[Any], Iterable]]] = []
+
+
+def invalidar_al_confirmar(
+    modelo: type, cache: TTLCache, claves: Callable[[Any], Iterable]
+) -> None:
+    """
+    Registra que cambios en filas de `modelo` invalidan claves de `cache`.
+
+    Las claves se recolectan en cada flush y se eliminan solo despues del
+    commit, para que ninguna request concurrente vuelva a poblar el cache
+    con datos anteriores al commit. Si la transaccion hace rollback no se
+    invalida nada. `claves(obj)` puede retornar None para vaciar el cache
+    completo.
+    """
+    _invalidaciones.append((modelo, cache, claves))
+
+
+@event.listens_for(Session, "after_flush")
+def _recolectar_invalidaciones(session, flush_context):
+    pendientes = session.info.setdefault("cache_invalidar", set())
+    for obj in (*session.new, *session.dirty, *session.deleted):
+        for modelo, cache, claves in _invalidaciones:
+            if isinstance(obj, modelo):
+                keys = claves(obj)
+                if keys is None:
+                    pendientes.add((cache, _SIN_VALOR))
+                else:
+                    pendientes.update((cache, key) for key in keys)
+
+
+@event.listens_for(Session, "after_commit")
+def _aplicar_invalidaciones(session):
+    for cache, key in session.info.pop("cache_invalidar", ()):
+        if key is _SIN_VALOR:
+            cache.clear()
+        else:
+            cache.delete(key)
+
+
+@event.listens_for(Session, "after_rollback")
+def _descartar_invalidaciones(session):
+    session.info.pop("cache_invalidar", None)
@@ -0,0 +1,273 @@
+"""
+Motor de asignacion automatica: propone asignaciones para cubrir los
+requerimientos abiertos de los ciclos de un proyecto
+"""
+
+import heapq
+from array import array
+from bisect import bisect_right
+from collections import defaultdict
+from dataclasses import dataclass, field
+from datetime import date
+
+from sqlalchemy import func, select
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models import Asignacion, Ciclo, Contrato, Requerimiento, Trabajador
+from app.models.ciclo import EstadoCiclo
+
+
+@dataclass
+class Propuesta:
+    """Asignaciones propuestas y lo que no se pudo cubrir"""
+
+    # (ciclo_id, trabajador_id, cargo_id)
+    asignaciones: list[tuple[int, int, int]] = field(default_factory=list)
+    # (ciclo_id, cargo_id, cantidad sin cubrir)
+    faltantes: list[tuple[int, int, int]] = field(default_factory=list)
+
+
+def proponer(
+    ciclos: list[tuple[int, int, int, int]],
+    brechas: dict[int, list[tuple[int, int]]],
+    trabajadores: list[tuple[int, int, int]],
+    ocupados: list[tuple[int, int, int]],
+) -> Propuesta:
+    """
+    Asigna trabajadores a las brechas de cada ciclo.
+
+    Entradas (fechas como ordinales, fin inclusive):
+        ciclos: (ciclo_id, inicio, fin, empresa_id)
+        brechas: ciclo_id -> [(cargo_id, cantidad faltante)]
+        trabajadores: (trabajador_id, empresa_id, cargo_id) disponibles
+        ocupados: (trabajador_id, inicio, fin) de asignaciones existentes
+
+    Cada brecha se cubre con trabajadores de la empresa del contrato y del
+    cargo requerido. Los ciclos se recorren por fecha de inicio; en cada
+    uno se eligen los trabajadores libres de menor carga (dias asignados).
+    Un trabajador elegido vuelve a estar libre al terminar
+    su ciclo, desde el dia siguiente a su fin (particion de intervalos con
+    un heap por fecha de fin), por lo
+    que nunca queda en dos ciclos que se cruzan. Las asignaciones
+    existentes se consultan con busqueda binaria sobre arreglos por
+    trabajador.
+
+    La cobertura es de mejor esfuerzo: la eleccion de cada ciclo no se
+    revisa al llegar a los siguientes, por lo que un trabajador elegido
+    antes puede ser el unico libre para un ciclo posterior y dejar un
+    faltante que otra combinacion cubriria. Con asignaciones existentes
+    distintas por trabajador la cobertura maxima es un problema de
+    scheduling con disponibilidad por maquina (NP-dificil en general).
+
+    Costo O((brechas + trabajadores) log trabajadores), mas los
+    trabajadores descartados por chocar con asignaciones existentes.
+    """
+    n = len(trabajadores)
+    ids = array("q", (t[0] for t in trabajadores))
+    posicion = {trabajador_id: i for i, trabajador_id in enumerate(ids)}
+    carga = array("q", bytes(8 * n))
+
+    # Asignaciones existentes: inicios ordenados y fin maximo acumulado
+    intervalos = defaultdict(list)
+    for trabajador_id, inicio, fin in ocupados:
+        i = posicion.get(trabajador_id)
+        if i is not None:
+            intervalos[i].append((inicio, fin))
+            carga[i] += fin - inicio + 1
+    inicios: dict[int, array] = {}
+    fin_maximo: dict[int, array] = {}
+    for i, lista in intervalos.items():
+        lista.sort()
+        inicios[i] = array("q", (inicio for inicio, _ in lista))
+        maximos = array("q")
+        for _, fin in lista:
+            maximos.append(max(fin, maximos[-1]) if maximos else fin)
+        fin_maximo[i] = maximos
+
+    def choca(i: int, inicio: int, fin: int) -> bool:
+        if i not in inicios:
+            return False
+        k = bisect_right(inicios[i], fin) - 1
+        return k >= 0 and fin_maximo[i][k] >= inicio
+
+    # Por (empresa_id, cargo_id): heap de libres por carga y de elegidos
+    # por fecha de fin de su ultimo ciclo
+    libres: dict[tuple[int, int], list] = defaultdict(list)
+    en_turno: dict[tuple[int, int], list] = defaultdict(list)
+    for i, (_, empresa_id, cargo_id) in enumerate(trabajadores):
+        libres[(empresa_id, cargo_id)].append((carga[i], i))
+    for heap in libres.values():
+        heapq.heapify(heap)
+
+    propuesta = Propuesta()
+    orden = sorted(ciclos, key=lambda c: (c[1], c[0]))
+    for ciclo_id, inicio, fin, empresa_id in orden:
+        for cargo_id, faltan in brechas.get(ciclo_id, ()):
+            grupo = (empresa_id, cargo_id)
+            disponibles, ocupados_grupo = libres[grupo], en_turno[grupo]
+            while ocupados_grupo and ocupados_grupo[0][0] < inicio:
+                _, i = heapq.heappop(ocupados_grupo)
+                heapq.heappush(disponibles, (carga[i], i))
+
+            apartados = []
+            asignados = 0
+            while asignados < faltan and disponibles:
+                item = heapq.heappop(disponibles)
+                i = item[1]
+                if choca(i, inicio, fin):
+                    apartados.append(item)
+                    continue
+                propuesta.asignaciones.append((ciclo_id, ids[i], cargo_id))
+                carga[i] += fin - inicio + 1
+                heapq.heappush(ocupados_grupo, (fin, i))
+                asignados += 1
+            for item in apartados:
+                heapq.heappush(disponibles, item)
+
+            if asignados < faltan:
+                faltante = (ciclo_id, cargo_id, faltan - asignados)
+                propuesta.faltantes.append(faltante)
+
+    return propuesta
+
+
+async def proponer_dotacion(
+    db: AsyncSession, proyecto_id: int, desde: date, hasta: date
+) -> tuple[Propuesta, dict[int, str]]:
+    """
+    Propuesta para los ciclos INCOMPLETO del proyecto que se cruzan con
+    desde/hasta, con los trabajadores activos del proyecto (de mejor
+    esfuerzo, ver proponer). Cuatro queries de columnas (sin cargar
+    entidades del ORM); no modifica datos.
+
+    Retorna la propuesta y el nombre de cada trabajador propuesto.
+    """
+    filas_ciclos = (
+        await db.execute(
+            select(
+                Ciclo.id,
+                Ciclo.fecha_inicio,
+                Ciclo.fecha_fin,
+                Contrato.empresa_id,
+            )
+            .join(Contrato, Ciclo.contrato_id == Contrato.id)
+            .where(
+                Contrato.proyecto_id == proyecto_id,
+                Contrato.activo.is_(True),
+                Ciclo.estado == EstadoCiclo.INCOMPLETO,
+                Ciclo.fecha_fin >= desde,
+                Ciclo.fecha_inicio <= hasta,
+            )
+        )
+    ).all()
+    if not filas_ciclos:
+        return Propuesta(), {}
+    ciclos = [
+        (ciclo_id, inicio.toordinal(), fin.toordinal(), empresa_id)
+        for ciclo_id, inicio, fin, empresa_id in filas_ciclos
+    ]
+    ciclo_ids = [c[0] for c in ciclos]
+
+    # Brecha por requerimiento: necesarios menos asignados de ese cargo
+    asignados_sq = (
+        select(
+            Asignacion.ciclo_id,
+            Trabajador.cargo_id,
+            func.count(Asignacion.id).label("asignados"),
+        )
+        .join(Trabajador, Asignacion.trabajador_id == Trabajador.id)
+        .where(Asignacion.ciclo_id.in_(ciclo_ids))
+        .group_by(Asignacion.ciclo_id, Trabajador.cargo_id)
+        .subquery()
+    )
+    faltan = Requerimiento.cantidad_necesaria - func.coalesce(
+        asignados_sq.c.asignados, 0
+    )
+    brechas = defaultdict(list)
+    for ciclo_id, cargo_id, cantidad in await db.execute(
+        select(Requerimiento.ciclo_id, Requerimiento.cargo_id, faltan)
+        .outerjoin(
+            asignados_sq,
+            (asignados_sq.c.ciclo_id == Requerimiento.ciclo_id)
+            & (asignados_sq.c.cargo_id == Requerimiento.cargo_id),
+        )
+        .where(Requerimiento.ciclo_id.in_(ciclo_ids), faltan > 0)
+    ):
+        brechas[ciclo_id].append((cargo_id, cantidad))
+
+    cargos = list({c for lista in brechas.values() for c, _ in lista})
+    filas_trabajadores = (
+        await db.execute(
+            select(
+                Trabajador.id,
+                Trabajador.empresa_id,
+                Trabajador.cargo_id,
+                Trabajador.nombres,
+                Trabajador.apellidos,
+            ).where(
+                Trabajador.proyecto_id == proyecto_id,
+                Trabajador.activo.is_(True),
+                Trabajador.cargo_id.in_(cargos),
+            )
+        )
+    ).all()
+    trabajadores = [(t[0], t[1], t[2]) for t in filas_trabajadores]
+
+    # Asignaciones existentes de esos trabajadores en el rango de los ciclos
+    inicio_min = min(f[1] for f in filas_ciclos)
+    fin_max = max(f[2] for f in filas_ciclos)
+    ocupados = [
+        (trabajador_id, inicio.toordinal(), fin.toordinal())
+        for trabajador_id, inicio, fin in await db.execute(
+            select(
+                Asignacion.trabajador_id,
+                Ciclo.fecha_inicio,
+                Ciclo.fecha_fin,
+            )
+            .join(Ciclo, Asignacion.ciclo_id == Ciclo.id)
+            .join(Trabajador, Asignacion.trabajador_id == Trabajador.id)
+            .where(
+                Trabajador.proyecto_id == proyecto_id,
+                Trabajador.activo.is_(True),
+                Trabajador.cargo_id.in_(cargos),
+                Ciclo.fecha_fin >= inicio_min,
+                Ciclo.fecha_inicio <= fin_max,
+            )
+        )
+    ]
+
+    propuesta = proponer(ciclos, brechas, trabajadores, ocupados)
+    propuestos = {t for _, t, _ in propuesta.asignaciones}
+    elegidos = (t for t in filas_trabajadores if t[0] in propuestos)
+    nombres = {t[0]: f"{t[3]} {t[4]}" for t in elegidos}
+    return propuesta, nombres
+
+
+async def aplicar_dotacion(
+    db: AsyncSession,
+    pares: list[tuple[int, int]],
+) -> int:
+    """
+    Inserta las asignaciones (ciclo_id, trabajador_id) en un solo INSERT
+    ... ON CONFLICT DO NOTHING sobre unique_asignacion: las que ya existen
+    se omiten. Un cruce de fechas sigue violando asignaciones_sin_solapamiento
+    (IntegrityError). Los triggers actualizan cobertura y estado de los
+    ciclos. No hace commit.
+
+    Retorna la cantidad de asignaciones creadas.
+    """
+    if not pares:
+        return 0
+    creadas = await db.scalars(
+        insert(Asignacion)
+        .values(
+            [
+                {"ciclo_id": ciclo_id, "trabajador_id": trabajador_id}
+                for ciclo_id, trabajador_id in pares
+            ]
+        )
+        .on_conflict_do_nothing(constraint="unique_asignacion")
+        .returning(Asignacion.id)
+    )
+    return len(creadas.all())
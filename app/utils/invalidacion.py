@@ -0,0 +1,111 @@
+"""
+Invalidacion de caches entre instancias via LISTEN/NOTIFY de Postgres
+"""
+
+import asyncio
+import json
+import logging
+from collections import defaultdict
+from typing import Any, Callable, Iterable, Optional
+
+from app.database import engine
+from app.utils.cache import TTLCache
+
+logger = logging.getLogger(__name__)
+
+# Canal usado por la funcion notificar_cambio() de sql/001_schema.sql
+CANAL = "cache_invalidacion"
+
+# Cada cuantos segundos se verifica que la conexion de LISTEN siga viva
+INTERVALO_PING = 30
+
+# Acciones por tabla. Reciben las claves de la fila cambiada, o None si se
+# perdieron avisos (reconexion) y hay que descartar todo.
+_acciones: dict[str, list[Callable[[Optional[dict]], Any]]] = defaultdict(list)
+
+
+def al_notificar(tabla: str, accion: Callable[[Optional[dict]], Any]) -> None:
+    """
+    Registra `accion` para los cambios en filas de `tabla` hechos por
+    cualquier instancia (incluida esta). Las claves disponibles son los
+    argumentos del trigger notificar_<tabla>.
+    """
+    _acciones[tabla].append(accion)
+
+
+def invalidar_al_notificar(
+    tabla: str, cache: TTLCache, claves: Callable[[dict], Optional[Iterable]]
+) -> None:
+    """
+    Equivalente a invalidar_al_confirmar para cambios de otras instancias:
+    `claves(fila)` retorna las claves de `cache` a eliminar, o None para
+    vaciarlo completo.
+    """
+
+    def invalidar(fila: Optional[dict]) -> None:
+        keys = None if fila is None else claves(fila)
+        if keys is None:
+            cache.clear()
+        else:
+            for key in keys:
+                cache.delete(key)
+
+    al_notificar(tabla, invalidar)
+
+
+def despachar(payload: str) -> None:
+    """Aplica un aviso {"tabla": ..., "claves": {...}} recibido por el canal"""
+    try:
+        aviso = json.loads(payload)
+        tabla, fila = aviso["tabla"], aviso["claves"]
+    except (ValueError, KeyError, TypeError):
+        logger.warning("Aviso de invalidacion invalido: %s", payload[:200])
+        return
+
+    for accion in _acciones.get(tabla, ()):
+        try:
+            accion(fila)
+        except Exception:
+            logger.exception("Error invalidando cache por cambio en %s", tabla)
+
+
+def invalidar_todo() -> None:
+    """Descarta todo lo registrado (avisos que se pudieron perder)"""
+    for tabla, acciones in _acciones.items():
+        for accion in acciones:
+            try:
+                accion(None)
+            except Exception:
+                logger.exception("Error invalidando cache de %s", tabla)
+
+
+async def escuchar(reintento: float = 5) -> None:
+    """
+    Tarea de fondo: escucha el canal con una conexion dedicada del engine.
+
+    Si la conexion se pierde reintenta cada `reintento` segundos; al
+    (re)conectar se descarta todo, porque los avisos enviados mientras no
+    se escuchaba no se reciben.
+    """
+    while True:
+        try:
+            async with engine.connect() as conn:
+                raw = (await conn.get_raw_connection()).driver_connection
+                perdida = asyncio.Event()
+                raw.add_termination_listener(lambda _: perdida.set())
+                await raw.add_listener(CANAL, lambda *args: despachar(args[-1]))
+                try:
+                    invalidar_todo()
+                    while not perdida.is_set():
+                        try:
+                            await asyncio.wait_for(perdida.wait(), INTERVALO_PING)
+                        except asyncio.TimeoutError:
+                            await raw.execute("SELECT 1")
+                finally:
+                    # No devolver al pool una conexion con LISTEN activo
+                    await conn.invalidate()
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            logger.exception("Conexion de invalidacion de caches perdida")
+        await asyncio.sleep(reintento)
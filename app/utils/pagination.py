@@ -0,0 +1,113 @@
+"""
+Paginacion por cursor (keyset) para endpoints de listas
+"""
+
+import base64
+import json
+from datetime import date, datetime
+from typing import Any, Optional, Sequence
+
+from fastapi import HTTPException, Query, status
+from sqlalchemy import Select, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+
+LIMITE_DEFECTO = 100
+LIMITE_MAXIMO = 500
+
+
+class Paginacion:
+    """
+    Parametros de paginacion (usar con Depends()).
+
+    `cursor` es el `next_cursor` de la pagina anterior; sin cursor se
+    retorna la primera pagina.
+    """
+
+    def __init__(
+        self,
+        cursor: Optional[str] = None,
+        limit: int = Query(LIMITE_DEFECTO, ge=1, le=LIMITE_MAXIMO),
+    ):
+        self.cursor = cursor
+        self.limit = limit
+
+
+def codificar_cursor(valores: Sequence[Any]) -> str:
+    """Codifica los valores de las claves de la ultima fila"""
+    data = json.dumps([_a_json(v) for v in valores], separators=(",", ":"))
+    return base64.urlsafe_b64encode(data.encode()).decode().rstrip("=")
+
+
+def decodificar_cursor(cursor: str, claves: Sequence) -> list:
+    """Decodifica un cursor y convierte cada valor al tipo de su clave"""
+    try:
+        relleno = "=" * (-len(cursor) % 4)
+        valores = json.loads(base64.urlsafe_b64decode(cursor + relleno))
+        if not isinstance(valores, list) or len(valores) != len(claves):
+            raise ValueError("Cursor con claves incorrectas")
+        return [_desde_json(v, clave) for v, clave in zip(valores, claves)]
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST, detail="Cursor invalido"
+        )
+
+
+async def paginar(
+    db: AsyncSession, query: Select, claves: Sequence, paginacion: Paginacion
+) -> tuple[list, Optional[str]]:
+    """
+    Ejecuta una pagina de `query` ordenada por `claves`.
+
+    Las claves deben identificar cada fila de forma unica (terminar en el
+    id) y ser NOT NULL; para columnas nullable usar expresiones como
+    `col.is_(None), func.coalesce(col, "")`. La query no debe traer
+    ORDER BY ni LIMIT propios.
+
+    Retorna (filas, next_cursor). Si la query selecciona una sola entidad
+    las filas son esa entidad (como db.scalars); si no, tuplas.
+    """
+    n = len(claves)
+    una_columna = len(query.column_descriptions) == 1
+
+    if paginacion.cursor:
+        valores = decodificar_cursor(paginacion.cursor, claves)
+        query = query.where(tuple_(*claves) > tuple_(*valores))
+
+    rows = (
+        await db.execute(
+            query.add_columns(*claves).order_by(*claves).limit(paginacion.limit + 1)
+        )
+    ).all()
+
+    next_cursor = None
+    if len(rows) > paginacion.limit:
+        rows = rows[: paginacion.limit]
+        next_cursor = codificar_cursor(rows[-1][-n:])
+
+    if una_columna:
+        return [row[0] for row in rows], next_cursor
+    return [tuple(row[:-n]) for row in rows], next_cursor
+
+
+def _a_json(valor: Any) -> Any:
+    if isinstance(valor, (date, datetime)):
+        return valor.isoformat()
+    return valor
+
+
+def _desde_json(valor: Any, clave) -> Any:
+    if valor is None:
+        raise ValueError("Cursor con valor nulo")
+
+    tipo = clave.type.python_type
+    if tipo is datetime:
+        return datetime.fromisoformat(valor)
+    if tipo is date:
+        return date.fromisoformat(valor)
+    if tipo is bool:
+        if not isinstance(valor, bool):
+            raise ValueError("Cursor con tipo incorrecto")
+        return valor
+    if not isinstance(valor, tipo):
+        raise ValueError("Cursor con tipo incorrecto")
+    return valor
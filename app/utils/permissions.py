@@ -3,11 +3,12 @@ Sistema de permisos RBAC (Role-Based Access Control)
 """
 
 from enum import Enum
-from typing import List
+from typing import Iterable, List
 
 from fastapi import HTTPException, status
 
 from app.models.usuario import RolUsuario
+from app.schemas.auth import UsuarioToken
 
 
 class Permission(str, Enum):
@@ -89,6 +90,26 @@ ROLE_PERMISSIONS: dict[RolUsuario, List[Permission]] = {
 }
 
 
+# Permisos compilados a bits: cada Permission es un bit y cada rol una
+# mascara, calculadas al importar a partir de ROLE_PERMISSIONS.
+PERMISSION_BITS: dict[Permission, int] = {
+    permission: 1 << i for i, permission in enumerate(Permission)
+}
+
+
+def permission_mask(permissions: Iterable[Permission]) -> int:
+    """Mascara con los bits de los permisos dados"""
+    mask = 0
+    for permission in permissions:
+        mask |= PERMISSION_BITS[permission]
+    return mask
+
+
+ROLE_MASKS: dict[RolUsuario, int] = {
+    rol: permission_mask(permissions) for rol, permissions in ROLE_PERMISSIONS.items()
+}
+
+
 def has_permission(rol: RolUsuario, permission: Permission) -> bool:
     """
     Verifica si un rol tiene un permiso especifico.
@@ -100,7 +121,7 @@ def has_permission(rol: RolUsuario, permission: Permission) -> bool:
     Returns:
         True si tiene el permiso, False en caso contrario
     """
-    return permission in ROLE_PERMISSIONS.get(rol, [])
+    return bool(ROLE_MASKS.get(rol, 0) & PERMISSION_BITS[permission])
 
 
 def has_any_permission(rol: RolUsuario, permissions: List[Permission]) -> bool:
@@ -114,8 +135,7 @@ def has_any_permission(rol: RolUsuario, permissions: List[Permission]) -> bool:
     Returns:
         True si tiene al menos uno, False en caso contrario
     """
-    user_permissions = ROLE_PERMISSIONS.get(rol, [])
-    return any(p in user_permissions for p in permissions)
+    return bool(ROLE_MASKS.get(rol, 0) & permission_mask(permissions))
 
 
 def require_permission(rol: RolUsuario, permission: Permission) -> None:
@@ -154,3 +174,26 @@ def require_roles(rol: RolUsuario, allowed_roles: List[RolUsuario]) -> None:
             status_code=status.HTTP_403_FORBIDDEN,
             detail="No tiene el rol necesario para realizar esta accion",
         )
+
+
+def require_proyecto(usuario: UsuarioToken, proyecto_id: int) -> None:
+    """
+    Requiere acceso al proyecto: los roles con PROYECTOS_VER_TODOS acceden
+    a todos, el resto solo a sus proyectos asignados (claim proy del token,
+    vigente mientras token_version no cambie).
+    Lanza HTTPException 403 si no lo tiene.
+
+    Args:
+        usuario: Usuario del token
+        proyecto_id: Proyecto al que se accede
+
+    Raises:
+        HTTPException: Si el proyecto no esta asignado al usuario
+    """
+    if has_permission(usuario.rol, Permission.PROYECTOS_VER_TODOS):
+        return
+    if proyecto_id not in usuario.proyecto_ids:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="No tiene acceso a este proyecto",
+        )
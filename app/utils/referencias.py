@@ -0,0 +1,147 @@
+"""
+Cache en memoria de datos de referencia: empresas y servicios
+"""
+
+import json
+import time
+from typing import Optional
+
+from fastapi import Response
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models import Empresa, Servicio
+from app.schemas.empresa import EmpresaResponse
+from app.schemas.servicio import ServicioResponse
+from app.utils import pagination
+from app.utils.invalidacion import al_notificar
+from app.utils.pagination import Paginacion
+
+
+class ListaSerializada:
+    """
+    Filas de una tabla de referencia en el orden de su listado, con el JSON
+    de cada una ya serializado. Permite armar una pagina sin tocar la DB.
+    """
+
+    def __init__(self, filas: list, claves: tuple):
+        self.claves = claves
+        self.filas = filas
+        self.json = [f.model_dump_json().encode() for f in filas]
+        self._posicion = {self._clave(f): i for i, f in enumerate(filas)}
+
+    def _clave(self, fila) -> tuple:
+        return tuple(getattr(fila, c.key) for c in self.claves)
+
+    def pagina(
+        self, paginacion: Paginacion, activo: Optional[bool] = None
+    ) -> Optional[Response]:
+        """
+        Pagina como JSON ({"data": [...], "next_cursor": ...}).
+
+        El orden es el de la DB al cargar (su collation); un cursor se ubica
+        por la fila exacta que lo genero. Si esa fila ya no existe retorna
+        None y el endpoint debe paginar con la DB.
+        """
+        inicio = 0
+        if paginacion.cursor:
+            clave = tuple(pagination.decodificar_cursor(paginacion.cursor, self.claves))
+            if clave not in self._posicion:
+                return None
+            inicio = self._posicion[clave] + 1
+
+        indices = []
+        for i in range(inicio, len(self.filas)):
+            if activo is None or self.filas[i].activo == activo:
+                indices.append(i)
+                if len(indices) > paginacion.limit:
+                    break
+
+        next_cursor = None
+        if len(indices) > paginacion.limit:
+            indices = indices[: paginacion.limit]
+            next_cursor = pagination.codificar_cursor(
+                self._clave(self.filas[indices[-1]])
+            )
+
+        body = (
+            b'{"data":['
+            + b",".join(self.json[i] for i in indices)
+            + b'],"next_cursor":'
+            + json.dumps(next_cursor).encode()
+            + b"}"
+        )
+        return Response(content=body, media_type="application/json")
+
+
+class Referencias:
+    """Foto de empresas y servicios en un momento dado"""
+
+    def __init__(self, empresas: list[Empresa], servicios: list[Servicio]):
+        self.empresas = ListaSerializada(
+            [EmpresaResponse.model_validate(e) for e in empresas],
+            (Empresa.nombre, Empresa.id),
+        )
+        self.servicios = ListaSerializada(
+            [ServicioResponse.model_validate(s) for s in servicios],
+            (Servicio.nombre, Servicio.id),
+        )
+        self._empresas = {e.id: e.nombre for e in empresas}
+        self._servicios = {s.id: s.nombre for s in servicios}
+
+    def empresa_nombre(self, empresa_id: Optional[int]) -> Optional[str]:
+        return self._empresas.get(empresa_id)
+
+    def servicio_nombre(self, servicio_id: Optional[int]) -> Optional[str]:
+        return self._servicios.get(servicio_id)
+
+
+class CatalogoReferencias:
+    """
+    Empresas y servicios cacheados en memoria: son tablas chicas que
+    cambian poco y casi todas las respuestas resuelven sus nombres.
+
+    Los handlers que las modifican llaman a invalidar() despues del commit,
+    lo que incrementa la version; la siguiente lectura recarga ambas
+    tablas. Los cambios hechos en otra instancia invalidan por los avisos
+    de app.utils.invalidacion; el TTL cubre avisos perdidos.
+    """
+
+    def __init__(self, ttl: float = 300):
+        self.ttl = ttl
+        self.version = 0
+        self._referencias: Optional[Referencias] = None
+        self._version_cargada = -1
+        self._expira = 0.0
+
+    def invalidar(self) -> None:
+        self.version += 1
+
+    async def obtener(self, db: AsyncSession) -> Referencias:
+        """Referencias vigentes; recarga si cambio la version o vencio el TTL"""
+        if (
+            self._referencias is not None
+            and self._version_cargada == self.version
+            and time.monotonic() < self._expira
+        ):
+            return self._referencias
+
+        # Si se invalida durante la carga, la proxima lectura recarga otra vez
+        version = self.version
+        empresas = (
+            await db.scalars(select(Empresa).order_by(Empresa.nombre, Empresa.id))
+        ).all()
+        servicios = (
+            await db.scalars(select(Servicio).order_by(Servicio.nombre, Servicio.id))
+        ).all()
+
+        self._referencias = Referencias(empresas, servicios)
+        self._version_cargada = version
+        self._expira = time.monotonic() + self.ttl
+        return self._referencias
+
+
+referencias = CatalogoReferencias()
+
+al_notificar("empresas", lambda e: referencias.invalidar())
+al_notificar("servicios", lambda s: referencias.invalidar())
@@ -0,0 +1,157 @@
+"""
+Revocacion de tokens JWT por jti (logout)
+"""
+
+import asyncio
+import hashlib
+import logging
+import math
+import time
+from datetime import datetime, timezone
+from typing import Optional
+
+from sqlalchemy import delete, exists, func, select
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.database import SessionLocal
+from app.models.token_revocado import TokenRevocado
+from app.utils.cache import TTLCache
+from app.utils.invalidacion import al_notificar
+
+logger = logging.getLogger(__name__)
+
+
+class BloomFilter:
+    """
+    Filtro de Bloom sobre un bytearray.
+
+    No tiene falsos negativos: si una clave no esta, nunca fue agregada.
+    Los falsos positivos se mantienen cerca de tasa_fp mientras no se
+    agreguen mas de `capacidad` claves.
+    """
+
+    def __init__(self, capacidad: int, tasa_fp: float = 0.001):
+        self.m = max(8, math.ceil(-capacidad * math.log(tasa_fp) / math.log(2) ** 2))
+        self.k = max(1, round(self.m / capacidad * math.log(2)))
+        self._bits = bytearray((self.m + 7) // 8)
+
+    def _posiciones(self, clave: str) -> list[int]:
+        # Doble hashing (Kirsch-Mitzenmacher) sobre un solo digest
+        digest = hashlib.blake2b(clave.encode(), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        return [(h1 + i * h2) % self.m for i in range(self.k)]
+
+    def add(self, clave: str) -> None:
+        for pos in self._posiciones(clave):
+            self._bits[pos >> 3] |= 1 << (pos & 7)
+
+    def __contains__(self, clave: str) -> bool:
+        return all(
+            self._bits[pos >> 3] & (1 << (pos & 7)) for pos in self._posiciones(clave)
+        )
+
+
+class RevocacionTokens:
+    """
+    Tokens revocados: tabla tokens_revocados con un filtro de Bloom en memoria.
+
+    El filtro contiene los jti revocados conocidos por la instancia, por lo
+    que el caso normal (token no revocado) se resuelve sin consultar la DB.
+    Un acierto del filtro se confirma con las revocaciones hechas en esta
+    instancia (conjunto exacto, chico) o con una query cuyo resultado se
+    guarda en `_verificados`.
+
+    Las revocaciones de otras instancias llegan por los avisos de
+    app.utils.invalidacion (ver agregar_remoto); la recarga periodica del
+    filtro (ver mantener) cubre avisos perdidos.
+    """
+
+    def __init__(self, capacidad: int = 100_000, tasa_fp: float = 0.001):
+        self.capacidad = capacidad
+        self.tasa_fp = tasa_fp
+        self._filtro = BloomFilter(capacidad, tasa_fp)
+        # jti -> exp (epoch) de las revocaciones hechas en esta instancia
+        self._revocados: dict[str, float] = {}
+        # jti -> revocado segun la DB, para aciertos del filtro
+        self._verificados = TTLCache(maxsize=1024, ttl=60)
+
+    def _agregar(self, jti: str, exp: float) -> None:
+        self._revocados[jti] = exp
+        self._filtro.add(jti)
+        self._verificados.delete(jti)
+
+    def agregar_remoto(self, jti: str) -> None:
+        """Revocacion hecha en otra instancia; los aciertos se confirman en la DB"""
+        self._filtro.add(jti)
+        self._verificados.delete(jti)
+
+    async def revocar(self, db: AsyncSession, jti: str, exp: float) -> None:
+        """Revoca el token hasta su expiracion (exp en segundos epoch)"""
+        await db.execute(
+            insert(TokenRevocado)
+            .values(jti=jti, expira=datetime.fromtimestamp(exp, timezone.utc))
+            .on_conflict_do_nothing()
+        )
+        await db.commit()
+        self._agregar(jti, exp)
+
+    async def esta_revocado(self, db: AsyncSession, jti: str) -> bool:
+        """True si el jti fue revocado"""
+        if jti not in self._filtro:
+            return False
+
+        if jti in self._revocados:
+            return True
+
+        revocado = self._verificados.get(jti)
+        if revocado is None:
+            revocado = bool(
+                await db.scalar(select(exists().where(TokenRevocado.jti == jti)))
+            )
+            self._verificados.set(jti, revocado)
+        return revocado
+
+    async def recargar(self, db: AsyncSession) -> None:
+        """Purga de la tabla los tokens ya expirados y reconstruye el filtro"""
+        await db.execute(
+            delete(TokenRevocado).where(TokenRevocado.expira <= func.now())
+        )
+        await db.commit()
+        jtis = (await db.scalars(select(TokenRevocado.jti))).all()
+
+        filtro = BloomFilter(max(self.capacidad, 2 * len(jtis)), self.tasa_fp)
+        for jti in jtis:
+            filtro.add(jti)
+
+        # Las revocaciones locales hechas durante la recarga tambien entran
+        ahora = time.time()
+        self._revocados = {j: exp for j, exp in self._revocados.items() if exp > ahora}
+        for jti in self._revocados:
+            filtro.add(jti)
+
+        self._filtro = filtro
+        self._verificados.clear()
+
+    async def mantener(self, intervalo: float) -> None:
+        """Recarga el filtro cada `intervalo` segundos (tarea de fondo)"""
+        while True:
+            try:
+                async with SessionLocal() as db:
+                    await self.recargar(db)
+            except Exception:
+                logger.exception("Error recargando tokens revocados")
+            await asyncio.sleep(intervalo)
+
+
+revocaciones = RevocacionTokens()
+
+
+def _revocacion_notificada(token: Optional[dict]) -> None:
+    # Sin claves (avisos perdidos) no hay nada que agregar: lo cubre mantener
+    if token is not None:
+        revocaciones.agregar_remoto(token["jti"])
+
+
+al_notificar("tokens_revocados", _revocacion_notificada)
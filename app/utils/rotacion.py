@@ -0,0 +1,200 @@
+"""
+Motor de rotacion: expande el patron de turnos de un contrato en ciclos
+"""
+
+import re
+from datetime import date, timedelta
+
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models import Ciclo, Contrato
+from app.models.contrato import TipoTurnos
+
+# Cuadrillas que trabajan juntas en cada bloque: la primera de cada par de
+# DIA y la segunda de NOCHE. En ABCD, C/D relevan a A/B cuando estas bajan,
+# por lo que el patron debe tener iguales dias de trabajo y de descanso.
+CUADRILLAS = {
+    TipoTurnos.AB: [[("A", "DIA"), ("B", "NOCHE")]],
+    TipoTurnos.ABCD: [[("A", "DIA"), ("B", "NOCHE")], [("C", "DIA"), ("D", "NOCHE")]],
+}
+
+PATRON = re.compile(r"^\s*(\d+)\s*[xX]\s*(\d+)\s*$")
+
+
+def parsear_patron(patron: str) -> tuple[int, int]:
+    """
+    Dias de trabajo y de descanso de un patron "NxM" (p.ej. "7x7", "5x2").
+
+    Raises:
+        ValueError: si el patron no tiene ese formato o algun valor es 0
+    """
+    match = PATRON.match(patron or "")
+    if not match:
+        raise ValueError(f"Patron de turnos invalido: {patron!r}")
+    trabajo, descanso = int(match.group(1)), int(match.group(2))
+    if trabajo < 1 or descanso < 1:
+        raise ValueError(f"Patron de turnos invalido: {patron!r}")
+    return trabajo, descanso
+
+
+class Rotacion:
+    """
+    Calendario de turnos de un contrato, calculado sin leer ciclos.
+
+    La rotacion parte en `inicio` con A/B y se repite cada trabajo+descanso
+    dias; C/D (en ABCD) parten trabajo dias despues. Cada bloque dura los
+    dias de trabajo del patron. Las consultas por fecha son aritmeticas
+    (O(1) por fecha y grupo de cuadrillas).
+
+    Raises:
+        ValueError: si el patron es invalido, o si en ABCD los dias de
+            trabajo y de descanso difieren (C/D se cruzarian con A/B o
+            dejarian dias sin cobertura)
+    """
+
+    def __init__(self, tipo_turnos: TipoTurnos, patron: str, inicio: date):
+        self.trabajo, self.descanso = parsear_patron(patron)
+        self.periodo = self.trabajo + self.descanso
+        self.inicio = inicio
+        self.grupos = CUADRILLAS[TipoTurnos(tipo_turnos)]
+        if len(self.grupos) > 1 and self.trabajo != self.descanso:
+            raise ValueError(
+                f"Patron de turnos invalido para {TipoTurnos(tipo_turnos).value}: "
+                f"{patron!r} (los dias de trabajo y descanso deben ser iguales)"
+            )
+
+    @classmethod
+    def de_contrato(cls, contrato: Contrato) -> "Rotacion":
+        """
+        Rotacion de un contrato con fecha_inicio.
+
+        Raises:
+            ValueError: si el contrato no tiene fecha_inicio o su patron es invalido
+        """
+        if contrato.fecha_inicio is None:
+            raise ValueError("El contrato no tiene fecha de inicio")
+        return cls(contrato.tipo_turnos, contrato.patron, contrato.fecha_inicio)
+
+    def _origen(self, grupo: int) -> date:
+        return self.inicio + timedelta(days=grupo * self.trabajo)
+
+    def en_turno(self, fecha: date) -> list[tuple[str, str]]:
+        """(letra, horario) de las cuadrillas que trabajan en `fecha`"""
+        turno = []
+        for grupo, cuadrillas in enumerate(self.grupos):
+            dias = (fecha - self._origen(grupo)).days
+            if dias >= 0 and dias % self.periodo < self.trabajo:
+                turno.extend(cuadrillas)
+        return turno
+
+    def bloques(self, desde: date, hasta: date) -> list[tuple[date, date, int]]:
+        """
+        (fecha_inicio, fecha_fin, grupo) de los bloques de trabajo que
+        comienzan entre desde y hasta (inclusive), ordenados por fecha.
+        """
+        desde = max(desde, self.inicio)
+        bloques = []
+        for grupo in range(len(self.grupos)):
+            origen = self._origen(grupo)
+            # Primer bloque del grupo que comienza en o despues de desde
+            n = max(0, -(-(desde - origen).days // self.periodo))
+            fecha = origen + timedelta(days=n * self.periodo)
+            while fecha <= hasta:
+                bloques.append((fecha, fecha + timedelta(days=self.trabajo - 1), grupo))
+                fecha += timedelta(days=self.periodo)
+        bloques.sort()
+        return bloques
+
+    def fechas_trabajadas(self, letra: str, desde: date, hasta: date) -> list[date]:
+        """Fechas entre desde y hasta (inclusive) en que trabaja `letra`"""
+        grupo = next(
+            (
+                g
+                for g, cuadrillas in enumerate(self.grupos)
+                if any(letra == c for c, _ in cuadrillas)
+            ),
+            None,
+        )
+        if grupo is None:
+            return []
+
+        # Incluir el bloque en curso al inicio del rango
+        inicio_busqueda = desde - timedelta(days=self.trabajo - 1)
+        fechas = []
+        for fecha_inicio, fecha_fin, g in self.bloques(inicio_busqueda, hasta):
+            if g != grupo:
+                continue
+            dia = max(fecha_inicio, desde)
+            while dia <= min(fecha_fin, hasta):
+                fechas.append(dia)
+                dia += timedelta(days=1)
+        return fechas
+
+
+def expandir_rotacion(
+    tipo_turnos: TipoTurnos, patron: str, inicio: date, desde: date, hasta: date
+) -> list[dict]:
+    """
+    Ciclos de la rotacion que comienzan entre desde y hasta (inclusive).
+
+    Al quedar anclados a `inicio`, rangos distintos generan los mismos
+    ciclos donde se cruzan. Retorna diccionarios con letra, fecha_inicio,
+    fecha_fin y horario, ordenados por fecha_inicio.
+    """
+    rotacion = Rotacion(tipo_turnos, patron, inicio)
+    return [
+        {
+            "letra": letra,
+            "fecha_inicio": fecha_inicio,
+            "fecha_fin": fecha_fin,
+            "horario": horario,
+        }
+        for fecha_inicio, fecha_fin, grupo in rotacion.bloques(desde, hasta)
+        for letra, horario in rotacion.grupos[grupo]
+    ]
+
+
+async def generar_ciclos(
+    db: AsyncSession, contrato: Contrato, desde: date, hasta: date
+) -> tuple[list[Ciclo], int]:
+    """
+    Inserta los ciclos de la rotacion del contrato entre desde y hasta.
+
+    La rotacion se ancla en contrato.fecha_inicio, por lo que rangos
+    distintos generan ciclos en la misma fase, y no genera ciclos que
+    comiencen despues de contrato.fecha_fin. Un solo
+    INSERT ... ON CONFLICT DO NOTHING: los ciclos que ya existen (misma
+    letra y fechas) se omiten. No hace commit.
+
+    Retorna los ciclos creados y la cantidad de omitidos.
+
+    Raises:
+        ValueError: si el contrato no tiene fecha_inicio o su patron es
+            invalido
+    """
+    if contrato.fecha_inicio is None:
+        raise ValueError("El contrato no tiene fecha de inicio")
+    if contrato.fecha_fin is not None:
+        hasta = min(hasta, contrato.fecha_fin)
+    filas = expandir_rotacion(
+        contrato.tipo_turnos,
+        contrato.patron,
+        contrato.fecha_inicio,
+        desde,
+        hasta,
+    )
+    if not filas:
+        return [], 0
+
+    for fila in filas:
+        fila["contrato_id"] = contrato.id
+    creados = (
+        await db.scalars(
+            insert(Ciclo)
+            .values(filas)
+            .on_conflict_do_nothing(constraint="unique_ciclo")
+            .returning(Ciclo)
+        )
+    ).all()
+    return list(creados), len(filas) - len(creados)
@@ -2,9 +2,13 @@
 Utilidades de seguridad: JWT y hashing de passwords
 """
 
+import asyncio
+import uuid
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
-from typing import Optional
+from typing import Callable, Optional, TypeVar
 
+from fastapi import HTTPException, status
 from jose import JWTError, jwt
 from passlib.context import CryptContext
 
@@ -13,6 +17,17 @@ from app.config import get_settings
 # Contexto para hashing de passwords
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
+T = TypeVar("T")
+
+# Pool dedicado para bcrypt: cada operacion toma ~200 ms de CPU y, ejecutada
+# en el event loop, detiene todas las demas requests. bcrypt libera el GIL,
+# por lo que los threads corren en paralelo con el loop.
+_hash_executor = ThreadPoolExecutor(
+    max_workers=get_settings().hash_workers, thread_name_prefix="bcrypt"
+)
+# Operaciones en curso o en espera del pool (solo se modifica desde el loop)
+_hash_pendientes = 0
+
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     """Verifica si el password coincide con el hash"""
@@ -24,6 +39,40 @@ def get_password_hash(password: str) -> str:
     return pwd_context.hash(password)
 
 
+async def _en_pool_hash(func: Callable[..., T], *args) -> T:
+    """
+    Ejecuta func en el pool de bcrypt.
+
+    Si ya hay hash_cola_max operaciones pendientes responde 429 de inmediato
+    en vez de encolar: bajo una rafaga de logins la espera creceria sin
+    limite y el cliente terminaria en timeout igual.
+    """
+    global _hash_pendientes
+    if _hash_pendientes >= get_settings().hash_cola_max:
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Servidor ocupado, reintente en unos segundos",
+            headers={"Retry-After": "1"},
+        )
+
+    _hash_pendientes += 1
+    try:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(_hash_executor, func, *args)
+    finally:
+        _hash_pendientes -= 1
+
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    """verify_password fuera del event loop (usar en endpoints async)"""
+    return await _en_pool_hash(verify_password, plain_password, hashed_password)
+
+
+async def get_password_hash_async(password: str) -> str:
+    """get_password_hash fuera del event loop (usar en endpoints async)"""
+    return await _en_pool_hash(get_password_hash, password)
+
+
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -> str:
     """
     Crea un token JWT de acceso.
@@ -45,7 +94,8 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -
             minutes=settings.access_token_expire_minutes
         )
 
-    to_encode.update({"exp": expire})
+    # jti identifica el token para poder revocarlo (logout)
+    to_encode.update({"exp": expire, "jti": uuid.uuid4().hex})
     encoded_jwt = jwt.encode(
         to_encode, settings.secret_key, algorithm=settings.algorithm
     )
@@ -65,7 +115,7 @@ def create_refresh_token(data: dict) -> str:
     settings = get_settings()
     to_encode = data.copy()
     expire = datetime.utcnow() + timedelta(days=settings.refresh_token_expire_days)
-    to_encode.update({"exp": expire, "type": "refresh"})
+    to_encode.update({"exp": expire, "type": "refresh", "jti": uuid.uuid4().hex})
     encoded_jwt = jwt.encode(
         to_encode, settings.secret_key, algorithm=settings.algorithm
     )
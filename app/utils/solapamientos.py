@@ -0,0 +1,214 @@
+"""
+Deteccion de asignaciones solapadas: un trabajador en dos ciclos que se
+cruzan en fechas (fechas inclusive, igual que asignaciones.periodo)
+"""
+
+import heapq
+from bisect import bisect_left, bisect_right, insort
+from collections import defaultdict
+from dataclasses import dataclass
+from datetime import date, timedelta
+from typing import Iterable, Optional
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models import Asignacion, Ciclo, Trabajador
+from app.schemas.asignacion import ConflictoResponse, PeriodoCiclo
+
+
+@dataclass(frozen=True, order=True)
+class Periodo:
+    """Ciclo de un trabajador: fechas inclusive"""
+
+    fecha_inicio: date
+    fecha_fin: date
+    ciclo_id: int
+
+    @property
+    def fin(self) -> date:
+        """Fin exclusivo: el dia siguiente a fecha_fin"""
+        return self.fecha_fin + timedelta(days=1)
+
+    def cruza(self, otro: "Periodo") -> bool:
+        return self.fecha_inicio < otro.fin and otro.fecha_inicio < self.fin
+
+
+@dataclass
+class Solapamiento:
+    """Dos ciclos de un mismo trabajador que se cruzan"""
+
+    trabajador_id: int
+    periodo: Periodo
+    otro: Periodo
+
+    @property
+    def desde(self) -> date:
+        return max(self.periodo.fecha_inicio, self.otro.fecha_inicio)
+
+    @property
+    def hasta(self) -> date:
+        return min(self.periodo.fin, self.otro.fin) - timedelta(days=1)
+
+
+class IndiceIntervalos:
+    """
+    Periodos de cada trabajador ordenados por fecha_inicio, con el maximo
+    acumulado de su fin (exclusivo). Buscar los periodos que se cruzan con
+    uno nuevo es una busqueda binaria (O(log n)) mas los solapes
+    encontrados; sigue siendo correcto si los periodos existentes ya se
+    solapan entre si.
+    """
+
+    def __init__(self):
+        self._periodos: dict[int, list[Periodo]] = defaultdict(list)
+        self._fin_maximo: dict[int, list[date]] = defaultdict(list)
+
+    def agregar(self, trabajador_id: int, periodo: Periodo) -> None:
+        periodos = self._periodos[trabajador_id]
+        insort(periodos, periodo)
+        # Recalcular el maximo acumulado desde la posicion insertada
+        fin_maximo = self._fin_maximo[trabajador_id]
+        i = bisect_right(periodos, periodo) - 1
+        del fin_maximo[i:]
+        for p in periodos[i:]:
+            anterior = fin_maximo[-1] if fin_maximo else p.fin
+            fin_maximo.append(max(anterior, p.fin))
+
+    def solapados(self, trabajador_id: int, periodo: Periodo) -> list[Periodo]:
+        """Periodos del trabajador (salvo el mismo ciclo) que se cruzan con periodo"""
+        periodos = self._periodos.get(trabajador_id)
+        if not periodos:
+            return []
+
+        fin_maximo = self._fin_maximo[trabajador_id]
+        # Candidatos: los que comienzan antes del fin de periodo
+        i = bisect_left(periodos, Periodo(periodo.fin, date.min, -(2**63))) - 1
+        resultado = []
+        while i >= 0 and fin_maximo[i] > periodo.fecha_inicio:
+            p = periodos[i]
+            if p.cruza(periodo) and p.ciclo_id != periodo.ciclo_id:
+                resultado.append(p)
+            i -= 1
+        return resultado
+
+
+def barrido(periodos: Iterable[tuple[int, Periodo]]) -> list[Solapamiento]:
+    """
+    Todos los pares de periodos solapados de cada trabajador en una pasada
+    (sweep line): O(n log n + solapes). `periodos` debe venir ordenado por
+    (trabajador_id, fecha_inicio).
+    """
+    resultado = []
+    trabajador_actual: Optional[int] = None
+    activos: list[tuple[date, Periodo]] = []  # heap por fin
+
+    for trabajador_id, periodo in periodos:
+        if trabajador_id != trabajador_actual:
+            trabajador_actual = trabajador_id
+            activos = []
+
+        # Descartar los que terminaron a mas tardar cuando comienza este
+        while activos and activos[0][0] <= periodo.fecha_inicio:
+            heapq.heappop(activos)
+        for _, otro in activos:
+            resultado.append(Solapamiento(trabajador_id, otro, periodo))
+        heapq.heappush(activos, (periodo.fin, periodo))
+
+    return resultado
+
+
+async def validar_asignaciones(
+    db: AsyncSession, candidatos: list[tuple[int, int]]
+) -> list[Solapamiento]:
+    """
+    Solapamientos que produciria asignar cada (trabajador_id, ciclo_id).
+
+    Carga en un IndiceIntervalos las asignaciones existentes de esos
+    trabajadores en el rango de fechas de los ciclos candidatos (una
+    query) y revisa cada candidato en orden; los candidatos aceptados
+    entran al indice, por lo que tambien se detectan cruces entre ellos.
+    Los candidatos con ciclo inexistente se ignoran.
+    """
+    if not candidatos:
+        return []
+
+    ciclos = {
+        c.id: Periodo(c.fecha_inicio, c.fecha_fin, c.id)
+        for c in await db.scalars(
+            select(Ciclo).where(Ciclo.id.in_(list({c for _, c in candidatos})))
+        )
+    }
+    if not ciclos:
+        return []
+
+    desde = min(p.fecha_inicio for p in ciclos.values())
+    hasta = max(p.fecha_fin for p in ciclos.values())
+    indice = IndiceIntervalos()
+    existentes = await db.execute(
+        select(Asignacion.trabajador_id, Ciclo.fecha_inicio, Ciclo.fecha_fin, Ciclo.id)
+        .join(Ciclo, Asignacion.ciclo_id == Ciclo.id)
+        .where(
+            Asignacion.trabajador_id.in_(list({t for t, _ in candidatos})),
+            Ciclo.fecha_fin >= desde,
+            Ciclo.fecha_inicio <= hasta,
+        )
+    )
+    for trabajador_id, inicio, fin, ciclo_id in existentes:
+        indice.agregar(trabajador_id, Periodo(inicio, fin, ciclo_id))
+
+    resultado = []
+    for trabajador_id, ciclo_id in candidatos:
+        periodo = ciclos.get(ciclo_id)
+        if periodo is None:
+            continue
+        solapados = indice.solapados(trabajador_id, periodo)
+        if solapados:
+            resultado.extend(Solapamiento(trabajador_id, periodo, p) for p in solapados)
+        else:
+            indice.agregar(trabajador_id, periodo)
+    return resultado
+
+
+async def describir(
+    db: AsyncSession, solapamientos: list[Solapamiento]
+) -> list[ConflictoResponse]:
+    """Conflictos con contrato, letra y nombre del trabajador (dos queries)"""
+    if not solapamientos:
+        return []
+
+    ciclo_ids = {p.ciclo_id for s in solapamientos for p in (s.periodo, s.otro)}
+    ciclos = {
+        c.id: c
+        for c in await db.scalars(select(Ciclo).where(Ciclo.id.in_(list(ciclo_ids))))
+    }
+    nombres = {
+        t.id: f"{t.nombres} {t.apellidos}"
+        for t in await db.scalars(
+            select(Trabajador).where(
+                Trabajador.id.in_(list({s.trabajador_id for s in solapamientos}))
+            )
+        )
+    }
+
+    def periodo_ciclo(periodo: Periodo) -> PeriodoCiclo:
+        ciclo = ciclos.get(periodo.ciclo_id)
+        return PeriodoCiclo(
+            ciclo_id=periodo.ciclo_id,
+            contrato_id=ciclo.contrato_id if ciclo else None,
+            letra=ciclo.letra if ciclo else None,
+            fecha_inicio=periodo.fecha_inicio,
+            fecha_fin=periodo.fecha_fin,
+        )
+
+    return [
+        ConflictoResponse(
+            trabajador_id=s.trabajador_id,
+            trabajador_nombre=nombres.get(s.trabajador_id),
+            ciclo=periodo_ciclo(s.periodo),
+            ciclo_solapado=periodo_ciclo(s.otro),
+            desde=s.desde,
+            hasta=s.hasta,
+        )
+        for s in solapamientos
+    ]
@@ -0,0 +1,70 @@
+"""
+Registro diferido (write-behind) de usuarios.last_login
+"""
+
+import asyncio
+import logging
+from datetime import datetime
+
+from sqlalchemy import DateTime, Integer, column, update, values
+
+from app.database import SessionLocal
+from app.models import Usuario
+
+logger = logging.getLogger(__name__)
+
+
+class UltimosLogin:
+    """
+    Acumula en memoria el ultimo login de cada usuario y los escribe en
+    lote con un solo UPDATE ... FROM (VALUES ...).
+
+    Saca la escritura del camino critico de /auth/login. Si la instancia
+    termina sin pasar por el lifespan (kill), se pierden a lo sumo los
+    logins del ultimo intervalo.
+    """
+
+    def __init__(self):
+        self._pendientes: dict[int, datetime] = {}
+
+    def registrar(self, usuario_id: int, fecha: datetime) -> None:
+        self._pendientes[usuario_id] = fecha
+
+    async def vaciar(self) -> None:
+        """Escribe los logins pendientes"""
+        if not self._pendientes:
+            return
+
+        pendientes, self._pendientes = self._pendientes, {}
+        filas = values(
+            column("id", Integer),
+            column("last_login", DateTime(timezone=True)),
+            name="v",
+        ).data(list(pendientes.items()))
+        try:
+            async with SessionLocal() as db:
+                # Sin eventos del ORM: last_login no invalida usuarios_cache
+                await db.execute(
+                    update(Usuario)
+                    .where(Usuario.id == filas.c.id)
+                    .values(last_login=filas.c.last_login)
+                    .execution_options(synchronize_session=False)
+                )
+                await db.commit()
+        except Exception:
+            # Reintentar en la siguiente vuelta sin pisar logins mas nuevos
+            for usuario_id, fecha in pendientes.items():
+                self._pendientes.setdefault(usuario_id, fecha)
+            raise
+
+    async def mantener(self, intervalo: float) -> None:
+        """Vacia los pendientes cada `intervalo` segundos (tarea de fondo)"""
+        while True:
+            await asyncio.sleep(intervalo)
+            try:
+                await self.vaciar()
+            except Exception:
+                logger.exception("Error escribiendo last_login")
+
+
+ultimos_login = UltimosLogin()
@@ -0,0 +1,324 @@
+"""
+Verificacion de N+1: cantidad de queries por endpoint vs tamano de datos.
+
+Para cada escenario se generan datos sinteticos de distinto tamano dentro
+de una transaccion que se revierte al final (la base queda intacta), se
+llama al endpoint y se cuentan los statements SQL ejecutados. La cantidad
+de queries debe ser constante: si crece con los datos, hay un N+1.
+
+Uso:
+    python -m benchmarks.conteo_queries
+    python -m benchmarks.conteo_queries --escenarios proyectos
+    python -m benchmarks.conteo_queries --escenarios cargos --tamanos 1 2000
+"""
+
+import argparse
+import asyncio
+import time
+from datetime import date, timedelta
+
+import httpx
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.database import engine, get_db
+from app.main import app
+from app.models import (Asignacion, Cargo, Ciclo, Contrato, Empresa, Proyecto,
+                        Requerimiento, Servicio, Trabajador, Usuario)
+from app.models.usuario import RolUsuario
+from app.routers.auth import claims_acceso
+from app.utils.security import create_access_token
+
+API = "/api/v1"
+
+
+class ContadorQueries:
+    """Cuenta los statements ejecutados por el engine"""
+
+    def __init__(self):
+        self.total = 0
+        event.listen(engine.sync_engine, "before_cursor_execute", self._contar)
+
+    def _contar(self, conn, cursor, statement, parameters, context, executemany):
+        self.total += 1
+
+    def cerrar(self):
+        event.remove(engine.sync_engine, "before_cursor_execute", self._contar)
+
+
+class Escenario:
+    """
+    Datos sinteticos dentro de una transaccion revertida.
+
+    Cada request usa una sesion nueva sobre la misma conexion (con
+    SAVEPOINT), igual que en produccion donde cada request tiene su sesion.
+    """
+
+    def __init__(self, conn):
+        self.conn = conn
+        self.db = self.nueva_sesion()
+        self.seq = 0
+
+    def nueva_sesion(self) -> AsyncSession:
+        return AsyncSession(
+            bind=self.conn,
+            join_transaction_mode="create_savepoint",
+            expire_on_commit=False,
+        )
+
+    def sufijo(self) -> str:
+        self.seq += 1
+        return f"{self.seq:06d}"
+
+    async def admin(self) -> str:
+        """Crea un usuario ADMIN y retorna un token para el"""
+        s = self.sufijo()
+        usuario = Usuario(
+            username=f"bench_admin_{s}",
+            email=f"bench_admin_{s}@bench.cl",
+            password_hash="x",
+            rol=RolUsuario.ADMIN,
+            is_active=True,
+        )
+        self.db.add(usuario)
+        await self.db.flush()
+        return create_access_token(data=await claims_acceso(self.db, usuario))
+
+    async def empresa(self) -> Empresa:
+        s = self.sufijo()
+        empresa = Empresa(nombre=f"Empresa Bench {s}", rut=f"B{s}")
+        self.db.add(empresa)
+        await self.db.flush()
+        return empresa
+
+    async def servicio(self) -> Servicio:
+        servicio = Servicio(nombre=f"Servicio Bench {self.sufijo()}")
+        self.db.add(servicio)
+        await self.db.flush()
+        return servicio
+
+    async def proyecto(self) -> Proyecto:
+        proyecto = Proyecto(
+            nombre=f"Proyecto Bench {self.sufijo()}", fecha_inicio=date(2024, 1, 1)
+        )
+        self.db.add(proyecto)
+        await self.db.flush()
+        return proyecto
+
+    async def contrato(
+        self, proyecto: Proyecto, empresa: Empresa, servicio: Servicio
+    ) -> Contrato:
+        contrato = Contrato(
+            proyecto_id=proyecto.id,
+            empresa_id=empresa.id,
+            servicio_id=servicio.id,
+            fecha_inicio=date(2024, 1, 1),
+        )
+        self.db.add(contrato)
+        await self.db.flush()
+        return contrato
+
+    async def trabajadores(self, proyecto: Proyecto, empresa: Empresa, n: int):
+        trabajadores = []
+        for _ in range(n):
+            s = self.sufijo()
+            trabajadores.append(
+                Trabajador(
+                    rut=f"T{s}",
+                    nombres=f"Nombre {s}",
+                    apellidos=f"Apellido {s}",
+                    proyecto_id=proyecto.id,
+                    empresa_id=empresa.id,
+                )
+            )
+        self.db.add_all(trabajadores)
+        await self.db.flush()
+        return trabajadores
+
+    async def cargo(self, proyecto: Proyecto, empresa: Empresa, jefe=None) -> Cargo:
+        cargo = Cargo(
+            nombre=f"Cargo Bench {self.sufijo()}",
+            proyecto_id=proyecto.id,
+            empresa_id=empresa.id,
+            jefe_directo_id=jefe.id if jefe else None,
+        )
+        self.db.add(cargo)
+        await self.db.flush()
+        return cargo
+
+    async def ciclo(self, contrato: Contrato, inicio: date, dias: int = 7) -> Ciclo:
+        ciclo = Ciclo(
+            contrato_id=contrato.id,
+            letra="A",
+            fecha_inicio=inicio,
+            fecha_fin=inicio + timedelta(days=dias - 1),
+        )
+        self.db.add(ciclo)
+        await self.db.flush()
+        return ciclo
+
+    async def dotacion(self, ciclo: Ciclo, cargo: Cargo, trabajadores: list) -> None:
+        """Requerimiento del cargo en el ciclo y asignacion de trabajadores"""
+        self.db.add(
+            Requerimiento(
+                ciclo_id=ciclo.id,
+                cargo_id=cargo.id,
+                cantidad_necesaria=len(trabajadores) + 1,
+            )
+        )
+        self.db.add_all(
+            Asignacion(ciclo_id=ciclo.id, trabajador_id=t.id) for t in trabajadores
+        )
+        await self.db.flush()
+
+
+# ============================================================
+# ESCENARIOS
+# Cada escenario recibe el tamano n, prepara los datos y retorna la ruta
+# a medir.
+# ============================================================
+
+
+async def escenario_proyectos(esc: Escenario, n: int) -> str:
+    """GET /proyectos con n proyectos, cada uno con contrato y trabajadores"""
+    empresa = await esc.empresa()
+    servicio = await esc.servicio()
+    for _ in range(n):
+        proyecto = await esc.proyecto()
+        await esc.contrato(proyecto, empresa, servicio)
+        await esc.trabajadores(proyecto, empresa, 2)
+    return f"{API}/proyectos"
+
+
+async def escenario_panel_mandante(esc: Escenario, n: int) -> str:
+    """Panel mandante con n contratos activos, cada uno con ciclo en curso"""
+    proyecto = await esc.proyecto()
+    servicio = await esc.servicio()
+    hoy = date.today()
+    for _ in range(n):
+        empresa = await esc.empresa()
+        contrato = await esc.contrato(proyecto, empresa, servicio)
+        cargo = await esc.cargo(proyecto, empresa)
+        ciclo = await esc.ciclo(contrato, hoy - timedelta(days=3))
+        trabajadores = await esc.trabajadores(proyecto, empresa, 2)
+        await esc.dotacion(ciclo, cargo, trabajadores)
+    return f"{API}/proyectos/{proyecto.id}/panel-mandante"
+
+
+async def escenario_ciclos(esc: Escenario, n: int) -> str:
+    """Ciclos de un proyecto con n ciclos en historia, con cobertura"""
+    proyecto = await esc.proyecto()
+    empresa = await esc.empresa()
+    contrato = await esc.contrato(proyecto, empresa, await esc.servicio())
+    cargo = await esc.cargo(proyecto, empresa)
+    trabajadores = await esc.trabajadores(proyecto, empresa, 2)
+    inicio = date(2024, 1, 1)
+    for i in range(n):
+        ciclo = await esc.ciclo(contrato, inicio + timedelta(days=7 * i))
+        await esc.dotacion(ciclo, cargo, trabajadores)
+    return f"{API}/proyectos/{proyecto.id}/ciclos"
+
+
+async def escenario_cargos_tree(esc: Escenario, n: int) -> str:
+    """Organigrama con 2 raices y n cargos bajo cada una, en cadena y en abanico"""
+    proyecto = await esc.proyecto()
+    empresa = await esc.empresa()
+    for _ in range(2):
+        raiz = await esc.cargo(proyecto, empresa)
+        jefe = raiz
+        for _ in range(n):
+            jefe = await esc.cargo(proyecto, empresa, jefe=jefe)
+            await esc.cargo(proyecto, empresa, jefe=raiz)
+    return f"{API}/proyectos/{proyecto.id}/cargos/tree"
+
+
+async def escenario_cargos(esc: Escenario, n: int) -> str:
+    """Lista de cargos de un proyecto con n cargos, 5 subordinados por jefe"""
+    proyecto = await esc.proyecto()
+    empresa = await esc.empresa()
+    cargos = [await esc.cargo(proyecto, empresa)]
+    for i in range(1, n):
+        cargos.append(await esc.cargo(proyecto, empresa, jefe=cargos[(i - 1) // 5]))
+    return f"{API}/proyectos/{proyecto.id}/cargos"
+
+
+async def escenario_trabajadores(esc: Escenario, n: int) -> str:
+    """Trabajadores de un proyecto, n asignados a un ciclo en curso"""
+    proyecto = await esc.proyecto()
+    empresa = await esc.empresa()
+    contrato = await esc.contrato(proyecto, empresa, await esc.servicio())
+    cargo = await esc.cargo(proyecto, empresa)
+    ciclo = await esc.ciclo(contrato, date.today() - timedelta(days=3))
+    trabajadores = await esc.trabajadores(proyecto, empresa, n)
+    await esc.dotacion(ciclo, cargo, trabajadores)
+    return f"{API}/proyectos/{proyecto.id}/trabajadores"
+
+
+ESCENARIOS = {
+    "proyectos": escenario_proyectos,
+    "panel-mandante": escenario_panel_mandante,
+    "ciclos": escenario_ciclos,
+    "cargos-tree": escenario_cargos_tree,
+    "cargos": escenario_cargos,
+    "trabajadores": escenario_trabajadores,
+}
+
+
+async def medir(nombre: str, n: int) -> tuple[int, float]:
+    """Ejecuta un escenario de tamano n y retorna (queries, ms)"""
+    async with engine.connect() as conn:
+        trans = await conn.begin()
+        esc = Escenario(conn)
+
+        async def get_db_escenario():
+            async with esc.nueva_sesion() as db:
+                yield db
+
+        app.dependency_overrides[get_db] = get_db_escenario
+        try:
+            token = await esc.admin()
+            ruta = await ESCENARIOS[nombre](esc, n)
+            await esc.db.flush()
+
+            transport = httpx.ASGITransport(app=app)
+            async with httpx.AsyncClient(
+                transport=transport, base_url="http://bench"
+            ) as client:
+                contador = ContadorQueries()
+                inicio = time.perf_counter()
+                response = await client.get(
+                    ruta, headers={"Authorization": f"Bearer {token}"}
+                )
+                ms = (time.perf_counter() - inicio) * 1000
+                contador.cerrar()
+            response.raise_for_status()
+            return contador.total, ms
+        finally:
+            app.dependency_overrides.pop(get_db, None)
+            await esc.db.close()
+            await trans.rollback()
+
+
+async def main(args: argparse.Namespace) -> None:
+    fallidos = []
+    for nombre in args.escenarios:
+        conteos = []
+        for n in args.tamanos:
+            queries, ms = await medir(nombre, n)
+            conteos.append(queries)
+            print(f"{nombre:<24} n={n:<6} queries={queries:<5} {ms:>9.1f} ms")
+        if len(set(conteos)) != 1:
+            fallidos.append(nombre)
+    await engine.dispose()
+
+    assert not fallidos, f"Queries crecen con los datos (N+1) en: {fallidos}"
+    print("OK: cantidad de queries constante en todos los escenarios")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument(
+        "--escenarios", nargs="+", default=list(ESCENARIOS), choices=ESCENARIOS
+    )
+    parser.add_argument("--tamanos", nargs="+", type=int, default=[1, 10, 50])
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,58 @@
+"""
+Benchmark del motor de dotacion automatica.
+
+Arma en memoria un escenario sintetico (por defecto 5.000 trabajadores y
+500 ciclos con requerimientos por cargo y asignaciones previas), corre el
+mismo motor que POST /proyectos/{id}/dotacion/propuesta y verifica la
+propuesta: cargo y empresa correctos, ninguna brecha sobrepasada y ningun
+trabajador en dos ciclos que se cruzan (ver tests/dotacion_escenarios.py).
+Reporta el tiempo y la dispersion de carga (dias) entre los trabajadores.
+No usa la base de datos.
+
+Uso:
+    python -m benchmarks.dotacion_automatica
+    python -m benchmarks.dotacion_automatica --trabajadores 20000 --ciclos 2000
+"""
+
+import argparse
+import time
+from collections import Counter
+
+from app.utils.dotacion import proponer
+from tests.dotacion_escenarios import escenario, verificar
+
+
+def main(args: argparse.Namespace) -> None:
+    datos = escenario(args.trabajadores, args.ciclos, args.semilla)
+
+    inicio = time.perf_counter()
+    propuesta = proponer(*datos)
+    ms = (time.perf_counter() - inicio) * 1000
+
+    verificar(*datos, propuesta)
+    ciclos, brechas, _, _ = datos
+    dias = Counter()
+    for ciclo_id, trabajador_id, _ in propuesta.asignaciones:
+        _, inicio_ciclo, fin, _ = ciclos[ciclo_id - 1]
+        dias[trabajador_id] += fin - inicio_ciclo + 1
+    brecha_total = sum(n for lista in brechas.values() for _, n in lista)
+    faltantes = sum(n for _, _, n in propuesta.faltantes)
+    print(
+        f"{args.trabajadores} trabajadores x {args.ciclos} ciclos: "
+        f"{len(propuesta.asignaciones)}/{brecha_total} cupos cubiertos, "
+        f"{faltantes} sin cubrir, {ms:.1f} ms"
+    )
+    if dias:
+        print(
+            f"carga por trabajador asignado: min={min(dias.values())} "
+            f"max={max(dias.values())} dias"
+        )
+    print("OK: propuesta valida")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--trabajadores", type=int, default=5000)
+    parser.add_argument("--ciclos", type=int, default=500)
+    parser.add_argument("--semilla", type=int, default=1)
+    main(parser.parse_args())
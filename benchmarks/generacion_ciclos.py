@@ -0,0 +1,72 @@
+"""
+Benchmark de generacion de ciclos por rotacion.
+
+Genera los ciclos de todos los contratos activos para un rango de fechas
+(por defecto un anio desde hoy) con el mismo motor que
+POST /contratos/{id}/ciclos/generar, dentro de una transaccion que se
+revierte al final (la base queda intacta). Reporta ciclos creados,
+omitidos y el tiempo total; una segunda pasada verifica que repetir la
+generacion no crea duplicados.
+
+Uso:
+    python -m benchmarks.generacion_ciclos
+    python -m benchmarks.generacion_ciclos --desde 2025-01-01 --dias 730
+"""
+
+import argparse
+import asyncio
+import time
+from datetime import date, timedelta
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.database import engine
+from app.models import Contrato
+from app.utils.rotacion import generar_ciclos
+
+
+async def generar_todos(
+    db: AsyncSession, contratos: list[Contrato], desde: date, hasta: date
+) -> tuple[int, int]:
+    creados = omitidos = 0
+    for contrato in contratos:
+        nuevos, repetidos = await generar_ciclos(db, contrato, desde, hasta)
+        creados += len(nuevos)
+        omitidos += repetidos
+    return creados, omitidos
+
+
+async def main(args: argparse.Namespace) -> None:
+    desde = args.desde
+    hasta = desde + timedelta(days=args.dias - 1)
+
+    async with engine.connect() as conn:
+        trans = await conn.begin()
+        try:
+            async with AsyncSession(bind=conn, expire_on_commit=False) as db:
+                contratos = (
+                    await db.scalars(select(Contrato).where(Contrato.activo.is_(True)))
+                ).all()
+
+                for pasada in ("primera", "repetida"):
+                    inicio = time.perf_counter()
+                    creados, omitidos = await generar_todos(db, contratos, desde, hasta)
+                    ms = (time.perf_counter() - inicio) * 1000
+                    print(
+                        f"{pasada:<9} {len(contratos)} contratos {desde}..{hasta}: "
+                        f"creados={creados} omitidos={omitidos} {ms:.1f} ms"
+                    )
+                    if pasada == "repetida":
+                        assert creados == 0, "La generacion repetida creo ciclos"
+        finally:
+            await trans.rollback()
+    await engine.dispose()
+    print("OK: generacion idempotente")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--desde", type=date.fromisoformat, default=date.today())
+    parser.add_argument("--dias", type=int, default=365)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,125 @@
+"""
+Verificacion de la invalidacion de caches entre instancias (LISTEN/NOTIFY).
+
+Inicia el listener de app.utils.invalidacion contra la base configurada y
+simula otra instancia escribiendo con SQL directo (sin eventos del ORM, por
+lo que solo los avisos pueden invalidar). Inserta, modifica y borra una
+empresa temporal en transacciones confirmadas, mide cuanto tarda cada aviso
+y comprueba que los caches dependientes se vaciaron. Tambien verifica que
+una transaccion revertida no genera avisos. Termina con codigo 1 si algo
+falla.
+
+Requiere sql/007_notificar_cambios.sql aplicado (o una base creada con
+001_schema.sql).
+
+Uso:
+    python -m benchmarks.invalidacion_cache
+    python -m benchmarks.invalidacion_cache --timeout 5
+"""
+
+import argparse
+import asyncio
+import sys
+import time
+import uuid
+
+from sqlalchemy import text
+
+import app.main  # noqa: F401 - registra las invalidaciones de los routers
+from app.database import engine
+from app.routers.auth import usuarios_cache
+from app.routers.proyectos import arbol_cargos_cache
+from app.utils.invalidacion import al_notificar, escuchar
+from app.utils.referencias import referencias
+
+
+class Sonda:
+    """Registra los avisos de una tabla con el instante de llegada"""
+
+    def __init__(self, tabla: str):
+        self.avisos: asyncio.Queue = asyncio.Queue()
+        al_notificar(tabla, self._recibir)
+
+    def _recibir(self, fila) -> None:
+        if fila is not None:
+            self.avisos.put_nowait((time.perf_counter(), fila))
+
+    async def esperar(self, timeout: float):
+        return await asyncio.wait_for(self.avisos.get(), timeout)
+
+
+def poblar_caches() -> None:
+    """Entradas de prueba que un cambio de empresa debe descartar"""
+    usuarios_cache.set(-1, object())
+    arbol_cargos_cache.set(-1, b"{}")
+
+
+def caches_vacios() -> bool:
+    return usuarios_cache.get(-1) is None and arbol_cargos_cache.get(-1) is None
+
+
+async def main(args: argparse.Namespace) -> int:
+    sonda = Sonda("empresas")
+    listener = asyncio.create_task(escuchar())
+    # El listener vacia todo al conectar: esperar a que quede escuchando
+    await asyncio.sleep(1)
+
+    rut = f"T{uuid.uuid4().hex[:10]}"
+    pasos = [
+        (
+            "insert",
+            "INSERT INTO empresas (nombre, rut) VALUES ('Empresa Prueba', :rut)",
+        ),
+        ("update", "UPDATE empresas SET nombre = 'Empresa Prueba 2' WHERE rut = :rut"),
+        ("delete", "DELETE FROM empresas WHERE rut = :rut"),
+    ]
+    fallas = 0
+    try:
+        for nombre, sql in pasos:
+            poblar_caches()
+            version = referencias.version
+            async with engine.begin() as conn:
+                await conn.execute(text(sql), {"rut": rut})
+            confirmado = time.perf_counter()
+
+            try:
+                llegada, fila = await sonda.esperar(args.timeout)
+            except asyncio.TimeoutError:
+                print(f"{nombre:<8} FALLA: sin aviso en {args.timeout}s")
+                fallas += 1
+                continue
+
+            invalidado = caches_vacios() and referencias.version > version
+            print(
+                f"{nombre:<8} aviso en {(llegada - confirmado) * 1000:7.1f} ms "
+                f"claves={fila} caches invalidados={'si' if invalidado else 'NO'}"
+            )
+            fallas += not invalidado
+
+        # NOTIFY es transaccional: un rollback no debe avisar
+        async with engine.connect() as conn:
+            await conn.execute(
+                text("INSERT INTO empresas (nombre, rut) VALUES ('Revertida', :rut)"),
+                {"rut": rut},
+            )
+            await conn.rollback()
+        try:
+            _, fila = await sonda.esperar(args.timeout)
+            print(f"rollback FALLA: aviso inesperado {fila}")
+            fallas += 1
+        except asyncio.TimeoutError:
+            print("rollback sin avisos")
+    finally:
+        listener.cancel()
+        await engine.dispose()
+
+    print("OK" if not fallas else f"{fallas} fallas")
+    return 1 if fallas else 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument(
+        "--timeout", type=float, default=2.0, help="Espera maxima por aviso (s)"
+    )
+    sys.exit(asyncio.run(main(parser.parse_args())))
@@ -0,0 +1,128 @@
+"""
+Benchmark de latencia bajo concurrencia.
+
+Lanza N clientes concurrentes contra una instancia de la API en ejecucion
+y reporta p50/p95/p99 por endpoint. Sirve para comparar el comportamiento
+del event loop antes y despues de un cambio (por ejemplo, sesion
+sincrona vs AsyncSession).
+
+Uso:
+    uvicorn app.main:app --port 8000
+    python -m benchmarks.latencia_concurrente --url http://localhost:8000 \\
+        --email admin@em.codelco.cl --password admin --clientes 50
+"""
+
+import argparse
+import asyncio
+import statistics
+import time
+
+import httpx
+
+ENDPOINTS_POR_DEFECTO = [
+    "/api/v1/proyectos",
+    "/api/v1/proyectos/{proyecto_id}/panel-mandante",
+    "/api/v1/proyectos/{proyecto_id}/trabajadores",
+    "/api/v1/proyectos/{proyecto_id}/ciclos",
+    "/api/v1/empresas",
+]
+
+
+def percentil(valores: list[float], p: float) -> float:
+    """Percentil por rango mas cercano (valores en ms)"""
+    if not valores:
+        return 0.0
+    ordenados = sorted(valores)
+    indice = max(0, min(len(ordenados) - 1, round(p / 100 * len(ordenados)) - 1))
+    return ordenados[indice]
+
+
+async def obtener_token(client: httpx.AsyncClient, email: str, password: str) -> str:
+    """Obtiene un access token via /auth/login"""
+    response = await client.post(
+        "/api/v1/auth/login", data={"username": email, "password": password}
+    )
+    response.raise_for_status()
+    return response.json()["access_token"]
+
+
+async def cliente(
+    client: httpx.AsyncClient,
+    endpoints: list[str],
+    peticiones: int,
+    headers: dict,
+    latencias: dict[str, list[float]],
+    errores: dict[str, int],
+) -> None:
+    """Un cliente que recorre los endpoints en ronda"""
+    for i in range(peticiones):
+        endpoint = endpoints[i % len(endpoints)]
+        inicio = time.perf_counter()
+        try:
+            response = await client.get(endpoint, headers=headers)
+            fallo = response.status_code >= 400
+        except httpx.HTTPError:
+            # Timeouts o conexiones cortadas por el servidor
+            fallo = True
+        latencias[endpoint].append((time.perf_counter() - inicio) * 1000)
+        if fallo:
+            errores[endpoint] += 1
+
+
+async def main(args: argparse.Namespace) -> None:
+    endpoints = [e.format(proyecto_id=args.proyecto_id) for e in args.endpoints]
+    limits = httpx.Limits(max_connections=args.clientes)
+
+    async with httpx.AsyncClient(
+        base_url=args.url, limits=limits, timeout=60.0
+    ) as client:
+        token = args.token or await obtener_token(client, args.email, args.password)
+        headers = {"Authorization": f"Bearer {token}"}
+
+        # Calentamiento: pool de conexiones y caches
+        for endpoint in endpoints:
+            await client.get(endpoint, headers=headers)
+
+        latencias = {e: [] for e in endpoints}
+        errores = {e: 0 for e in endpoints}
+
+        inicio = time.perf_counter()
+        await asyncio.gather(
+            *[
+                cliente(client, endpoints, args.peticiones, headers, latencias, errores)
+                for _ in range(args.clientes)
+            ]
+        )
+        duracion = time.perf_counter() - inicio
+
+    total = sum(len(v) for v in latencias.values())
+    print(
+        f"{args.clientes} clientes, {total} peticiones en {duracion:.2f}s "
+        f"({total / duracion:.0f} req/s)"
+    )
+    print(f"{'endpoint':<52} {'p50':>8} {'p95':>8} {'p99':>8} {'err':>5}")
+    todas = []
+    for endpoint, valores in latencias.items():
+        todas.extend(valores)
+        print(
+            f"{endpoint:<52} {percentil(valores, 50):>8.1f} "
+            f"{percentil(valores, 95):>8.1f} {percentil(valores, 99):>8.1f} "
+            f"{errores[endpoint]:>5}"
+        )
+    print(
+        f"{'TOTAL (ms)':<52} {statistics.median(todas):>8.1f} "
+        f"{percentil(todas, 95):>8.1f} {percentil(todas, 99):>8.1f}"
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--url", default="http://localhost:8000")
+    parser.add_argument("--email", default="admin@em.codelco.cl")
+    parser.add_argument("--password", default="admin")
+    parser.add_argument("--token", default=None, help="Usar un token existente")
+    parser.add_argument("--clientes", type=int, default=50)
+    parser.add_argument("--peticiones", type=int, default=20, help="Por cliente")
+    parser.add_argument("--proyecto-id", type=int, default=1)
+    parser.add_argument("--endpoints", nargs="+", default=ENDPOINTS_POR_DEFECTO)
+    asyncio.run(main(parser.parse_args()))
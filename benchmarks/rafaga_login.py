@@ -0,0 +1,161 @@
+"""
+Benchmark de latencia de endpoints normales durante una rafaga de logins.
+
+Mide p50/p95/p99 de endpoints que no usan bcrypt en dos fases: primero
+sin carga y luego mientras otros clientes ejecutan logins en paralelo
+(como al inicio de un turno). Si bcrypt corre en el event loop, la
+latencia de la segunda fase crece en cientos de ms; con el pool dedicado
+debe mantenerse cerca de la primera. Los logins rechazados por el limite
+de cola (429) se reportan aparte.
+
+Uso:
+    uvicorn app.main:app --port 8000
+    python -m benchmarks.rafaga_login --url http://localhost:8000 \\
+        --email admin@em.codelco.cl --password admin --logins 200
+"""
+
+import argparse
+import asyncio
+import statistics
+import time
+from collections import Counter
+
+import httpx
+
+from benchmarks.latencia_concurrente import obtener_token, percentil
+
+ENDPOINTS_POR_DEFECTO = [
+    "/health",
+    "/api/v1/auth/me",
+    "/api/v1/empresas",
+]
+
+
+async def sondear(
+    client: httpx.AsyncClient,
+    endpoints: list[str],
+    headers: dict,
+    hasta: float,
+    latencias: list[float],
+) -> None:
+    """Llama a los endpoints en ronda hasta el instante `hasta`"""
+    i = 0
+    while time.perf_counter() < hasta:
+        endpoint = endpoints[i % len(endpoints)]
+        inicio = time.perf_counter()
+        await client.get(endpoint, headers=headers)
+        latencias.append((time.perf_counter() - inicio) * 1000)
+        i += 1
+
+
+async def logins(
+    client: httpx.AsyncClient,
+    email: str,
+    password: str,
+    cantidad: int,
+    estados: Counter,
+    latencias: list[float],
+) -> None:
+    """Un cliente que ejecuta `cantidad` logins seguidos"""
+    for _ in range(cantidad):
+        inicio = time.perf_counter()
+        try:
+            response = await client.post(
+                "/api/v1/auth/login", data={"username": email, "password": password}
+            )
+            estados[response.status_code] += 1
+        except httpx.HTTPError:
+            estados["error"] += 1
+        latencias.append((time.perf_counter() - inicio) * 1000)
+
+
+def resumen(nombre: str, valores: list[float]) -> None:
+    if not valores:
+        print(f"{nombre:<32} sin datos")
+        return
+    print(
+        f"{nombre:<32} {statistics.median(valores):>8.1f} "
+        f"{percentil(valores, 95):>8.1f} {percentil(valores, 99):>8.1f} "
+        f"{len(valores):>6}"
+    )
+
+
+async def main(args: argparse.Namespace) -> None:
+    limits = httpx.Limits(max_connections=args.clientes_login + args.sondas)
+
+    async with httpx.AsyncClient(
+        base_url=args.url, limits=limits, timeout=60.0
+    ) as client:
+        token = args.token or await obtener_token(client, args.email, args.password)
+        headers = {"Authorization": f"Bearer {token}"}
+
+        # Calentamiento: pool de conexiones y caches
+        for endpoint in args.endpoints:
+            await client.get(endpoint, headers=headers)
+
+        # Fase 1: sin logins
+        base: list[float] = []
+        hasta = time.perf_counter() + args.segundos
+        await asyncio.gather(
+            *[
+                sondear(client, args.endpoints, headers, hasta, base)
+                for _ in range(args.sondas)
+            ]
+        )
+
+        # Fase 2: las mismas sondas mientras corre la rafaga de logins
+        rafaga: list[float] = []
+        latencias_login: list[float] = []
+        estados: Counter = Counter()
+        por_cliente = max(1, args.logins // args.clientes_login)
+        inicio = time.perf_counter()
+        tareas_login = asyncio.gather(
+            *[
+                logins(
+                    client,
+                    args.email,
+                    args.password,
+                    por_cliente,
+                    estados,
+                    latencias_login,
+                )
+                for _ in range(args.clientes_login)
+            ]
+        )
+        hasta = time.perf_counter() + args.segundos
+        await asyncio.gather(
+            *[
+                sondear(client, args.endpoints, headers, hasta, rafaga)
+                for _ in range(args.sondas)
+            ]
+        )
+        await tareas_login
+        duracion = time.perf_counter() - inicio
+
+    print(
+        f"{sum(estados.values())} logins en {duracion:.2f}s con "
+        f"{args.clientes_login} clientes; {args.sondas} sondas sobre "
+        f"{', '.join(args.endpoints)}"
+    )
+    print(f"{'fase (ms)':<32} {'p50':>8} {'p95':>8} {'p99':>8} {'n':>6}")
+    resumen("sondas sin logins", base)
+    resumen("sondas durante rafaga", rafaga)
+    resumen("logins", latencias_login)
+    print(
+        "estados de login: "
+        + ", ".join(f"{estado}={n}" for estado, n in sorted(estados.items(), key=str))
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--url", default="http://localhost:8000")
+    parser.add_argument("--email", default="admin@em.codelco.cl")
+    parser.add_argument("--password", default="admin")
+    parser.add_argument("--token", default=None, help="Usar un token existente")
+    parser.add_argument("--logins", type=int, default=200, help="Total de logins")
+    parser.add_argument("--clientes-login", type=int, default=50)
+    parser.add_argument("--sondas", type=int, default=5, help="Clientes que miden")
+    parser.add_argument("--segundos", type=float, default=5.0, help="Por fase")
+    parser.add_argument("--endpoints", nargs="+", default=ENDPOINTS_POR_DEFECTO)
+    asyncio.run(main(parser.parse_args()))
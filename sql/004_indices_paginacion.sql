@@ -0,0 +1,18 @@
+-- ============================================================
+-- EMSA - Indices para paginacion por cursor (keyset)
+-- Solo para bases creadas antes de este cambio: 001_schema.sql ya
+-- incluye estos indices. Se puede ejecutar mas de una vez.
+-- ============================================================
+
+-- Usuarios: ORDER BY nombre_completo (NULL al final), id
+CREATE INDEX IF NOT EXISTS idx_usuarios_orden ON usuarios((nombre_completo IS NULL), COALESCE(nombre_completo, ''), id);
+
+-- Proyectos: ORDER BY nombre, id
+CREATE INDEX IF NOT EXISTS idx_proyectos_orden ON proyectos(nombre, id);
+
+-- Trabajadores de un proyecto: ORDER BY apellidos, nombres, id
+CREATE INDEX IF NOT EXISTS idx_trabajadores_orden ON trabajadores(proyecto_id, apellidos, nombres, id);
+
+-- Asignaciones de un ciclo: ORDER BY id
+DROP INDEX IF EXISTS idx_asignaciones_ciclo;
+CREATE INDEX idx_asignaciones_ciclo ON asignaciones(ciclo_id, id);
@@ -0,0 +1,10 @@
+-- ============================================================
+-- EMSA - Version de token por usuario
+-- Solo para bases creadas antes de este cambio: 001_schema.sql ya
+-- incluye la columna. Se puede ejecutar mas de una vez.
+-- ============================================================
+
+-- Los access tokens llevan rol, empresa y proyectos como claims; al
+-- cambiar esos datos se incrementa token_version y los tokens emitidos
+-- con una version anterior dejan de aceptarse.
+ALTER TABLE usuarios ADD COLUMN IF NOT EXISTS token_version INTEGER NOT NULL DEFAULT 0;
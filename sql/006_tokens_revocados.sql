@@ -0,0 +1,15 @@
+-- ============================================================
+-- EMSA - Tokens JWT revocados
+-- Solo para bases creadas antes de este cambio: 001_schema.sql ya
+-- incluye la tabla. Se puede ejecutar mas de una vez.
+-- ============================================================
+
+-- jti de los tokens invalidados por logout o rotacion de refresh token.
+-- Las filas con expira en el pasado se purgan periodicamente: para
+-- entonces el token ya es rechazado por su claim exp.
+CREATE TABLE IF NOT EXISTS tokens_revocados (
+    jti VARCHAR(32) PRIMARY KEY,
+    expira TIMESTAMP WITH TIME ZONE NOT NULL
+);
+
+CREATE INDEX IF NOT EXISTS idx_tokens_revocados_expira ON tokens_revocados(expira);
@@ -0,0 +1,63 @@
+-- ============================================================
+-- EMSA - Aviso de cambios para invalidar caches entre instancias
+-- Solo para bases creadas antes de este cambio: 001_schema.sql ya
+-- incluye la funcion y los triggers. Se puede ejecutar mas de una vez.
+-- ============================================================
+
+-- Aviso de cambios por NOTIFY (canal cache_invalidacion) para que cada
+-- instancia invalide sus caches en memoria. Los argumentos del trigger son
+-- las columnas que identifican lo cambiado; se envian las de la fila nueva
+-- y, si difieren, tambien las de la anterior.
+CREATE OR REPLACE FUNCTION notificar_cambio()
+RETURNS TRIGGER AS $$
+DECLARE
+    anterior JSONB;
+    nueva JSONB;
+BEGIN
+    IF TG_OP <> 'INSERT' THEN
+        SELECT jsonb_object_agg(k, to_jsonb(OLD) -> k) INTO anterior FROM unnest(TG_ARGV) AS k;
+    END IF;
+    IF TG_OP <> 'DELETE' THEN
+        SELECT jsonb_object_agg(k, to_jsonb(NEW) -> k) INTO nueva FROM unnest(TG_ARGV) AS k;
+    END IF;
+
+    IF nueva IS NOT NULL THEN
+        PERFORM pg_notify('cache_invalidacion', jsonb_build_object('tabla', TG_TABLE_NAME, 'claves', nueva)::TEXT);
+    END IF;
+    IF anterior IS NOT NULL AND anterior IS DISTINCT FROM nueva THEN
+        PERFORM pg_notify('cache_invalidacion', jsonb_build_object('tabla', TG_TABLE_NAME, 'claves', anterior)::TEXT);
+    END IF;
+    RETURN NULL;
+END;
+$$ language 'plpgsql';
+
+-- Triggers de aviso de cambios
+CREATE OR REPLACE TRIGGER notificar_empresas AFTER INSERT OR UPDATE OR DELETE ON empresas
+    FOR EACH ROW EXECUTE FUNCTION notificar_cambio('id');
+
+CREATE OR REPLACE TRIGGER notificar_servicios AFTER INSERT OR UPDATE OR DELETE ON servicios
+    FOR EACH ROW EXECUTE FUNCTION notificar_cambio('id');
+
+-- Sin last_login: su escritura en lote no invalida el cache de usuarios
+CREATE OR REPLACE TRIGGER notificar_usuarios AFTER INSERT OR DELETE OR UPDATE OF
+    username, email, password_hash, nombre_completo, rol, empresa_id, cargo, is_active, token_version
+    ON usuarios
+    FOR EACH ROW EXECUTE FUNCTION notificar_cambio('id', 'token_version');
+
+CREATE OR REPLACE TRIGGER notificar_proyectos AFTER INSERT OR UPDATE OR DELETE ON proyectos
+    FOR EACH ROW EXECUTE FUNCTION notificar_cambio('id');
+
+CREATE OR REPLACE TRIGGER notificar_cargos AFTER INSERT OR UPDATE OR DELETE ON cargos
+    FOR EACH ROW EXECUTE FUNCTION notificar_cambio('proyecto_id');
+
+CREATE OR REPLACE TRIGGER notificar_ciclos AFTER INSERT OR UPDATE OR DELETE ON ciclos
+    FOR EACH ROW EXECUTE FUNCTION notificar_cambio('id', 'contrato_id');
+
+CREATE OR REPLACE TRIGGER notificar_asignaciones AFTER INSERT OR UPDATE OR DELETE ON asignaciones
+    FOR EACH ROW EXECUTE FUNCTION notificar_cambio('ciclo_id', 'trabajador_id');
+
+CREATE OR REPLACE TRIGGER notificar_requerimientos AFTER INSERT OR UPDATE OR DELETE ON requerimientos
+    FOR EACH ROW EXECUTE FUNCTION notificar_cambio('ciclo_id');
+
+CREATE OR REPLACE TRIGGER notificar_tokens_revocados AFTER INSERT ON tokens_revocados
+    FOR EACH ROW EXECUTE FUNCTION notificar_cambio('jti');
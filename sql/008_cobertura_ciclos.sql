@@ -0,0 +1,87 @@
+-- ============================================================
+-- EMSA - Cobertura denormalizada en ciclos
+-- Solo para bases creadas antes de este cambio: 001_schema.sql ya
+-- incluye las columnas y los triggers. Se puede ejecutar mas de una vez.
+-- ============================================================
+
+BEGIN;
+
+ALTER TABLE ciclos ADD COLUMN IF NOT EXISTS requeridos INTEGER NOT NULL DEFAULT 0;
+ALTER TABLE ciclos ADD COLUMN IF NOT EXISTS asignados INTEGER NOT NULL DEFAULT 0;
+
+-- Sin requeridos/asignados: los contadores de cobertura no cambian updated_at
+CREATE OR REPLACE TRIGGER update_ciclos_updated_at BEFORE UPDATE OF
+    contrato_id, letra, fecha_inicio, fecha_fin, estado, horario
+    ON ciclos
+    FOR EACH ROW EXECUTE FUNCTION update_updated_at_column();
+
+-- Cobertura denormalizada en ciclos: requeridos es la suma de
+-- requerimientos.cantidad_necesaria y asignados la cantidad de asignaciones.
+-- Se ajustan por diferencia en la misma transaccion del cambio; el UPDATE
+-- bloquea la fila del ciclo, por lo que cambios concurrentes no se pisan.
+-- TRUNCATE no dispara estos triggers.
+CREATE OR REPLACE FUNCTION actualizar_requeridos_ciclo()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_OP <> 'INSERT' THEN
+        UPDATE ciclos SET requeridos = requeridos - OLD.cantidad_necesaria WHERE id = OLD.ciclo_id;
+    END IF;
+    IF TG_OP <> 'DELETE' THEN
+        UPDATE ciclos SET requeridos = requeridos + NEW.cantidad_necesaria WHERE id = NEW.ciclo_id;
+    END IF;
+    RETURN NULL;
+END;
+$$ language 'plpgsql';
+
+CREATE OR REPLACE FUNCTION actualizar_asignados_ciclo()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_OP <> 'INSERT' THEN
+        UPDATE ciclos SET asignados = asignados - 1 WHERE id = OLD.ciclo_id;
+    END IF;
+    IF TG_OP <> 'DELETE' THEN
+        UPDATE ciclos SET asignados = asignados + 1 WHERE id = NEW.ciclo_id;
+    END IF;
+    RETURN NULL;
+END;
+$$ language 'plpgsql';
+
+-- Bloquear escrituras hasta terminar la carga inicial: un cambio entre el
+-- recalculo y la creacion de los triggers quedaria sin contar
+LOCK TABLE requerimientos, asignaciones IN SHARE ROW EXCLUSIVE MODE;
+
+CREATE OR REPLACE TRIGGER cobertura_requerimientos AFTER INSERT OR DELETE OR UPDATE OF
+    ciclo_id, cantidad_necesaria
+    ON requerimientos
+    FOR EACH ROW EXECUTE FUNCTION actualizar_requeridos_ciclo();
+
+CREATE OR REPLACE TRIGGER cobertura_asignaciones AFTER INSERT OR DELETE OR UPDATE OF ciclo_id
+    ON asignaciones
+    FOR EACH ROW EXECUTE FUNCTION actualizar_asignados_ciclo();
+
+-- Carga inicial (y correccion, si se vuelve a ejecutar)
+UPDATE ciclos c SET
+    requeridos = (
+        SELECT COALESCE(SUM(r.cantidad_necesaria), 0) FROM requerimientos r WHERE r.ciclo_id = c.id
+    ),
+    asignados = (SELECT COUNT(*) FROM asignaciones a WHERE a.ciclo_id = c.id);
+
+-- La vista calculaba la cobertura con joins; ahora lee las columnas
+DROP VIEW IF EXISTS v_cobertura_ciclos;
+CREATE VIEW v_cobertura_ciclos AS
+SELECT
+    c.id AS ciclo_id,
+    c.contrato_id,
+    c.letra,
+    c.fecha_inicio,
+    c.fecha_fin,
+    c.estado,
+    c.requeridos,
+    c.asignados,
+    CASE
+        WHEN c.requeridos = 0 THEN 0
+        ELSE ROUND((c.asignados::DECIMAL / c.requeridos) * 100, 2)
+    END AS porcentaje_cobertura
+FROM ciclos c;
+
+COMMIT;
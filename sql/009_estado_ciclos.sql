@@ -0,0 +1,109 @@
+-- ============================================================
+-- EMSA - Estado de ciclos recalculado por triggers
+-- Solo para bases creadas antes de este cambio: 001_schema.sql ya
+-- incluye las funciones y los triggers. Requiere 008_cobertura_ciclos.sql.
+-- Se puede ejecutar mas de una vez.
+-- ============================================================
+
+BEGIN;
+
+-- Estado de un ciclo segun su cobertura por cargo: NO_DEFINIDO sin
+-- requerimientos, COMPLETO si cada requerimiento tiene al menos
+-- cantidad_necesaria trabajadores asignados de ese cargo, INCOMPLETO si no.
+-- Usa los contadores de cobertura para resolver sin queries los casos
+-- sin requerimientos o con menos asignados que requeridos en total.
+CREATE OR REPLACE FUNCTION recalcular_estado_ciclo(p_ciclo_id INTEGER)
+RETURNS VOID AS $$
+BEGIN
+    UPDATE ciclos c SET estado = e.estado
+    FROM (
+        SELECT id, CASE
+            WHEN requeridos = 0 THEN 'NO_DEFINIDO'
+            WHEN asignados < requeridos THEN 'INCOMPLETO'
+            WHEN EXISTS (
+                SELECT 1 FROM requerimientos r
+                WHERE r.ciclo_id = ciclos.id
+                  AND r.cantidad_necesaria > (
+                      SELECT COUNT(*) FROM asignaciones a
+                      JOIN trabajadores t ON t.id = a.trabajador_id
+                      WHERE a.ciclo_id = r.ciclo_id AND t.cargo_id = r.cargo_id
+                  )
+            ) THEN 'INCOMPLETO'
+            ELSE 'COMPLETO'
+        END::estado_ciclo AS estado
+        FROM ciclos
+        WHERE id = p_ciclo_id
+    ) e
+    WHERE c.id = e.id AND c.estado IS DISTINCT FROM e.estado;
+END;
+$$ language 'plpgsql';
+
+-- Cobertura denormalizada en ciclos: requeridos es la suma de
+-- requerimientos.cantidad_necesaria y asignados la cantidad de asignaciones.
+-- Se ajustan por diferencia en la misma transaccion del cambio, y luego se
+-- recalcula el estado del ciclo; el UPDATE bloquea la fila del ciclo, por
+-- lo que cambios concurrentes no se pisan. TRUNCATE no dispara estos
+-- triggers.
+CREATE OR REPLACE FUNCTION actualizar_requeridos_ciclo()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_OP <> 'INSERT' THEN
+        UPDATE ciclos SET requeridos = requeridos - OLD.cantidad_necesaria WHERE id = OLD.ciclo_id;
+        PERFORM recalcular_estado_ciclo(OLD.ciclo_id);
+    END IF;
+    IF TG_OP <> 'DELETE' THEN
+        UPDATE ciclos SET requeridos = requeridos + NEW.cantidad_necesaria WHERE id = NEW.ciclo_id;
+        PERFORM recalcular_estado_ciclo(NEW.ciclo_id);
+    END IF;
+    RETURN NULL;
+END;
+$$ language 'plpgsql';
+
+CREATE OR REPLACE FUNCTION actualizar_asignados_ciclo()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_OP <> 'INSERT' THEN
+        UPDATE ciclos SET asignados = asignados - 1 WHERE id = OLD.ciclo_id;
+        PERFORM recalcular_estado_ciclo(OLD.ciclo_id);
+    END IF;
+    IF TG_OP <> 'DELETE' THEN
+        UPDATE ciclos SET asignados = asignados + 1 WHERE id = NEW.ciclo_id;
+        PERFORM recalcular_estado_ciclo(NEW.ciclo_id);
+    END IF;
+    RETURN NULL;
+END;
+$$ language 'plpgsql';
+
+-- Un cambio de cargo del trabajador mueve su asignacion a otro requerimiento
+CREATE OR REPLACE FUNCTION actualizar_estado_ciclos_trabajador()
+RETURNS TRIGGER AS $$
+BEGIN
+    PERFORM recalcular_estado_ciclo(a.ciclo_id)
+    FROM asignaciones a
+    WHERE a.trabajador_id = NEW.id;
+    RETURN NULL;
+END;
+$$ language 'plpgsql';
+
+-- Bloquear escrituras hasta terminar el recalculo inicial
+LOCK TABLE requerimientos, asignaciones, trabajadores IN SHARE ROW EXCLUSIVE MODE;
+
+-- Triggers de cobertura y estado de ciclos
+CREATE OR REPLACE TRIGGER cobertura_requerimientos AFTER INSERT OR DELETE OR UPDATE OF
+    ciclo_id, cargo_id, cantidad_necesaria
+    ON requerimientos
+    FOR EACH ROW EXECUTE FUNCTION actualizar_requeridos_ciclo();
+
+CREATE OR REPLACE TRIGGER cobertura_asignaciones AFTER INSERT OR DELETE OR UPDATE OF
+    ciclo_id, trabajador_id
+    ON asignaciones
+    FOR EACH ROW EXECUTE FUNCTION actualizar_asignados_ciclo();
+
+CREATE OR REPLACE TRIGGER estado_ciclos_trabajador AFTER UPDATE OF cargo_id ON trabajadores
+    FOR EACH ROW WHEN (OLD.cargo_id IS DISTINCT FROM NEW.cargo_id)
+    EXECUTE FUNCTION actualizar_estado_ciclos_trabajador();
+
+-- Estado inicial de todos los ciclos (el importado no se recalculaba)
+SELECT recalcular_estado_ciclo(id) FROM ciclos;
+
+COMMIT;
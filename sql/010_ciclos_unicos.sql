@@ -0,0 +1,17 @@
+-- ============================================================
+-- EMSA - Ciclos unicos por contrato, letra y fechas
+-- Solo para bases creadas antes de este cambio: 001_schema.sql ya
+-- incluye el constraint. Se puede ejecutar mas de una vez.
+-- ============================================================
+
+-- La generacion de ciclos (POST /contratos/{id}/ciclos/generar) omite con
+-- ON CONFLICT los que ya existen. Falla si hay ciclos duplicados: revisar
+-- con SELECT contrato_id, letra, fecha_inicio, fecha_fin, COUNT(*)
+-- FROM ciclos GROUP BY 1, 2, 3, 4 HAVING COUNT(*) > 1.
+DO $$
+BEGIN
+    IF NOT EXISTS (SELECT 1 FROM pg_constraint WHERE conname = 'unique_ciclo') THEN
+        ALTER TABLE ciclos ADD CONSTRAINT unique_ciclo UNIQUE (contrato_id, letra, fecha_inicio, fecha_fin);
+    END IF;
+END;
+$$;
@@ -0,0 +1,65 @@
+-- ============================================================
+-- EMSA - Asignaciones sin solapamiento por trabajador
+-- Solo para bases creadas antes de este cambio: 001_schema.sql ya
+-- incluye la columna, los triggers y el constraint. Se puede ejecutar
+-- mas de una vez.
+--
+-- Falla si ya hay trabajadores en ciclos que se cruzan: revisarlos con
+-- GET /api/v1/proyectos/{id}/conflictos y corregirlos antes de aplicar.
+-- ============================================================
+
+-- Igualdad de enteros en indices GiST
+CREATE EXTENSION IF NOT EXISTS btree_gist;
+
+BEGIN;
+
+ALTER TABLE asignaciones ADD COLUMN IF NOT EXISTS periodo DATERANGE;
+
+-- Periodo de cada asignacion: copia de las fechas de su ciclo para que el
+-- constraint asignaciones_sin_solapamiento pueda compararlas
+CREATE OR REPLACE FUNCTION asignar_periodo_asignacion()
+RETURNS TRIGGER AS $$
+BEGIN
+    SELECT daterange(fecha_inicio, fecha_fin, '[]') INTO NEW.periodo FROM ciclos WHERE id = NEW.ciclo_id;
+    RETURN NEW;
+END;
+$$ language 'plpgsql';
+
+CREATE OR REPLACE FUNCTION actualizar_periodo_asignaciones()
+RETURNS TRIGGER AS $$
+BEGIN
+    UPDATE asignaciones SET periodo = daterange(NEW.fecha_inicio, NEW.fecha_fin, '[]')
+    WHERE ciclo_id = NEW.id;
+    RETURN NULL;
+END;
+$$ language 'plpgsql';
+
+-- Bloquear escrituras hasta terminar la carga inicial
+LOCK TABLE asignaciones, ciclos IN SHARE ROW EXCLUSIVE MODE;
+
+-- Triggers del periodo de asignaciones
+CREATE OR REPLACE TRIGGER periodo_asignaciones BEFORE INSERT OR UPDATE OF ciclo_id ON asignaciones
+    FOR EACH ROW EXECUTE FUNCTION asignar_periodo_asignacion();
+
+CREATE OR REPLACE TRIGGER periodo_ciclos AFTER UPDATE OF fecha_inicio, fecha_fin ON ciclos
+    FOR EACH ROW
+    WHEN (OLD.fecha_inicio IS DISTINCT FROM NEW.fecha_inicio OR OLD.fecha_fin IS DISTINCT FROM NEW.fecha_fin)
+    EXECUTE FUNCTION actualizar_periodo_asignaciones();
+
+-- Carga inicial
+UPDATE asignaciones a SET periodo = daterange(c.fecha_inicio, c.fecha_fin, '[]')
+FROM ciclos c
+WHERE c.id = a.ciclo_id AND a.periodo IS DISTINCT FROM daterange(c.fecha_inicio, c.fecha_fin, '[]');
+
+ALTER TABLE asignaciones ALTER COLUMN periodo SET NOT NULL;
+
+DO $$
+BEGIN
+    IF NOT EXISTS (SELECT 1 FROM pg_constraint WHERE conname = 'asignaciones_sin_solapamiento') THEN
+        ALTER TABLE asignaciones ADD CONSTRAINT asignaciones_sin_solapamiento
+            EXCLUDE USING gist (trabajador_id WITH =, periodo WITH &&);
+    END IF;
+END;
+$$;
+
+COMMIT;
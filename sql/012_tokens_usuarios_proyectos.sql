@@ -0,0 +1,26 @@
+-- ============================================================
+-- EMSA - Revocar tokens al cambiar los proyectos asignados
+-- Solo para bases creadas antes de este cambio: 001_schema.sql ya
+-- incluye la funcion y el trigger. Se puede ejecutar mas de una vez.
+-- ============================================================
+
+-- Los proyectos asignados van en el access token (claim proy): al cambiar
+-- se incrementa token_version para que los tokens emitidos antes dejen de
+-- aceptarse (notificar_usuarios avisa a las demas instancias)
+CREATE OR REPLACE FUNCTION revocar_tokens_usuario_proyectos()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_OP <> 'DELETE' THEN
+        UPDATE usuarios SET token_version = token_version + 1 WHERE id = NEW.usuario_id;
+    END IF;
+    IF TG_OP = 'DELETE' OR (TG_OP = 'UPDATE' AND OLD.usuario_id <> NEW.usuario_id) THEN
+        UPDATE usuarios SET token_version = token_version + 1 WHERE id = OLD.usuario_id;
+    END IF;
+    RETURN NULL;
+END;
+$$ language 'plpgsql';
+
+CREATE OR REPLACE TRIGGER tokens_usuarios_proyectos AFTER INSERT OR DELETE OR UPDATE OF
+    usuario_id, proyecto_id
+    ON usuarios_proyectos
+    FOR EACH ROW EXECUTE FUNCTION revocar_tokens_usuario_proyectos();
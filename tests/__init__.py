@@ -0,0 +1,3 @@
+"""
+Tests unitarios (sin base de datos)
+"""
@@ -0,0 +1,73 @@
+"""
+Fixtures comunes: una sesion falsa en lugar de PostgreSQL y el estado en
+memoria de autenticacion (usuarios_cache, revocaciones) limpio por test
+"""
+
+import pytest
+
+from app.models import Usuario
+from app.models.usuario import RolUsuario
+from app.routers import auth
+from app.utils.revocacion import RevocacionTokens
+
+
+class SesionFalsa:
+    """
+    Reemplazo minimo de AsyncSession: db.scalar retorna `usuario`,
+    db.scalars los `proyecto_ids` y db.get las entidades agregadas con
+    `agregar`; las escrituras solo se registran.
+    """
+
+    def __init__(self, usuario=None, proyecto_ids=()):
+        self.usuario = usuario
+        self.proyecto_ids = list(proyecto_ids)
+        self.entidades = {}
+        self.lecturas = 0
+        self.ejecutados = []
+
+    def agregar(self, entidad):
+        self.entidades[(type(entidad), entidad.id)] = entidad
+
+    async def get(self, modelo, id):
+        return self.entidades.get((modelo, id))
+
+    async def scalar(self, statement):
+        self.lecturas += 1
+        return self.usuario
+
+    async def scalars(self, statement):
+        return list(self.proyecto_ids)
+
+    async def execute(self, statement):
+        self.ejecutados.append(statement)
+
+    async def commit(self):
+        pass
+
+    def expunge(self, instancia):
+        pass
+
+
+@pytest.fixture(autouse=True)
+def estado_auth(monkeypatch):
+    auth.usuarios_cache.clear()
+    monkeypatch.setattr(auth, "revocaciones", RevocacionTokens(capacidad=1000))
+    yield
+    auth.usuarios_cache.clear()
+
+
+@pytest.fixture
+def usuario():
+    return Usuario(
+        id=7,
+        email="jefe@emsa.cl",
+        rol=RolUsuario.JEFE_PROYECTO,
+        empresa_id=3,
+        is_active=True,
+        token_version=2,
+    )
+
+
+@pytest.fixture
+def db(usuario):
+    return SesionFalsa(usuario, proyecto_ids=[10, 11])
@@ -0,0 +1,74 @@
+"""
+Escenarios sinteticos para el motor de dotacion y verificacion de sus
+propuestas; los usan tests/test_dotacion.py y
+benchmarks/dotacion_automatica.py
+"""
+
+import random
+from collections import Counter, defaultdict
+from datetime import date
+
+EMPRESAS = 4
+CARGOS = 12
+CARGOS_ID = range(CARGOS)
+
+
+def escenario(n_trabajadores: int, n_ciclos: int, semilla: int):
+    """Entradas de proponer: ciclos, brechas, trabajadores y ocupados"""
+    rng = random.Random(semilla)
+    origen = date(2025, 1, 1).toordinal()
+
+    trabajadores = [
+        (t, rng.randrange(EMPRESAS), rng.randrange(CARGOS))
+        for t in range(1, n_trabajadores + 1)
+    ]
+    # Ciclos 7x7 repartidos en un anio
+    ciclos = []
+    for c in range(1, n_ciclos + 1):
+        inicio = origen + rng.randrange(365)
+        ciclos.append((c, inicio, inicio + 6, rng.randrange(EMPRESAS)))
+    brechas = {
+        c: [(cargo, rng.randint(1, 8)) for cargo in rng.sample(CARGOS_ID, 4)]
+        for c, _, _, _ in ciclos
+    }
+    # Asignaciones previas: una de cada cinco trabajadores tiene un ciclo
+    ocupados = []
+    for t, _, _ in trabajadores[::5]:
+        inicio = origen + rng.randrange(365)
+        ocupados.append((t, inicio, inicio + 6))
+    return ciclos, brechas, trabajadores, ocupados
+
+
+def verificar(ciclos, brechas, trabajadores, ocupados, propuesta) -> None:
+    """
+    AssertionError si la propuesta asigna un trabajador de otra empresa o
+    cargo, sobrepasa una brecha, informa mal los faltantes o deja a un
+    trabajador en dos ciclos que se cruzan (fechas inclusive)
+    """
+    por_ciclo = {c[0]: c for c in ciclos}
+    por_trabajador = {t[0]: t for t in trabajadores}
+    cubiertos = Counter()
+    periodos = defaultdict(list)
+    for trabajador_id, inicio, fin in ocupados:
+        periodos[trabajador_id].append((inicio, fin))
+
+    for ciclo_id, trabajador_id, cargo_id in propuesta.asignaciones:
+        _, inicio, fin, empresa_id = por_ciclo[ciclo_id]
+        _, empresa, cargo = por_trabajador[trabajador_id]
+        assert (empresa, cargo) == (empresa_id, cargo_id)
+        cubiertos[(ciclo_id, cargo_id)] += 1
+        periodos[trabajador_id].append((inicio, fin))
+
+    for ciclo_id, lista in brechas.items():
+        for cargo_id, faltan in lista:
+            cubierto = cubiertos[(ciclo_id, cargo_id)]
+            assert cubierto <= faltan, "Brecha sobrepasada"
+    for ciclo_id, cargo_id, cantidad in propuesta.faltantes:
+        faltan = dict(brechas[ciclo_id])[cargo_id]
+        assert cubiertos[(ciclo_id, cargo_id)] + cantidad == faltan
+
+    for trabajador_id, lista in periodos.items():
+        lista.sort()
+        for (_, fin), (inicio, _) in zip(lista, lista[1:]):
+            cruzados = f"Trabajador {trabajador_id} en ciclos cruzados"
+            assert inicio > fin, cruzados
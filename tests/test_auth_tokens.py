@@ -0,0 +1,86 @@
+"""
+Version de los access tokens (usuarios.token_version)
+"""
+
+import pytest
+from fastapi import HTTPException
+
+from app.routers.auth import (TOKEN_OBSOLETO, claims_acceso, get_usuario_token,
+                              usuarios_cache)
+from app.utils.security import create_access_token, create_refresh_token
+
+
+async def _token(db, usuario, **cambios) -> str:
+    return create_access_token(data=await claims_acceso(db, usuario) | cambios)
+
+
+@pytest.mark.asyncio
+async def test_claims_del_token(db, usuario):
+    actual = await get_usuario_token(await _token(db, usuario), db)
+
+    assert actual.id == usuario.id
+    assert actual.rol == usuario.rol
+    assert actual.empresa_id == usuario.empresa_id
+    assert actual.proyecto_ids == [10, 11]
+    assert actual.version == usuario.token_version
+
+
+@pytest.mark.asyncio
+async def test_version_anterior_rechazada_sin_cache(db, usuario):
+    token = await _token(db, usuario, ver=usuario.token_version - 1)
+
+    # Instancia recien iniciada: el usuario no esta en usuarios_cache
+    with pytest.raises(HTTPException) as error:
+        await get_usuario_token(token, db)
+
+    assert error.value.status_code == 401
+    assert error.value.detail == TOKEN_OBSOLETO
+    assert db.lecturas == 1
+
+
+@pytest.mark.asyncio
+async def test_version_desde_cache(db, usuario):
+    token = await _token(db, usuario)
+    await get_usuario_token(token, db)
+    await get_usuario_token(token, db)
+    assert db.lecturas == 1
+
+    # Otra instancia incremento token_version y el aviso invalido el cache
+    usuario.token_version += 1
+    usuarios_cache.delete(usuario.id)
+    with pytest.raises(HTTPException) as error:
+        await get_usuario_token(token, db)
+    assert error.value.detail == TOKEN_OBSOLETO
+
+
+@pytest.mark.asyncio
+async def test_usuario_inactivo(db, usuario):
+    token = await _token(db, usuario)
+    usuario.is_active = False
+
+    with pytest.raises(HTTPException) as error:
+        await get_usuario_token(token, db)
+
+    assert error.value.status_code == 401
+    assert error.value.detail == "Usuario inactivo"
+
+
+@pytest.mark.asyncio
+async def test_usuario_inexistente(db, usuario):
+    token = await _token(db, usuario)
+    db.usuario = None
+
+    with pytest.raises(HTTPException) as error:
+        await get_usuario_token(token, db)
+
+    assert error.value.status_code == 401
+
+
+@pytest.mark.asyncio
+async def test_refresh_token_no_sirve_como_access(db, usuario):
+    token = create_refresh_token(data={"sub": str(usuario.id), "sid": "s"})
+
+    with pytest.raises(HTTPException) as error:
+        await get_usuario_token(token, db)
+
+    assert error.value.status_code == 401
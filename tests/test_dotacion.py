@@ -0,0 +1,103 @@
+"""
+Motor de asignacion automatica (proponer)
+"""
+
+import pytest
+
+from app.utils.dotacion import proponer
+from tests.dotacion_escenarios import escenario, verificar
+
+# Fechas como ordinales, fin inclusive: CICLO_2 comienza el ultimo dia
+# de CICLO_1
+CICLO_1 = (1, 100, 107, 1)
+CICLO_2 = (2, 107, 114, 1)
+CICLO_3 = (3, 108, 115, 1)
+
+
+def test_cubre_con_empresa_y_cargo():
+    trabajadores = [(10, 1, 5), (11, 2, 5), (12, 1, 6)]
+
+    propuesta = proponer([CICLO_1], {1: [(5, 1)]}, trabajadores, [])
+
+    assert propuesta.asignaciones == [(1, 10, 5)]
+    assert propuesta.faltantes == []
+
+
+def test_faltantes():
+    propuesta = proponer([CICLO_1], {1: [(5, 3)]}, [(10, 1, 5)], [])
+
+    assert propuesta.asignaciones == [(1, 10, 5)]
+    assert propuesta.faltantes == [(1, 5, 2)]
+
+
+def test_fin_de_ciclo_trabajado():
+    # CICLO_2 comienza el dia en que termina CICLO_1: otro trabajador
+    brechas = {1: [(5, 1)], 2: [(5, 1)]}
+    trabajadores = [(10, 1, 5), (11, 1, 5)]
+
+    propuesta = proponer([CICLO_1, CICLO_2], brechas, trabajadores, [])
+
+    assert propuesta.asignaciones == [(1, 10, 5), (2, 11, 5)]
+
+
+def test_libre_el_dia_siguiente():
+    brechas = {1: [(5, 1)], 3: [(5, 1)]}
+
+    propuesta = proponer([CICLO_1, CICLO_3], brechas, [(10, 1, 5)], [])
+
+    assert propuesta.asignaciones == [(1, 10, 5), (3, 10, 5)]
+
+
+def test_ciclos_cruzados():
+    ciclos = [CICLO_1, (2, 106, 113, 1)]
+
+    propuesta = proponer(ciclos, {1: [(5, 1)], 2: [(5, 1)]}, [(10, 1, 5)], [])
+
+    assert propuesta.asignaciones == [(1, 10, 5)]
+    assert propuesta.faltantes == [(2, 5, 1)]
+
+
+def test_asignaciones_existentes():
+    trabajadores = [(10, 1, 5), (11, 1, 5)]
+    # 10 ya esta en un ciclo que se cruza; el de 11 comienza al dia
+    # siguiente del fin
+    ocupados = [(10, 103, 110), (11, 108, 108)]
+
+    propuesta = proponer([CICLO_1], {1: [(5, 2)]}, trabajadores, ocupados)
+
+    assert propuesta.asignaciones == [(1, 11, 5)]
+    assert propuesta.faltantes == [(1, 5, 1)]
+
+
+def test_menor_carga_primero():
+    trabajadores = [(10, 1, 5), (11, 1, 5)]
+    ocupados = [(10, 50, 57)]
+
+    propuesta = proponer([CICLO_1], {1: [(5, 1)]}, trabajadores, ocupados)
+
+    assert propuesta.asignaciones == [(1, 11, 5)]
+
+
+def test_cobertura_de_mejor_esfuerzo():
+    # 11 solo esta libre para el ciclo 1 (ocupado en 108..110) y 10, de
+    # menor carga, se elige primero: el ciclo 2 queda sin cubrir aunque
+    # 11 -> ciclo 1 y 10 -> ciclo 2 cubririan ambos
+    ciclos = [(1, 100, 106, 1), (2, 105, 112, 1)]
+    trabajadores = [(10, 1, 5), (11, 1, 5)]
+    brechas = {1: [(5, 1)], 2: [(5, 1)]}
+    ocupados = [(11, 108, 110)]
+
+    propuesta = proponer(ciclos, brechas, trabajadores, ocupados)
+
+    assert propuesta.asignaciones == [(1, 10, 5)]
+    assert propuesta.faltantes == [(2, 5, 1)]
+
+
+@pytest.mark.parametrize("semilla", range(5))
+def test_escenario_valido(semilla):
+    datos = escenario(500, 100, semilla)
+
+    propuesta = proponer(*datos)
+
+    verificar(*datos, propuesta)
+    assert propuesta.asignaciones
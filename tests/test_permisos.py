@@ -0,0 +1,144 @@
+"""
+Mascaras de permisos y dependencies requires / requires_rol
+"""
+
+from datetime import date
+
+import pytest
+from fastapi import HTTPException
+
+from app.models import Contrato
+from app.models.usuario import RolUsuario
+from app.routers.auth import (TOKEN_OBSOLETO, claims_acceso,
+                              get_usuario_verificado, requires, requires_rol)
+from app.routers.contratos import generar_ciclos_contrato
+from app.schemas.auth import UsuarioToken
+from app.schemas.ciclo import GenerarCiclosRequest
+from app.utils.permissions import (PERMISSION_BITS, ROLE_MASKS,
+                                   ROLE_PERMISSIONS, Permission,
+                                   has_permission, permission_mask,
+                                   require_proyecto)
+from app.utils.security import create_access_token
+
+
+def _usuario(rol: RolUsuario, proyecto_ids=()) -> UsuarioToken:
+    return UsuarioToken(id=1, rol=rol, proyecto_ids=list(proyecto_ids))
+
+
+def test_un_bit_por_permiso():
+    bits = list(PERMISSION_BITS.values())
+    assert len(set(bits)) == len(Permission)
+    assert all(bit & (bit - 1) == 0 for bit in bits)
+
+
+@pytest.mark.parametrize("rol", list(RolUsuario))
+@pytest.mark.parametrize("permission", list(Permission))
+def test_mascara_igual_a_lista(rol, permission):
+    esperado = permission in ROLE_PERMISSIONS[rol]
+    assert has_permission(rol, permission) == esperado
+    assert bool(ROLE_MASKS[rol] & PERMISSION_BITS[permission]) == esperado
+
+
+def test_admin_tiene_todos():
+    assert ROLE_MASKS[RolUsuario.ADMIN] == permission_mask(Permission)
+
+
+@pytest.mark.asyncio
+async def test_requires_con_permiso():
+    verificar = requires(Permission.ASIGNACIONES_GESTIONAR)
+    usuario = _usuario(RolUsuario.JEFE_PROYECTO)
+
+    assert await verificar(current_user=usuario) is usuario
+
+
+@pytest.mark.asyncio
+async def test_requires_exige_todos_los_permisos():
+    # JEFE_PROYECTO tiene CICLOS_CREAR pero no CICLOS_ELIMINAR
+    verificar = requires(Permission.CICLOS_CREAR, Permission.CICLOS_ELIMINAR)
+
+    with pytest.raises(HTTPException) as error:
+        await verificar(current_user=_usuario(RolUsuario.JEFE_PROYECTO))
+
+    assert error.value.status_code == 403
+    assert "CICLOS_ELIMINAR" in error.value.detail
+    usuario = _usuario(RolUsuario.GESTOR_PROYECTOS)
+    assert await verificar(current_user=usuario) is usuario
+
+
+@pytest.mark.asyncio
+async def test_requires_rol():
+    verificar = requires_rol(RolUsuario.ADMIN, RolUsuario.GESTOR_PROYECTOS)
+
+    for rol in (RolUsuario.ADMIN, RolUsuario.GESTOR_PROYECTOS):
+        usuario = _usuario(rol)
+        assert await verificar(current_user=usuario) is usuario
+    for rol in (RolUsuario.JEFE_PROYECTO, RolUsuario.CONTRATISTA):
+        with pytest.raises(HTTPException) as error:
+            await verificar(current_user=_usuario(rol))
+        assert error.value.status_code == 403
+
+
+@pytest.mark.asyncio
+async def test_requires_rol_admin_aunque_tenga_el_permiso():
+    # GESTOR_PROYECTOS tiene EMPRESAS_GESTIONAR, pero empresas es solo ADMIN
+    verificar = requires_rol(RolUsuario.ADMIN)
+
+    with pytest.raises(HTTPException) as error:
+        await verificar(current_user=_usuario(RolUsuario.GESTOR_PROYECTOS))
+
+    assert error.value.status_code == 403
+
+
+@pytest.mark.asyncio
+async def test_verificado_lee_la_db(db, usuario):
+    token = create_access_token(data=await claims_acceso(db, usuario))
+
+    await get_usuario_verificado(token, db)
+    await get_usuario_verificado(token, db)
+
+    assert db.lecturas == 2
+
+
+@pytest.mark.asyncio
+async def test_verificado_rechaza_rol_cambiado_en_la_db(db, usuario):
+    token = create_access_token(data=await claims_acceso(db, usuario))
+    # Cambio hecho directamente en la DB, sin incrementar token_version
+    usuario.rol = RolUsuario.CONTRATISTA
+
+    with pytest.raises(HTTPException) as error:
+        await get_usuario_verificado(token, db)
+
+    assert error.value.status_code == 401
+    assert error.value.detail == TOKEN_OBSOLETO
+
+
+@pytest.mark.parametrize(
+    "rol", [RolUsuario.ADMIN, RolUsuario.GESTOR_PROYECTOS]
+)
+def test_require_proyecto_roles_globales(rol):
+    require_proyecto(_usuario(rol), 99)
+
+
+def test_require_proyecto_asignados():
+    jefe = _usuario(RolUsuario.JEFE_PROYECTO, [10, 11])
+
+    require_proyecto(jefe, 10)
+    with pytest.raises(HTTPException) as error:
+        require_proyecto(jefe, 99)
+
+    assert error.value.status_code == 403
+
+
+@pytest.mark.asyncio
+async def test_generar_ciclos_de_otro_proyecto(db):
+    db.agregar(Contrato(id=5, proyecto_id=99, patron="7x7"))
+    rango = GenerarCiclosRequest(
+        desde=date(2025, 1, 1), hasta=date(2025, 2, 1)
+    )
+    jefe = _usuario(RolUsuario.JEFE_PROYECTO, [10, 11])
+
+    with pytest.raises(HTTPException) as error:
+        await generar_ciclos_contrato(5, rango, jefe, db)
+
+    assert error.value.status_code == 403
+    assert db.ejecutados == []
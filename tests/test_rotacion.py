@@ -0,0 +1,126 @@
+"""
+Motor de rotacion: patrones, bloques y ciclos generados
+"""
+
+from datetime import date, timedelta
+
+import pytest
+
+from app.models import Contrato
+from app.models.contrato import TipoTurnos
+from app.utils.rotacion import (Rotacion, expandir_rotacion, generar_ciclos,
+                                parsear_patron)
+
+INICIO = date(2025, 3, 3)
+
+
+def dia(n: int) -> date:
+    return INICIO + timedelta(days=n)
+
+
+@pytest.mark.parametrize(
+    "patron, esperado",
+    [("7x7", (7, 7)), (" 14X14 ", (14, 14)), ("5x2", (5, 2))],
+)
+def test_parsear_patron(patron, esperado):
+    assert parsear_patron(patron) == esperado
+
+
+@pytest.mark.parametrize("patron", ["", None, "7", "7x", "0x7", "7x0", "ax7"])
+def test_parsear_patron_invalido(patron):
+    with pytest.raises(ValueError):
+        parsear_patron(patron)
+
+
+@pytest.mark.parametrize("patron", ["5x2", "4x3", "10x4"])
+def test_abcd_asimetrico_rechazado(patron):
+    with pytest.raises(ValueError):
+        Rotacion(TipoTurnos.ABCD, patron, INICIO)
+
+
+def test_ab_asimetrico_permitido():
+    rotacion = Rotacion(TipoTurnos.AB, "5x2", INICIO)
+    assert (rotacion.trabajo, rotacion.descanso) == (5, 2)
+
+
+def test_bloques_abcd():
+    rotacion = Rotacion(TipoTurnos.ABCD, "7x7", INICIO)
+
+    bloques = rotacion.bloques(INICIO, dia(27))
+
+    # A/B y C/D se alternan cada 7 dias
+    esperado = [(dia(d), dia(d + 6), d // 7 % 2) for d in (0, 7, 14, 21)]
+    assert bloques == esperado
+
+
+def test_bloques_anclados_al_inicio():
+    rotacion = Rotacion(TipoTurnos.AB, "7x7", INICIO)
+
+    # Un rango que parte a mitad de bloque retorna el siguiente completo
+    bloques = rotacion.bloques(dia(3), dia(30))
+
+    assert [b[0] for b in bloques] == [dia(14), dia(28)]
+    assert rotacion.bloques(dia(-30), INICIO) == [(INICIO, dia(6), 0)]
+
+
+def test_expandir_rangos_distintos_misma_fase():
+    def ciclos(desde, hasta):
+        filas = expandir_rotacion(TipoTurnos.ABCD, "7x7", INICIO, desde, hasta)
+        return {(f["letra"], f["fecha_inicio"], f["fecha_fin"]) for f in filas}
+
+    completo = ciclos(INICIO, dia(90))
+    parcial = ciclos(dia(20), dia(60))
+
+    assert parcial <= completo
+    assert {letra for letra, _, _ in completo} == {"A", "B", "C", "D"}
+
+
+@pytest.mark.asyncio
+async def test_generar_ciclos_sin_fecha_inicio():
+    contrato = Contrato(
+        id=1, tipo_turnos=TipoTurnos.ABCD, patron="7x7", fecha_inicio=None
+    )
+
+    with pytest.raises(ValueError, match="fecha de inicio"):
+        await generar_ciclos(None, contrato, INICIO, dia(30))
+
+
+def test_en_turno_abcd():
+    rotacion = Rotacion(TipoTurnos.ABCD, "7x7", INICIO)
+
+    assert rotacion.en_turno(dia(-1)) == []
+    assert rotacion.en_turno(INICIO) == [("A", "DIA"), ("B", "NOCHE")]
+    assert rotacion.en_turno(dia(6)) == [("A", "DIA"), ("B", "NOCHE")]
+    assert rotacion.en_turno(dia(7)) == [("C", "DIA"), ("D", "NOCHE")]
+    assert rotacion.en_turno(dia(14)) == [("A", "DIA"), ("B", "NOCHE")]
+
+
+@pytest.mark.parametrize(
+    "tipo, patron",
+    [
+        (TipoTurnos.AB, "5x2"),
+        (TipoTurnos.AB, "14x14"),
+        (TipoTurnos.ABCD, "4x4"),
+    ],
+)
+def test_en_turno_igual_a_bloques(tipo, patron):
+    rotacion = Rotacion(tipo, patron, INICIO)
+    trabajados = {}
+    for inicio, fin, grupo in rotacion.bloques(dia(-10), dia(60)):
+        fecha = inicio
+        while fecha <= fin:
+            trabajados.setdefault(fecha, []).extend(rotacion.grupos[grupo])
+            fecha += timedelta(days=1)
+
+    for n in range(-10, 60):
+        assert rotacion.en_turno(dia(n)) == trabajados.get(dia(n), [])
+
+
+def test_fechas_trabajadas():
+    rotacion = Rotacion(TipoTurnos.ABCD, "7x7", INICIO)
+
+    # Desde la mitad del primer bloque de C hasta la mitad del segundo
+    fechas = rotacion.fechas_trabajadas("C", dia(10), dia(24))
+
+    assert fechas == [dia(n) for n in (10, 11, 12, 13, 21, 22, 23, 24)]
+    assert rotacion.fechas_trabajadas("E", INICIO, dia(30)) == []
@@ -0,0 +1,115 @@
+"""
+Sesiones: login, /refresh y logout comparten el sid que revoca el logout
+"""
+
+import pytest
+from fastapi import HTTPException
+from fastapi.security import OAuth2PasswordRequestForm
+
+from app.routers import auth
+from app.schemas.auth import RefreshRequest
+from app.utils.security import create_refresh_token, decode_token
+
+
+@pytest.fixture(autouse=True)
+def sin_password(monkeypatch):
+    async def verificar(password, password_hash):
+        return True
+
+    monkeypatch.setattr(auth, "verify_password_async", verificar)
+    monkeypatch.setattr(auth.ultimos_login, "registrar", lambda *args: None)
+
+
+async def _login(db, usuario):
+    form = OAuth2PasswordRequestForm(username=usuario.email, password="x")
+    return await auth.login(form, db)
+
+
+async def _refresh(db, refresh_token):
+    return await auth.refresh(RefreshRequest(refresh_token=refresh_token), db)
+
+
+async def _logout(db, access_token, refresh_token=None):
+    current_user = await auth.get_usuario_token(access_token, db)
+    data = None
+    if refresh_token is not None:
+        data = RefreshRequest(refresh_token=refresh_token)
+    return await auth.logout(access_token, current_user, data, db)
+
+
+@pytest.mark.asyncio
+async def test_login_comparte_sid(db, usuario):
+    tokens = await _login(db, usuario)
+
+    acceso = decode_token(tokens.access_token)
+    refresh = decode_token(tokens.refresh_token)
+    assert acceso["sid"] == refresh["sid"]
+    assert acceso["sub"] == refresh["sub"] == str(usuario.id)
+    assert acceso["ver"] == usuario.token_version
+
+
+@pytest.mark.asyncio
+async def test_logout_sin_refresh_revoca_la_sesion(db, usuario):
+    tokens = await _login(db, usuario)
+
+    await _logout(db, tokens.access_token)
+
+    with pytest.raises(HTTPException) as error:
+        await _refresh(db, tokens.refresh_token)
+    assert error.value.detail == "Sesión cerrada"
+    with pytest.raises(HTTPException):
+        await auth.get_usuario_token(tokens.access_token, db)
+
+
+@pytest.mark.asyncio
+async def test_refresh_mantiene_la_sesion(db, usuario):
+    tokens = await _login(db, usuario)
+    sid = decode_token(tokens.access_token)["sid"]
+
+    renovados = await _refresh(db, tokens.refresh_token)
+    assert decode_token(renovados.access_token)["sid"] == sid
+
+    # El logout con el access token renovado revoca el refresh del login
+    await _logout(db, renovados.access_token)
+    with pytest.raises(HTTPException):
+        await _refresh(db, tokens.refresh_token)
+
+
+@pytest.mark.asyncio
+async def test_refresh_con_rotacion(db, usuario, monkeypatch):
+    monkeypatch.setattr(auth.settings, "refresh_token_rotacion", True)
+    tokens = await _login(db, usuario)
+
+    renovados = await _refresh(db, tokens.refresh_token)
+    assert renovados.refresh_token != tokens.refresh_token
+    sid = decode_token(tokens.refresh_token)["sid"]
+    assert decode_token(renovados.refresh_token)["sid"] == sid
+
+    # El refresh token usado ya no sirve; el nuevo si
+    with pytest.raises(HTTPException):
+        await _refresh(db, tokens.refresh_token)
+    await _refresh(db, renovados.refresh_token)
+
+
+@pytest.mark.asyncio
+async def test_refresh_sin_sid(db, usuario):
+    refresh_token = create_refresh_token(data={"sub": str(usuario.id)})
+
+    with pytest.raises(HTTPException) as error:
+        await _refresh(db, refresh_token)
+
+    assert error.value.status_code == 401
+    assert error.value.detail == auth.TOKEN_OBSOLETO
+
+
+@pytest.mark.asyncio
+async def test_logout_rechaza_refresh_de_otro_usuario(db, usuario):
+    tokens = await _login(db, usuario)
+    ajeno = create_refresh_token(data={"sub": "99", "sid": "otra"})
+
+    with pytest.raises(HTTPException) as error:
+        await _logout(db, tokens.access_token, ajeno)
+
+    assert error.value.status_code == 401
+    # Nada se revoco: la sesion sigue vigente
+    await auth.get_usuario_token(tokens.access_token, db)
@@ -0,0 +1,138 @@
+"""
+Deteccion de ciclos solapados: IndiceIntervalos y barrido
+"""
+
+import random
+from datetime import date, timedelta
+
+import pytest
+
+from app.models.contrato import TipoTurnos
+from app.utils.rotacion import Rotacion
+from app.utils.solapamientos import IndiceIntervalos, Periodo, barrido
+
+INICIO = date(2025, 1, 1)
+
+
+def dia(n: int) -> date:
+    return INICIO + timedelta(days=n)
+
+
+def periodo(desde: int, hasta: int, ciclo_id: int) -> Periodo:
+    return Periodo(dia(desde), dia(hasta), ciclo_id)
+
+
+def dias(p: Periodo) -> set[date]:
+    """Dias que ocupa el periodo, fecha_fin incluida"""
+    n = (p.fecha_fin - p.fecha_inicio).days + 1
+    return {p.fecha_inicio + timedelta(days=d) for d in range(n)}
+
+
+def pares(lista) -> set[frozenset]:
+    return {frozenset((s.otro.ciclo_id, s.periodo.ciclo_id)) for s in lista}
+
+
+@pytest.mark.parametrize(
+    "a, b, cruzan",
+    [
+        ((0, 6), (7, 13), False),
+        # fecha_fin se trabaja: otro ciclo que comienza ese dia se cruza
+        ((0, 7), (7, 14), True),
+        ((0, 7), (6, 14), True),
+        ((0, 14), (3, 5), True),
+        ((3, 3), (3, 3), True),
+        ((3, 3), (0, 3), True),
+        ((3, 3), (4, 5), False),
+    ],
+)
+def test_cruza(a, b, cruzan):
+    p, q = periodo(*a, 1), periodo(*b, 2)
+    assert p.cruza(q) == q.cruza(p) == cruzan
+    assert bool(barrido([(1, min(p, q)), (1, max(p, q))])) == cruzan
+
+
+def test_barrido_por_trabajador():
+    periodos = [
+        (1, periodo(0, 7, 1)),
+        (1, periodo(5, 10, 2)),
+        (2, periodo(5, 10, 3)),
+    ]
+
+    (solapamiento,) = barrido(periodos)
+
+    assert solapamiento.trabajador_id == 1
+    assert (solapamiento.desde, solapamiento.hasta) == (dia(5), dia(7))
+
+
+def test_indice_excluye_el_mismo_ciclo():
+    indice = IndiceIntervalos()
+    indice.agregar(1, periodo(0, 7, 1))
+
+    assert indice.solapados(1, periodo(0, 7, 1)) == []
+    assert indice.solapados(1, periodo(0, 7, 2)) == [periodo(0, 7, 1)]
+    assert indice.solapados(2, periodo(0, 7, 2)) == []
+
+
+@pytest.mark.parametrize("semilla", range(20))
+def test_igual_a_fuerza_bruta(semilla):
+    rng = random.Random(semilla)
+    periodos = []
+    for ciclo_id in range(30):
+        desde = rng.randrange(60)
+        hasta = desde + rng.randrange(10)
+        periodos.append((rng.randrange(3), periodo(desde, hasta, ciclo_id)))
+    periodos.sort(key=lambda t: (t[0], t[1].fecha_inicio))
+
+    def esperados(trabajador_id, p):
+        return {
+            q.ciclo_id
+            for t, q in periodos
+            if t == trabajador_id
+            and q.ciclo_id != p.ciclo_id
+            and dias(p) & dias(q)
+        }
+
+    todos = {
+        frozenset((p.ciclo_id, otro))
+        for t, p in periodos
+        for otro in esperados(t, p)
+    }
+    resultado = barrido(periodos)
+    assert pares(resultado) == todos
+    for s in resultado:
+        comunes = dias(s.periodo) & dias(s.otro)
+        assert (s.desde, s.hasta) == (min(comunes), max(comunes))
+
+    indice = IndiceIntervalos()
+    for trabajador_id, p in reversed(periodos):
+        indice.agregar(trabajador_id, p)
+    for trabajador_id, p in periodos:
+        solapados = indice.solapados(trabajador_id, p)
+        assert {q.ciclo_id for q in solapados} == esperados(trabajador_id, p)
+
+
+@pytest.mark.parametrize("desfase, cruzan", [(6, True), (7, False)])
+def test_ciclos_de_la_rotacion(desfase, cruzan):
+    # Letra A de dos contratos 7x7; el segundo parte `desfase` dias despues
+    x = Rotacion(TipoTurnos.AB, "7x7", INICIO)
+    y = Rotacion(TipoTurnos.AB, "7x7", dia(desfase))
+    (inicio_x, fin_x, _), *_ = x.bloques(INICIO, INICIO)
+    (inicio_y, fin_y, _), *_ = y.bloques(dia(desfase), dia(desfase))
+    periodos = [
+        (1, Periodo(inicio_x, fin_x, 1)),
+        (1, Periodo(inicio_y, fin_y, 2)),
+    ]
+
+    solapamientos = barrido(periodos)
+
+    # Hay solapamiento si y solo si ambas letras A trabajan un mismo dia
+    comunes = [
+        d
+        for d in map(dia, range(14))
+        if ("A", "DIA") in x.en_turno(d) and ("A", "DIA") in y.en_turno(d)
+    ]
+    assert bool(solapamientos) == cruzan == bool(comunes)
+    if cruzan:
+        (s,) = solapamientos
+        assert comunes == [dia(6)]
+        assert (s.desde, s.hasta) == (dia(6), dia(6))